@@ -1,3 +1,36 @@
 from django.contrib import admin
 
-# Register your models here.
+from .models import WaterUnit, WaterQuality, Maintenance, AlertRule, RejectedReading
+
+
+@admin.register(WaterUnit)
+class WaterUnitAdmin(admin.ModelAdmin):
+    list_display = ['id', 'name', 'location']
+
+
+@admin.register(WaterQuality)
+class WaterQualityAdmin(admin.ModelAdmin):
+    list_display = ['id', 'wu', 'date_time', 'tds']
+    list_select_related = ['wu']
+    # a dropdown of every unit per form is wasteful; take the id instead
+    raw_id_fields = ['wu']
+
+
+@admin.register(Maintenance)
+class MaintenanceAdmin(admin.ModelAdmin):
+    list_display = ['id', 'wu', 'datetime', 'problem', 'maintainer']
+    list_select_related = ['wu', 'maintainer']
+    raw_id_fields = ['wu', 'maintainer']
+
+
+@admin.register(AlertRule)
+class AlertRuleAdmin(admin.ModelAdmin):
+    list_display = ['id', 'wu', 'kind', 'threshold', 'hysteresis', 'is_active', 'firing']
+    list_filter = ['kind', 'is_active', 'firing']
+    raw_id_fields = ['wu']
+
+
+@admin.register(RejectedReading)
+class RejectedReadingAdmin(admin.ModelAdmin):
+    list_display = ['id', 'wu_id', 'date_time', 'tds', 'source', 'rejected_at']
+    list_filter = ['source']
@@ -0,0 +1,201 @@
+"""
+Alert rules evaluated on ingest.
+
+The Engine holds every active AlertRule in memory, grouped by unit, and
+checks each batch of readings once it has committed (`readings_ingested`):
+a dict lookup and a couple of float comparisons per reading, no queries.
+Only a change of state reaches the database. The rule's `firing` flag is
+flipped with a conditional UPDATE, so when several processes see the same
+crossing exactly one of them opens the Maintenance record.
+
+Rules are reloaded after they change in this process, and otherwise every
+ALERT_RULES_REFRESH seconds to pick up edits made elsewhere.
+
+A change that fails to persist is logged and the rules are reloaded from
+the database; it never stops the other `readings_ingested` receivers, which
+invalidate caches for readings that are already committed.
+
+`silent` rules cannot fire on ingest, since nothing arrives. `manage.py
+check_alerts` sweeps them against LatestReading, one query per sweep. The
+next reading for the unit clears them again.
+"""
+import logging
+import math
+import threading
+import time
+from collections import defaultdict
+from datetime import timedelta
+
+from django.conf import settings
+from django.db import transaction
+from django.db.models.signals import post_save, post_delete
+from django.dispatch import receiver
+from django.utils import timezone
+
+from .models import AlertRule, LatestReading, Maintenance
+from .signals import readings_ingested
+
+
+logger = logging.getLogger(__name__)
+
+
+def alert_rules_refresh():
+    return getattr(settings, 'ALERT_RULES_REFRESH', 30)
+
+
+class Rule:
+    """
+    In-memory form of an AlertRule. Both threshold kinds reduce to
+    `sign * tds` against two cut-offs; silent rules never fire here and
+    any reading clears them.
+    """
+    __slots__ = ('id', 'wu_id', 'kind', 'threshold', 'sign', 'fire_at', 'clear_at',
+                 'firing', 'created_at')
+
+    def __init__(self, id, wu_id, kind, threshold, hysteresis, firing, created_at):
+        self.id, self.wu_id, self.kind, self.threshold = id, wu_id, kind, threshold
+        self.firing, self.created_at = firing, created_at
+        if kind == AlertRule.SILENT:
+            self.sign, self.fire_at, self.clear_at = 0, math.inf, math.inf
+        else:
+            self.sign = 1 if kind == AlertRule.ABOVE else -1
+            self.fire_at = self.sign * threshold
+            self.clear_at = self.fire_at - abs(hysteresis)
+
+
+# ------------------------------------------------------
+#                        ENGINE
+# ------------------------------------------------------
+class Engine:
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.by_unit = {}
+        self.loaded_at = None
+        # newest reading time evaluated per unit; older stragglers are skipped
+        self.last_seen = {}
+
+    def load(self):
+        by_unit = defaultdict(list)
+        columns = ['id', 'wu_id', 'kind', 'threshold', 'hysteresis', 'firing', 'created_at']
+        for row in AlertRule.objects.filter(is_active=True).values_list(*columns):
+            rule = Rule(*row)
+            by_unit[rule.wu_id].append(rule)
+        with self.lock:
+            self.by_unit = {wu_id: tuple(rules) for wu_id, rules in by_unit.items()}
+            self.loaded_at = time.monotonic()
+
+    def invalidate(self):
+        with self.lock:
+            self.loaded_at = None
+
+    def rules(self):
+        if self.loaded_at is None or time.monotonic() - self.loaded_at > alert_rules_refresh():
+            self.load()
+        return self.by_unit
+
+    def evaluate(self, readings):
+        """[(rule, reading, firing)] state changes caused by `readings`, in order."""
+        by_unit = self.rules()
+        if not by_unit:
+            return []
+        last_seen = self.last_seen
+        changes = []
+        for reading in readings:
+            rules = by_unit.get(reading.wu_id)
+            if rules is None:
+                continue
+            seen = last_seen.get(reading.wu_id)
+            if seen is not None and reading.date_time < seen:
+                continue
+            last_seen[reading.wu_id] = reading.date_time
+            for rule in rules:
+                value = rule.sign * reading.tds
+                if rule.firing:
+                    if value < rule.clear_at:
+                        rule.firing = False
+                        changes.append((rule, reading, False))
+                elif value > rule.fire_at:
+                    rule.firing = True
+                    changes.append((rule, reading, True))
+        return changes
+
+    def silent_rules(self):
+        return [rule for rules in self.rules().values() for rule in rules if rule.sign == 0]
+
+
+engine = Engine()
+
+
+# ------------------------------------------------------
+#                      STATE CHANGES
+# ------------------------------------------------------
+def maintenance_for(rule, reading=None, last_seen=None):
+    if rule.kind == AlertRule.SILENT:
+        problem = f"No data for {rule.threshold:g} minutes"
+        since = timezone.localtime(last_seen).isoformat() if last_seen else "never"
+        description = f"Alert rule #{rule.id}: last reading {since}."
+    else:
+        problem = f"TDS {rule.kind} {rule.threshold:g}"
+        at = timezone.localtime(reading.date_time).isoformat()
+        description = f"Alert rule #{rule.id}: TDS {reading.tds:g} at {at}."
+    return Maintenance(
+        wu_id=rule.wu_id, datetime=timezone.now(), problem=problem,
+        description=f"{description} Opened automatically.",
+    )
+
+
+def apply_change(rule, firing, reading=None, last_seen=None):
+    """
+    Persist one change. Returns the Maintenance opened for a firing, or None
+    when another process got there first.
+    """
+    with transaction.atomic():
+        updated = (
+            AlertRule.objects.filter(pk=rule.id, firing=not firing)
+            .update(firing=firing, changed_at=timezone.now())
+        )
+        if not (updated and firing):
+            return None
+        record = maintenance_for(rule, reading, last_seen)
+        record.save()
+        return record
+
+
+@receiver(readings_ingested)
+def readings_written(sender, readings, **kwargs):
+    # already sent after commit
+    for rule, reading, firing in engine.evaluate(readings):
+        try:
+            apply_change(rule, firing, reading=reading)
+        except Exception:
+            logger.exception("Could not record alert rule #%s %s", rule.id,
+                             "firing" if firing else "clearing")
+            # the in-memory state ran ahead of the database
+            engine.invalidate()
+
+
+@receiver([post_save, post_delete], sender=AlertRule)
+def rule_changed(sender, **kwargs):
+    transaction.on_commit(engine.invalidate)
+
+
+def check_silence(now=None):
+    """Fire the silent rules whose unit has not reported in time; returns them."""
+    engine.load()
+    now = now or timezone.now()
+    rules = [rule for rule in engine.silent_rules() if not rule.firing]
+    if not rules:
+        return []
+    latest = dict(
+        LatestReading.objects.filter(wu_id__in={rule.wu_id for rule in rules})
+        .values_list('wu_id', 'date_time')
+    )
+    fired = []
+    for rule in rules:
+        last_seen = latest.get(rule.wu_id)
+        if now - (last_seen or rule.created_at) > timedelta(minutes=rule.threshold):
+            rule.firing = True
+            apply_change(rule, True, last_seen=last_seen)
+            fired.append(rule)
+    return fired
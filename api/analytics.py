@@ -0,0 +1,117 @@
+"""
+Vectorized TDS statistics over one unit's readings.
+
+Rows are pulled with `values_list` straight into NumPy arrays; no model
+instances are built and every statistic below is computed over whole
+arrays rather than per reading.
+"""
+import numpy as np
+from django.conf import settings
+
+from .exports import export_chunk_size
+
+
+SERIES_DTYPE = np.dtype([('t', 'f8'), ('tds', 'f8')])
+PERCENTILES = [5, 25, 50, 75, 95]
+
+
+def analytics_std_floor():
+    return getattr(settings, 'ANALYTICS_STD_FLOOR', 1.0)
+
+
+def load_series(queryset):
+    """(epoch seconds, tds) arrays for the queryset, oldest first."""
+    rows = (
+        queryset.order_by('date_time', 'id')
+        .values_list('date_time', 'tds')
+        .iterator(chunk_size=export_chunk_size())
+    )
+    series = np.fromiter(((stamp.timestamp(), tds) for stamp, tds in rows), dtype=SERIES_DTYPE)
+    return series['t'], series['tds']
+
+
+def rolling_mean_std(values, window):
+    """
+    Mean and standard deviation of the `window` readings *before* each
+    point (NaN until a full window is available), via cumulative sums.
+    """
+    n = len(values)
+    mean = np.full(n, np.nan)
+    std = np.full(n, np.nan)
+    if n <= window:
+        return mean, std
+
+    # shift by the overall mean to keep the sum-of-squares well conditioned
+    shifted = values - values.mean()
+    csum = np.concatenate(([0.0], np.cumsum(shifted)))
+    csq = np.concatenate(([0.0], np.cumsum(shifted * shifted)))
+
+    win_sum = csum[window:n] - csum[:n - window]
+    win_sq = csq[window:n] - csq[:n - window]
+    win_mean = win_sum / window
+    win_var = np.maximum(win_sq / window - win_mean * win_mean, 0.0)
+
+    mean[window:] = win_mean + values.mean()
+    std[window:] = np.sqrt(win_var)
+    return mean, std
+
+
+def zscores(values, mean, std, floor=None):
+    """
+    Deviation from the trailing window in units of its std, which is held
+    at no less than `floor`: a flat-lined window would otherwise make noise
+    infinitely surprising, or hide the spike that ends it.
+    """
+    floor = analytics_std_floor() if floor is None else floor
+    return (values - mean) / np.maximum(std, floor)
+
+
+def nan_to_none(values):
+    """List of floats with NaN replaced by None, for JSON output."""
+    return [None if np.isnan(v) else v for v in values.tolist()]
+
+
+def summarize(values):
+    if not len(values):
+        return None
+    cuts = np.percentile(values, PERCENTILES)
+    summary = {
+        "mean": float(values.mean()),
+        "std": float(values.std()),
+        "min": float(values.min()),
+        "max": float(values.max()),
+    }
+    summary.update({f"p{p}": float(v) for p, v in zip(PERCENTILES, cuts)})
+    return summary
+
+
+def analyze(times, values, window=60, z_threshold=3.0, low=None, high=None):
+    """
+    Summary statistics, trailing-window z-score anomalies and limit
+    breaches. Returns (result, series): `result` holds plain Python
+    containers whose point lists are (epoch seconds, tds, ...) tuples, and
+    `series` the full (times, tds, mean, std, z) arrays.
+    """
+    mean, std = rolling_mean_std(values, window)
+    z = zscores(values, mean, std)
+
+    anomalous = np.flatnonzero(np.abs(np.nan_to_num(z)) >= z_threshold)
+    result = {
+        "count": int(len(values)),
+        "summary": summarize(values),
+        "anomalies": [
+            (float(times[i]), float(values[i]), float(z[i])) for i in anomalous
+        ],
+    }
+
+    if low is not None or high is not None:
+        below = values < low if low is not None else np.zeros(len(values), bool)
+        above = values > high if high is not None else np.zeros(len(values), bool)
+        breached = np.flatnonzero(below | above)
+        result["breaches"] = {
+            "below": int(below.sum()),
+            "above": int(above.sum()),
+            "points": [(float(times[i]), float(values[i])) for i in breached],
+        }
+
+    return result, (times, values, mean, std, z)
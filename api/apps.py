@@ -4,3 +4,7 @@ from django.apps import AppConfig
 class ApiConfig(AppConfig):
     default_auto_field = 'django.db.models.BigAutoField'
     name = 'api'
+
+    def ready(self):
+        # connect signal receivers
+        from . import alerts, auth, db, live, metrics, search, status, versions  # noqa: F401
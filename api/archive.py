@@ -0,0 +1,242 @@
+"""
+Retention and archival of raw readings.
+
+Raw WaterQuality rows older than READINGS_RETENTION_DAYS are moved, one UTC
+day at a time, into gzip-compressed NDJSON files under ARCHIVE_DIR
+(`YYYY/MM/YYYY-MM-DD.<part>.ndjson.gz`, one `[id, wu, date_time, tds]`
+array per line, oldest first). The rollups keep archived days queryable at
+minute, hour and day resolution, and /export/ reads the archive for ranges
+reaching before the horizon, so callers need not know where a reading lives.
+
+A day is archived in three steps, each safe to repeat after a crash:
+
+1. its rollups are recomputed from the raw rows (before the first part),
+2. raw rows not yet in an archive part are written to a new part, which is
+   registered in ArchiveSegment once the file is complete on disk,
+3. the archived rows are deleted in batches of ARCHIVE_DELETE_BATCH, each
+   its own short transaction, so ingest never waits long on the table.
+
+Readings arriving late for an archived day stay in the table until the
+next run puts them in a further part. From the first part on,
+`rollups.rebuild` leaves the day alone: its rollups are all that is left.
+Editing or deleting a late reading recomputes that unit's day from its
+parts plus the rows still in the table (`rollups.rebuild_around`).
+"""
+import gzip
+import heapq
+import json
+import os
+from array import array
+from datetime import datetime, time, timedelta, timezone as dt_timezone
+from itertools import groupby
+
+from django.conf import settings
+from django.db.models import Count
+from django.db.models.functions import Trunc
+from django.utils import timezone
+
+from .exports import chunked, export_chunk_size
+from .models import ArchiveSegment, WaterQuality
+from .rollups import floor_day, ceil_day, rebuild
+from .versions import bump_readings
+
+
+COLUMNS = ['id', 'wu_id', 'date_time', 'tds']
+
+
+def archive_dir():
+    return getattr(settings, 'ARCHIVE_DIR', None)
+
+
+def retention_days():
+    return getattr(settings, 'READINGS_RETENTION_DAYS', None)
+
+
+def archive_delete_batch():
+    return getattr(settings, 'ARCHIVE_DELETE_BATCH', 5000)
+
+
+def retention_cutoff(days, now=None):
+    """Start of the oldest UTC day whose raw readings are kept."""
+    return floor_day((now or timezone.now()) - timedelta(days=days))
+
+
+def day_bounds(day):
+    start = datetime.combine(day, time.min, dt_timezone.utc)
+    return start, start + timedelta(days=1)
+
+
+def segment_path(day, part):
+    return f"{day:%Y/%m}/{day.isoformat()}.{part}.ndjson.gz"
+
+
+# ------------------------------------------------------
+#                    SEGMENT FILES
+# ------------------------------------------------------
+def write_part(directory, relpath, rows):
+    """
+    Write (id, wu_id, date_time, tds) rows to a new part file and make it
+    durable before it becomes visible. Returns (ids written, wu ids).
+    """
+    target = os.path.join(directory, relpath)
+    os.makedirs(os.path.dirname(target), exist_ok=True)
+    dumps = json.JSONEncoder(separators=(',', ':')).encode
+    ids, wu_ids = array('q'), set()
+
+    tmp = target + '.tmp'
+    with open(tmp, 'wb') as raw:
+        with gzip.GzipFile(fileobj=raw, mode='wb', mtime=0) as out:
+            for chunk in chunked(rows, export_chunk_size()):
+                lines = []
+                for row_id, wu_id, date_time, tds in chunk:
+                    ids.append(row_id)
+                    wu_ids.add(wu_id)
+                    lines.append(dumps([row_id, wu_id, date_time.isoformat(), tds]))
+                out.write(('\n'.join(lines) + '\n').encode())
+        raw.flush()
+        os.fsync(raw.fileno())
+
+    if not ids:
+        os.unlink(tmp)
+    else:
+        os.replace(tmp, target)
+    return ids, wu_ids
+
+
+def read_part(directory, relpath):
+    """Yield the (id, wu_id, date_time, tds) rows of one part file."""
+    with gzip.open(os.path.join(directory, relpath), 'rt', encoding='utf-8') as lines:
+        for line in lines:
+            row_id, wu_id, date_time, tds = json.loads(line)
+            yield row_id, wu_id, datetime.fromisoformat(date_time), tds
+
+
+# ------------------------------------------------------
+#                      ARCHIVING
+# ------------------------------------------------------
+def archive_day(day, directory=None, batch=None):
+    """
+    Move the raw readings of one UTC day into the archive and delete them.
+    Returns the number of readings archived by this call.
+    """
+    directory = directory or archive_dir()
+    batch = batch or archive_delete_batch()
+    start, end = day_bounds(day)
+    raw = WaterQuality.objects.filter(date_time__gte=start, date_time__lt=end)
+
+    parts = list(ArchiveSegment.objects.filter(day=day).order_by('part'))
+    if not parts:
+        rebuild(start, end)
+    # ids already archived by an earlier run that stopped before deleting them
+    archived, wu_ids = set(), set()
+    for previous in parts:
+        for row in read_part(directory, previous.path):
+            archived.add(row[0])
+            wu_ids.add(row[1])
+
+    part = parts[-1].part + 1 if parts else 1
+    relpath = segment_path(day, part)
+    rows = (
+        row for row in raw.order_by('date_time', 'id').values_list(*COLUMNS)
+        .iterator(chunk_size=export_chunk_size())
+        if row[0] not in archived
+    )
+    ids, written_wu_ids = write_part(directory, relpath, rows)
+    wu_ids |= written_wu_ids
+    if ids:
+        ArchiveSegment.objects.create(day=day, part=part, path=relpath, rows=len(ids))
+
+    # only rows known to be in a part, never a reading committed meanwhile
+    for chunk in chunked(sorted(archived.union(ids)), batch):
+        WaterQuality.objects.filter(id__in=chunk).delete()
+    if wu_ids:
+        bump_readings(wu_ids)
+    return len(ids)
+
+
+def days_to_archive(cutoff):
+    """[(day, readings)] for UTC days before `cutoff` that still hold raw readings."""
+    days = (
+        WaterQuality.objects.filter(date_time__lt=cutoff)
+        .annotate(day=Trunc('date_time', 'day', tzinfo=dt_timezone.utc))
+        .values('day').annotate(n=Count('id')).order_by('day')
+    )
+    return [(row['day'].date(), row['n']) for row in days]
+
+
+def archive_before(cutoff, directory=None, batch=None):
+    """Archive every day before `cutoff`, oldest first; yields (day, readings)."""
+    while True:
+        oldest = (
+            WaterQuality.objects.filter(date_time__lt=cutoff)
+            .order_by('date_time').values_list('date_time', flat=True).first()
+        )
+        if oldest is None:
+            return
+        day = floor_day(oldest).date()
+        yield day, archive_day(day, directory, batch)
+
+
+# ------------------------------------------------------
+#                       READING
+# ------------------------------------------------------
+def reading_matcher(wu_id=None, tds=None, min_tds=None, max_tds=None):
+    """Predicate over archived rows mirroring the water-quality filters."""
+    tests = []
+    if wu_id is not None:
+        tests.append(lambda row: row[1] == wu_id)
+    if tds is not None:
+        tds = float(tds)
+        tests.append(lambda row: row[3] == tds)
+    if min_tds is not None:
+        min_tds = float(min_tds)
+        tests.append(lambda row: row[3] >= min_tds)
+    if max_tds is not None:
+        max_tds = float(max_tds)
+        tests.append(lambda row: row[3] <= max_tds)
+    return lambda row: all(test(row) for test in tests)
+
+
+def archived_rows(start=None, end=None, match=None, descending=False, directory=None):
+    """
+    Archived (id, wu_id, date_time, tds) rows in [start, end) accepted by
+    `match`, ordered by (date_time, id). One day is held in memory at a time.
+    """
+    directory = directory or archive_dir()
+    segments = ArchiveSegment.objects.order_by('-day' if descending else 'day', 'part')
+    if start is not None:
+        segments = segments.filter(day__gte=floor_day(start).date())
+    if end is not None:
+        segments = segments.filter(day__lt=ceil_day(end).date())
+
+    for day, parts in groupby(segments, key=lambda segment: segment.day):
+        rows = [
+            row for part in parts for row in read_part(directory, part.path)
+            if (start is None or row[2] >= start) and (end is None or row[2] < end)
+            and (match is None or match(row))
+        ]
+        rows.sort(key=lambda row: (row[2], row[0]), reverse=descending)
+        yield from rows
+
+
+def with_archive(queryset, horizon, start=None, end=None, match=None, descending=False):
+    """
+    (id, wu_id, date_time, tds) rows of `queryset` together with the archived
+    rows in [start, end) accepted by `match`, in date_time order. Readings of
+    archived days still in the table (late arrivals) are merged in.
+    """
+    order = ['-date_time', '-id'] if descending else ['date_time', 'id']
+    chunk_size = export_chunk_size()
+    recent = queryset.filter(date_time__gte=horizon).order_by(*order).values_list(*COLUMNS)
+    late = queryset.filter(date_time__lt=horizon).order_by(*order).values_list(*COLUMNS)
+    old = heapq.merge(
+        late.iterator(chunk_size=chunk_size),
+        archived_rows(start, horizon if end is None else min(end, horizon), match, descending),
+        key=lambda row: (row[2], row[0]), reverse=descending,
+    )
+    if descending:
+        yield from recent.iterator(chunk_size=chunk_size)
+        yield from old
+    else:
+        yield from old
+        yield from recent.iterator(chunk_size=chunk_size)
@@ -1,9 +1,275 @@
-# auth.py
-from rest_framework.authentication import TokenAuthentication
+"""
+Request authentication without a per-request database lookup.
+
+One backend accepts every credential the API hands out:
+
+- `Authorization: Bearer <jwt>` (simplejwt, /api/auth/login/): the signature
+  and expiry are checked locally and the principal is built from claims.
+  Logged-out tokens are rejected through an in-memory denylist of `jti`s,
+  reloaded from RevokedToken every AUTH_DENYLIST_REFRESH seconds.
+  Refresh tokens carry no principal claims: each refresh reads them from
+  the account again, rotates the refresh token and blacklists the old one,
+  and logout blacklists the current one.
+- `Authorization: Token <key>` and the `auth_token` cookie (legacy DRF
+  tokens): looked up once, then served from an LRU cache for
+  AUTH_CACHE_TTL seconds. Deleting a token evicts it in this process;
+  other processes notice within the TTL.
+
+A browser sends the cookie along with cross-site requests as well, so
+requests authenticated by it must pass the CSRF check, exactly as
+SessionAuthentication does. Header credentials need no check.
+
+Principals are unsaved-looking Maintainer instances carrying id, name,
+email and is_admin, enough for permissions and foreign keys.
+"""
+import threading
+import time
+from collections import OrderedDict
+from datetime import datetime, timezone as dt_timezone
+
+from django.conf import settings
+from django.db.models.signals import post_delete
+from django.dispatch import receiver
+from django.utils import timezone
+from rest_framework import exceptions
+from rest_framework.authentication import BaseAuthentication, CSRFCheck, TokenAuthentication
+from rest_framework.authtoken.models import Token
+from rest_framework_simplejwt.exceptions import TokenError
+from rest_framework_simplejwt.serializers import TokenObtainPairSerializer, TokenRefreshSerializer
+from rest_framework_simplejwt.settings import api_settings
+from rest_framework_simplejwt.tokens import AccessToken, RefreshToken
+
+from .models import Maintainer, RevokedToken
+
+
+def auth_cache_ttl():
+    return getattr(settings, 'AUTH_CACHE_TTL', 60)
+
+
+def auth_cache_size():
+    return getattr(settings, 'AUTH_CACHE_SIZE', 10000)
+
+
+def auth_denylist_refresh():
+    return getattr(settings, 'AUTH_DENYLIST_REFRESH', 30)
+
+
+# ------------------------------------------------------
+#                      LRU + TTL
+# ------------------------------------------------------
+class TTLCache:
+    """Thread-safe LRU map whose entries also expire after `ttl` seconds."""
+
+    def __init__(self, size, ttl):
+        self.size = size
+        self.ttl = ttl
+        self.lock = threading.Lock()
+        self.entries = OrderedDict()
+
+    def get(self, key):
+        with self.lock:
+            entry = self.entries.get(key)
+            if entry is None:
+                return None
+            value, expires = entry
+            if expires <= time.monotonic():
+                del self.entries[key]
+                return None
+            self.entries.move_to_end(key)
+            return value
+
+    def set(self, key, value, ttl=None):
+        ttl = self.ttl if ttl is None else min(ttl, self.ttl)
+        with self.lock:
+            self.entries[key] = (value, time.monotonic() + ttl)
+            self.entries.move_to_end(key)
+            while len(self.entries) > self.size:
+                self.entries.popitem(last=False)
+
+    def pop(self, key):
+        with self.lock:
+            self.entries.pop(key, None)
+
+    def clear(self):
+        with self.lock:
+            self.entries.clear()
+
+
+principals = TTLCache(auth_cache_size(), auth_cache_ttl())
+
+
+def principal(user_id, name, email, is_admin):
+    user = Maintainer(id=user_id, name=name, email=email, is_admin=is_admin)
+    user._state.adding = False
+    user._state.db = 'default'
+    return user
+
+
+# ------------------------------------------------------
+#                   JWT REVOCATION
+# ------------------------------------------------------
+class Denylist:
+    """Revoked `jti`s still inside their lifetime, reloaded periodically."""
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.jtis = frozenset()
+        self.loaded_at = None
+
+    def refresh(self):
+        jtis = frozenset(
+            RevokedToken.objects.filter(expires_at__gt=timezone.now()).values_list('jti', flat=True)
+        )
+        with self.lock:
+            self.jtis, self.loaded_at = jtis, time.monotonic()
+
+    def __contains__(self, jti):
+        if self.loaded_at is None or time.monotonic() - self.loaded_at > auth_denylist_refresh():
+            self.refresh()
+        return jti in self.jtis
+
+    def add(self, jti):
+        with self.lock:
+            self.jtis = self.jtis | {jti}
+
+    def clear(self):
+        with self.lock:
+            self.jtis, self.loaded_at = frozenset(), None
+
+
+denylist = Denylist()
+
+
+def revoke_token(token):
+    """Reject an access token for the rest of its lifetime, in every process."""
+    jti = token['jti']
+    expires_at = datetime.fromtimestamp(token['exp'], dt_timezone.utc)
+    RevokedToken.objects.update_or_create(jti=jti, defaults={'expires_at': expires_at})
+    RevokedToken.objects.filter(expires_at__lte=timezone.now()).delete()
+    denylist.add(jti)
+
+
+def revoke_refresh_token(raw, access):
+    """Blacklist the refresh token that came with `access`, so it mints no more."""
+    if not raw:
+        raise exceptions.ValidationError({'refresh': ['This field is required.']})
+    try:
+        refresh = MaintainerRefreshToken(raw)
+    except TokenError as exc:
+        raise exceptions.ValidationError({'refresh': [str(exc)]})
+    claim = api_settings.USER_ID_CLAIM
+    if str(refresh[claim]) != str(access[claim]):
+        raise exceptions.ValidationError({'refresh': ['Token belongs to another account.']})
+    refresh.blacklist()
+
+
+class MaintainerRefreshToken(RefreshToken):
+    """
+    Access tokens carry what a principal needs, so no lookup is required.
+    The claims are read from the account whenever one is minted, never
+    copied from the refresh token, so a changed `is_admin` applies from
+    the next refresh.
+    """
+
+    @property
+    def access_token(self):
+        access = super().access_token
+        user = Maintainer.objects.get(id=self[api_settings.USER_ID_CLAIM])
+        access['name'] = user.name
+        access['email'] = user.email
+        access['is_admin'] = user.is_admin
+        return access
+
+
+class MaintainerTokenObtainPairSerializer(TokenObtainPairSerializer):
+    token_class = MaintainerRefreshToken
+
+
+class MaintainerTokenRefreshSerializer(TokenRefreshSerializer):
+    token_class = MaintainerRefreshToken
+
+    def validate(self, attrs):
+        try:
+            return super().validate(attrs)
+        except Maintainer.DoesNotExist:
+            raise exceptions.AuthenticationFailed(
+                self.error_messages['no_active_account'], 'no_active_account',
+            )
+
+
+# ------------------------------------------------------
+#                      BACKEND
+# ------------------------------------------------------
+class MaintainerAuthentication(BaseAuthentication):
+    keyword = 'Token'
+    cookie = 'auth_token'
 
-class CookieTokenAuthentication(TokenAuthentication):
     def authenticate(self, request):
-        token = request.COOKIES.get('auth_token')
-        if not token:
+        header = request.META.get('HTTP_AUTHORIZATION', '').split()
+        if header and header[0] == 'Bearer':
+            return self.authenticate_jwt(self.single_credential(header))
+        if header and header[0] == self.keyword:
+            return self.authenticate_key(self.single_credential(header))
+        key = request.COOKIES.get(self.cookie)
+        if key:
+            # checked on every request, before the principal cache
+            self.enforce_csrf(request)
+            return self.authenticate_key(key)
+        return None
+
+    def enforce_csrf(self, request):
+        """Same check as SessionAuthentication.enforce_csrf."""
+        def dummy_get_response(request):  # pragma: no cover
             return None
-        return self.authenticate_credentials(token)
+
+        check = CSRFCheck(dummy_get_response)
+        check.process_request(request)
+        reason = check.process_view(request, None, (), {})
+        if reason:
+            raise exceptions.PermissionDenied(f'CSRF Failed: {reason}')
+
+    def authenticate_header(self, request):
+        return self.keyword
+
+    def single_credential(self, header):
+        if len(header) != 2:
+            raise exceptions.AuthenticationFailed('Invalid token header.')
+        return header[1]
+
+    def authenticate_jwt(self, raw):
+        cached = principals.get(('jwt', raw))
+        if cached is None:
+            try:
+                token = AccessToken(raw)
+            except TokenError as exc:
+                raise exceptions.AuthenticationFailed(str(exc))
+            if 'email' not in token:
+                raise exceptions.AuthenticationFailed('Token has no principal claims.')
+            user = principal(
+                int(token['user_id']), token['name'], token['email'], token['is_admin']
+            )
+            cached = (user, token)
+            principals.set(('jwt', raw), cached, ttl=token['exp'] - time.time())
+
+        user, token = cached
+        if token['jti'] in denylist:
+            raise exceptions.AuthenticationFailed('Token has been revoked.')
+        return cached
+
+    def authenticate_key(self, key):
+        cached = principals.get(('key', key))
+        if cached is None:
+            user, token = TokenAuthentication().authenticate_credentials(key)
+            cached = (principal(user.id, user.name, user.email, user.is_admin), token)
+            principals.set(('key', key), cached)
+        return cached
+
+
+class CookieTokenAuthentication(MaintainerAuthentication):
+    """Legacy name: the `auth_token` cookie is handled by the unified backend."""
+
+
+@receiver(post_delete, sender=Token)
+def evict_token(sender, instance, **kwargs):
+    # also runs when a Maintainer is deleted, through the cascade
+    principals.pop(('key', instance.key))
@@ -0,0 +1,168 @@
+"""
+Server-side cache of rendered list/retrieve responses.
+
+Entries are stored under a key built from the view, the normalized query
+parameters and the accepted format, together with the version counters
+(see versions.py) they were rendered under. A write bumps only the scopes
+it touches, so a new reading for unit 7 leaves unit 3's pages valid.
+
+That only holds while every process sees every bump, so the cache is
+bypassed when the version counters are per process (see
+versions.versions_shared); the entries themselves may live in any cache.
+"""
+import threading
+from collections import Counter, OrderedDict
+from hashlib import blake2b
+
+from django.conf import settings
+from django.core.cache import caches
+from django.http import HttpResponse
+
+from .versions import get_versions, versions_shared
+
+
+def response_cache():
+    return caches[getattr(settings, 'RESPONSE_CACHE_ALIAS', 'default')]
+
+
+def response_cache_timeout():
+    return getattr(settings, 'RESPONSE_CACHE_TIMEOUT', 300)
+
+
+# ------------------------------------------------------
+#                       STATISTICS
+# ------------------------------------------------------
+class CacheStats:
+    """
+    Process-local counters. An eviction is a miss on a key this process
+    stored earlier and that was not invalidated in between.
+    """
+    remembered = 10000
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.counts = Counter()
+        self.stored = OrderedDict()
+
+    def record(self, outcome, key=None):
+        with self.lock:
+            if outcome == 'miss' and key in self.stored:
+                outcome = 'eviction'
+                del self.stored[key]
+            self.counts[outcome] += 1
+
+    def remember(self, key):
+        with self.lock:
+            self.stored[key] = True
+            self.stored.move_to_end(key)
+            if len(self.stored) > self.remembered:
+                self.stored.popitem(last=False)
+
+    def snapshot(self):
+        with self.lock:
+            counts = dict(self.counts)
+        lookups = sum(counts.get(k, 0) for k in ('hit', 'miss', 'stale', 'eviction'))
+        return {
+            "hits": counts.get('hit', 0),
+            "misses": counts.get('miss', 0),
+            "stale": counts.get('stale', 0),
+            "evictions": counts.get('eviction', 0),
+            "stores": counts.get('store', 0),
+            "hit_ratio": round(counts.get('hit', 0) / lookups, 4) if lookups else None,
+        }
+
+    def reset(self):
+        with self.lock:
+            self.counts.clear()
+            self.stored.clear()
+
+
+stats = CacheStats()
+
+
+# ------------------------------------------------------
+#                  VIEWSET INTEGRATION
+# ------------------------------------------------------
+class ResponseCacheMixin:
+    """
+    Serve list/retrieve from pre-rendered JSON bytes. Views define
+    `get_version_scopes(request)`; entries rendered under older versions of
+    those scopes are treated as stale.
+    """
+    cached_actions = ('list', 'retrieve')
+    cache_query_params = (
+        'ordering', 'cursor', 'page_size', 'downsample', 'method', 'format', 'expand',
+    )
+
+    def cache_timeout(self):
+        return response_cache_timeout()
+
+    def is_cacheable(self, request):
+        return (
+            versions_shared()
+            and request.method == 'GET'
+            and self.action in self.cached_actions
+            and getattr(request, 'accepted_renderer', None) is not None
+            and request.accepted_renderer.format == 'json'
+        )
+
+    def response_cache_key(self, request):
+        known = set(self.cache_query_params)
+        filterset_class = getattr(self, 'filterset_class', None)
+        if filterset_class is not None:
+            known.update(filterset_class.base_filters)
+
+        params = sorted(
+            (name, value.strip())
+            for name, values in request.query_params.lists() if name in known
+            for value in values if value.strip()
+        )
+        raw = repr((
+            self.basename, self.action, request.get_host(),
+            sorted(self.kwargs.items()), params,
+        ))
+        return 'resp:' + blake2b(raw.encode(), digest_size=16).hexdigest()
+
+    def cached_response(self, handler, request, *args, **kwargs):
+        if not self.is_cacheable(request):
+            return handler(request, *args, **kwargs)
+
+        cache = response_cache()
+        key = self.response_cache_key(request)
+        versions = get_versions(self.get_version_scopes(request))
+
+        entry = cache.get(key)
+        if entry is not None and entry[0] == versions:
+            stats.record('hit')
+            response = HttpResponse(entry[2], content_type=entry[1])
+            response['X-Cache'] = 'HIT'
+            return response
+        stats.record('stale' if entry is not None else 'miss', key)
+
+        response = handler(request, *args, **kwargs)
+        if response.status_code == 200:
+            # versions are read before the query runs, so cached data is
+            # never older than the versions it is labelled with
+            self.pending_cache_entry = (key, versions)
+        response['X-Cache'] = 'MISS'
+        return response
+
+    def finalize_response(self, request, response, *args, **kwargs):
+        response = super().finalize_response(request, response, *args, **kwargs)
+        pending = getattr(self, 'pending_cache_entry', None)
+        if pending is not None:
+            key, versions = pending
+            response.render()
+            response_cache().set(
+                key, (versions, response['Content-Type'], response.content),
+                self.cache_timeout(),
+            )
+            stats.record('store')
+            stats.remember(key)
+        return response
+
+    def list(self, request, *args, **kwargs):
+        return self.cached_response(super().list, request, *args, **kwargs)
+
+    def retrieve(self, request, *args, **kwargs):
+        return self.cached_response(super().retrieve, request, *args, **kwargs)
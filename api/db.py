@@ -0,0 +1,19 @@
+"""
+Per-connection database setup.
+
+SQLite keeps most tuning per connection, so SQLITE_PRAGMAS are applied
+every time Django opens one. With persistent connections (CONN_MAX_AGE)
+that is once per worker thread rather than once per request.
+"""
+from django.conf import settings
+from django.db.backends.signals import connection_created
+from django.dispatch import receiver
+
+
+@receiver(connection_created)
+def configure_sqlite(sender, connection, **kwargs):
+    if connection.vendor != 'sqlite':
+        return
+    with connection.cursor() as cursor:
+        for name, value in getattr(settings, 'SQLITE_PRAGMAS', {}).items():
+            cursor.execute(f"PRAGMA {name} = {value}")
@@ -0,0 +1,136 @@
+"""
+Reduce a TDS series to at most `n` points per unit in a single pass.
+
+All three methods consume rows oldest first and work on plain
+(id, wu_id, date_time, tds) tuples, the same shape the export path uses.
+
+- minmax: per bucket, the lowest and highest reading (peaks survive)
+- avg:    per bucket, one synthetic point at the mean time and mean tds
+          (id is None)
+- lttb:   Largest-Triangle-Three-Buckets. Picking a point needs the mean of
+          the *next* bucket, so at most two buckets are held in memory at
+          any time: O(count / n) per unit, independent of the range length.
+"""
+from datetime import datetime, timezone as dt_timezone
+from itertools import groupby
+
+from django.db.models import Count
+
+from .exports import export_chunk_size
+
+
+METHODS = ['lttb', 'minmax', 'avg']
+
+ID, WU, DATE_TIME, TDS = range(4)
+
+
+def bucket_of(index, count, buckets):
+    return min(index * buckets // count, buckets - 1)
+
+
+def minmax(rows, count, n):
+    buckets = max(n // 2, 1)
+    for _, bucket in groupby(enumerate(rows), key=lambda item: bucket_of(item[0], count, buckets)):
+        low = high = None
+        for _, row in bucket:
+            if low is None or row[TDS] < low[TDS]:
+                low = row
+            if high is None or row[TDS] > high[TDS]:
+                high = row
+        if low is high:
+            yield low
+        else:
+            yield from sorted((low, high), key=lambda row: row[DATE_TIME])
+
+
+def average(rows, count, n):
+    for _, bucket in groupby(enumerate(rows), key=lambda item: bucket_of(item[0], count, n)):
+        size = t_sum = tds_sum = 0
+        for _, row in bucket:
+            size += 1
+            t_sum += row[DATE_TIME].timestamp()
+            tds_sum += row[TDS]
+        yield (None, row[WU], datetime.fromtimestamp(t_sum / size, dt_timezone.utc), tds_sum / size)
+
+
+def lttb(rows, count, n):
+    if count <= n:
+        yield from rows
+        return
+    if n < 3:
+        # no room for inner buckets: just the end points
+        first = last = None
+        for row in rows:
+            first = first or row
+            last = row
+        if first is not None:
+            yield first
+            if n == 2 and last is not first:
+                yield last
+        return
+
+    def mean_point(bucket):
+        return (
+            sum(row[DATE_TIME].timestamp() for row in bucket) / len(bucket),
+            sum(row[TDS] for row in bucket) / len(bucket),
+        )
+
+    def pick(bucket, anchor, target):
+        ax, ay = anchor[DATE_TIME].timestamp(), anchor[TDS]
+        cx, cy = target
+        return max(
+            bucket,
+            key=lambda row: abs((ax - cx) * (row[TDS] - ay) - (ax - row[DATE_TIME].timestamp()) * (cy - ay)),
+        )
+
+    rows = iter(rows)
+    anchor = next(rows, None)
+    if anchor is None:
+        return
+    yield anchor
+
+    # first and last points are kept as-is; the rest is split into n - 2 buckets
+    inner, buckets = max(count - 2, 1), n - 2
+    previous, current, current_index = None, [], 0
+    for index, row in enumerate(rows):
+        b = bucket_of(index, inner, buckets)
+        if b != current_index and current:
+            if previous:
+                anchor = pick(previous, anchor, mean_point(current))
+                yield anchor
+            previous, current, current_index = current, [], b
+        current.append(row)
+
+    last = current.pop() if current else (previous.pop() if previous else None)
+    if last is None:
+        return
+    if previous:
+        anchor = pick(previous, anchor, mean_point(current) if current else
+                      (last[DATE_TIME].timestamp(), last[TDS]))
+        yield anchor
+    if current:
+        yield pick(current, anchor, (last[DATE_TIME].timestamp(), last[TDS]))
+    yield last
+
+
+# ------------------------------------------------------
+#                   QUERYSET ENTRY POINT
+# ------------------------------------------------------
+def downsample(queryset, n, method='lttb'):
+    """
+    Yield (id, wu_id, date_time, tds) tuples for the queryset, reduced to at
+    most `n` points per unit, unit by unit, oldest first within a unit.
+    """
+    reduce = {'lttb': lttb, 'minmax': minmax, 'avg': average}[method]
+    counts = dict(
+        queryset.order_by().values('wu_id').annotate(n=Count('id')).values_list('wu_id', 'n')
+    )
+
+    # (wu DESC, date_time ASC) is a backward scan of the (wu, -date_time) index
+    rows = (
+        queryset.order_by('-wu_id', 'date_time', 'id')
+        .values_list('id', 'wu_id', 'date_time', 'tds')
+        .iterator(chunk_size=export_chunk_size())
+    )
+    for wu_id, unit_rows in groupby(rows, key=lambda row: row[WU]):
+        yield from reduce(unit_rows, counts.get(wu_id, 0) or 1, n)
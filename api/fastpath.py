@@ -0,0 +1,120 @@
+"""
+Serializer-free list rendering.
+
+For a read-only list, a ModelSerializer does little more than copy a few
+columns and format datetimes, yet pays for its full field machinery on
+every row. `row_encoder` inspects a serializer class once and builds a
+function that turns a `values()` dict into the very same dict the
+serializer would produce, so the rendered bytes are identical.
+"""
+from django.conf import settings
+from django.core.exceptions import FieldDoesNotExist
+from rest_framework import serializers
+from rest_framework.response import Response
+
+from .exports import format_datetime
+
+
+def nullable(convert):
+    return lambda value: None if value is None else convert(value)
+
+
+# field class -> conversion applied to the raw column value (None = as is)
+CONVERTERS = {
+    serializers.DateTimeField: format_datetime,  # passes None through
+    serializers.PrimaryKeyRelatedField: None,
+    serializers.ReadOnlyField: None,
+    serializers.IntegerField: nullable(int),
+    serializers.FloatField: nullable(float),
+    serializers.CharField: None,
+    serializers.EmailField: None,
+    serializers.BooleanField: nullable(bool),
+}
+
+_encoders = {}
+
+
+def fast_list_enabled():
+    return getattr(settings, 'FAST_LIST_SERIALIZATION', True)
+
+
+class RowEncoder:
+    def __init__(self, columns, encode):
+        self.columns = columns
+        self.encode = encode
+
+    def encode_many(self, rows):
+        encode = self.encode
+        return [encode(row) for row in rows]
+
+
+def build_encoder(serializer):
+    """
+    Build a RowEncoder for an instantiated serializer, or None if any of
+    its readable fields needs more than a column copy.
+    """
+    model = serializer.Meta.model
+    columns, fields = [], []
+
+    for name, field in serializer.fields.items():
+        if field.write_only:
+            continue
+        if type(field) not in CONVERTERS or '.' in field.source or field.source == '*':
+            return None
+        # custom output formats, timezones or pk fields are left to DRF
+        if any(hasattr(field, attr) for attr in ('format', 'timezone')):
+            return None
+        if getattr(field, 'pk_field', None) is not None:
+            return None
+        try:
+            column = model._meta.get_field(field.source).attname
+        except FieldDoesNotExist:
+            return None
+
+        columns.append(column)
+        fields.append((name, column, CONVERTERS[type(field)]))
+
+    def encode(row):
+        return {
+            name: row[column] if convert is None else convert(row[column])
+            for name, column, convert in fields
+        }
+    return RowEncoder(columns, encode)
+
+
+def row_encoder(serializer_class):
+    if serializer_class not in _encoders:
+        _encoders[serializer_class] = build_encoder(serializer_class())
+    return _encoders[serializer_class]
+
+
+# ------------------------------------------------------
+#                  VIEWSET INTEGRATION
+# ------------------------------------------------------
+class FastListMixin:
+    """
+    Opt-in: `fast_list()` renders the list from `values()` rows through a
+    precomputed row encoder, or returns None when the request needs the
+    regular serializer (expanded relations, unsupported fields, ...).
+    """
+
+    def fast_list(self, request):
+        if not fast_list_enabled() or request.query_params.get('expand'):
+            return None
+        encoder = row_encoder(self.get_serializer_class())
+        if encoder is None:
+            return None
+
+        queryset = self.filter_queryset(self.get_queryset())
+        # annotations (a search rank) stay selected for the pagination keys
+        queryset = queryset.values(*encoder.columns, *queryset.query.annotations)
+        page = self.paginate_queryset(queryset)
+        if page is not None:
+            return self.get_paginated_response(encoder.encode_many(page))
+        return Response(encoder.encode_many(queryset.iterator()))
+
+    def list(self, request, *args, **kwargs):
+        response = self.fast_list(request)
+        if response is None:
+            response = super().list(request, *args, **kwargs)
+        return response
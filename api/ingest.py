@@ -0,0 +1,198 @@
+from datetime import datetime, timedelta, timezone as dt_timezone
+
+import numpy as np
+from django.conf import settings
+from django.db import DataError, IntegrityError, transaction
+from django.utils import timezone
+
+from .models import WaterUnit, WaterQuality, RejectedReading
+from .rollups import apply_readings
+from .status import apply_latest
+from .serializers import WaterQualityReadingSerializer
+from .signals import readings_ingested
+
+
+def ingest_batch_size():
+    return getattr(settings, 'INGEST_BATCH_SIZE', 1000)
+
+
+def ingest_max_rows():
+    return getattr(settings, 'INGEST_MAX_ROWS', 10000)
+
+
+# ------------------------------------------------------
+#                     VALIDATION
+# ------------------------------------------------------
+def validate_readings(rows):
+    """
+    Validate a batch of raw reading dicts in one pass.
+
+    Returns (readings, errors): unsaved WaterQuality instances for the good
+    rows and a list of {"index", "errors"} for the bad ones. All `wu` ids are
+    resolved with a single query.
+    """
+    now = timezone.now()
+    candidates = []
+    errors = []
+
+    for index, row in enumerate(rows):
+        serializer = WaterQualityReadingSerializer(data=row)
+        if serializer.is_valid():
+            candidates.append((index, serializer.validated_data))
+        else:
+            errors.append({"index": index, "errors": serializer.errors})
+
+    known_units = set(
+        WaterUnit.objects
+        .filter(pk__in={data['wu'] for _, data in candidates})
+        .values_list('pk', flat=True)
+    )
+
+    readings = []
+    for index, data in candidates:
+        if data['wu'] not in known_units:
+            errors.append({
+                "index": index,
+                "errors": {"wu": [f'Invalid pk "{data["wu"]}" - object does not exist.']},
+            })
+            continue
+        readings.append(WaterQuality(
+            wu_id=data['wu'],
+            tds=data['tds'],
+            date_time=data.get('date_time') or now,
+        ))
+
+    errors.sort(key=lambda e: e["index"])
+    return readings, errors
+
+
+EPOCH = datetime(1970, 1, 1, tzinfo=dt_timezone.utc)
+# epoch milliseconds that still fit a datetime (years 1-9999)
+EPOCH_MS_MIN = (datetime.min.replace(tzinfo=dt_timezone.utc) - EPOCH) // timedelta(milliseconds=1)
+EPOCH_MS_MAX = (datetime.max.replace(tzinfo=dt_timezone.utc) - EPOCH) // timedelta(milliseconds=1)
+
+
+def validate_packed(packed):
+    """
+    `validate_readings` for a PackedReadings batch (see parsers.py): the
+    checks run over whole columns, and only the good rows become
+    WaterQuality instances.
+    """
+    wu, epoch_ms, tds = packed
+    bad = {
+        "wu": wu < 1,
+        "tds": ~np.isfinite(tds),
+        "date_time": (epoch_ms < EPOCH_MS_MIN) | (epoch_ms > EPOCH_MS_MAX),
+    }
+    messages = {
+        "wu": "Ensure this value is greater than or equal to 1.",
+        "tds": "A valid number is required.",
+        "date_time": "Datetime out of range.",
+    }
+
+    ok = ~(bad["wu"] | bad["tds"] | bad["date_time"])
+    known_units = set(
+        WaterUnit.objects.filter(pk__in=np.unique(wu[ok]).tolist()).values_list('pk', flat=True)
+    )
+    bad["wu_missing"] = ok & ~np.isin(wu, list(known_units))
+
+    errors = []
+    for index in np.flatnonzero(~ok | bad["wu_missing"]).tolist():
+        if bad["wu_missing"][index]:
+            row_errors = {"wu": [f'Invalid pk "{wu[index]}" - object does not exist.']}
+        else:
+            row_errors = {
+                field: [message] for field, message in messages.items() if bad[field][index]
+            }
+        errors.append({"index": index, "errors": row_errors})
+
+    good = np.flatnonzero(ok & ~bad["wu_missing"])
+    readings = [
+        WaterQuality(wu_id=unit, tds=value, date_time=EPOCH + timedelta(milliseconds=ms))
+        for unit, ms, value in zip(
+            wu[good].tolist(), epoch_ms[good].tolist(), tds[good].tolist()
+        )
+    ]
+    return readings, errors
+
+
+# ------------------------------------------------------
+#                       WRITES
+# ------------------------------------------------------
+def write_readings(readings, batch_size=None):
+    """
+    Insert WaterQuality instances in chunks inside one transaction and
+    announce them through `readings_ingested` once committed.
+    """
+    if not readings:
+        return readings
+
+    batch_size = batch_size or ingest_batch_size()
+    with transaction.atomic():
+        WaterQuality.objects.bulk_create(readings, batch_size=batch_size)
+        record_readings(readings)
+    return readings
+
+
+def record_readings(readings):
+    """
+    Bookkeeping for freshly inserted readings; call inside the transaction
+    that inserted them.
+    """
+    apply_readings(readings)
+    apply_latest(readings)
+    announce_readings(readings)
+
+
+def announce_readings(readings):
+    """Send `readings_ingested` when the current transaction commits."""
+    transaction.on_commit(
+        lambda: readings_ingested.send(sender=WaterQuality, readings=readings)
+    )
+
+
+# ------------------------------------------------------
+#                       REJECTS
+# ------------------------------------------------------
+def unsaved(readings):
+    """Reset instances a rolled back bulk_create left with ids."""
+    for reading in readings:
+        reading.pk = None
+        reading._state.adding = True
+    return readings
+
+
+def reject(reading, source, error):
+    RejectedReading.objects.create(
+        wu_id=reading.wu_id, date_time=reading.date_time, tds=reading.tds,
+        source=source, error=error,
+    )
+
+
+def write_each(readings, source, errors=(IntegrityError, DataError)):
+    """
+    Write readings one at a time after their combined write failed. Rows
+    failing with one of `errors` are kept in RejectedReading; anything else
+    propagates. Inside a transaction each row gets a savepoint. Returns
+    (written, rejected).
+    """
+    # foreign keys are only checked at commit, which a savepoint never
+    # reaches, so readings of units deleted since are picked out up front
+    known_units = set(
+        WaterUnit.objects
+        .filter(pk__in={reading.wu_id for reading in readings})
+        .values_list('pk', flat=True)
+    )
+    written = rejected = 0
+    for reading in unsaved(readings):
+        if reading.wu_id not in known_units:
+            reject(reading, source, f'Invalid pk "{reading.wu_id}" - object does not exist.')
+            rejected += 1
+            continue
+        try:
+            write_readings([reading])
+            written += 1
+        except errors as exc:
+            reject(reading, source, str(exc))
+            rejected += 1
+    return written, rejected
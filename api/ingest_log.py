@@ -0,0 +1,308 @@
+"""
+Local write-ahead log for ingest.
+
+With `INGEST_LOG_DIR` set, the bulk endpoint appends validated readings to
+a segment file in that directory and answers once the bytes are on disk,
+instead of waiting for the database. `drain_ingest_log` applies the
+segments to WaterQuality in large transactions.
+
+Segment files are named `<start ns>-<pid>.open` while a process appends
+to them and renamed to `.log` once sealed (size limit or clean shutdown).
+Each record is one request's readings:
+
+    u32 payload length | u32 crc32(payload) | payload
+
+and the payload is packed (u32 wu_id, i64 epoch microseconds, f64 tds)
+tuples. A torn record at the tail of a segment (crash mid-write) fails
+the length or CRC check and everything from there on is ignored.
+
+Concurrent appends share fsyncs: a writer whose bytes were already covered
+by another thread's fsync returns without calling it again.
+
+A batch that cannot be written as a whole is applied row by row; rows that
+can never be written (e.g. their unit was deleted) go to RejectedReading
+in the same transaction as the checkpoint, so the drainer moves past them.
+"""
+import atexit
+import fcntl
+import logging
+import os
+import struct
+import threading
+import time
+import zlib
+from contextlib import contextmanager
+from datetime import datetime, timedelta, timezone as dt_timezone
+
+from django.conf import settings
+from django.db import DataError, IntegrityError, transaction
+
+from .ingest import write_each, write_readings
+from .models import WaterQuality, IngestLogCheckpoint
+
+
+RECORD_HEADER = struct.Struct('<II')
+READING = struct.Struct('<Iqd')
+OPEN, SEALED = '.open', '.log'
+
+EPOCH = datetime(1970, 1, 1, tzinfo=dt_timezone.utc)
+MICROSECOND = timedelta(microseconds=1)
+
+logger = logging.getLogger(__name__)
+
+
+def ingest_log_dir():
+    return getattr(settings, 'INGEST_LOG_DIR', None)
+
+
+def ingest_log_segment_bytes():
+    return getattr(settings, 'INGEST_LOG_SEGMENT_BYTES', 8 * 1024 * 1024)
+
+
+def ingest_log_drain_batch():
+    return getattr(settings, 'INGEST_LOG_DRAIN_BATCH', 50000)
+
+
+# ------------------------------------------------------
+#                        RECORDS
+# ------------------------------------------------------
+def encode(readings):
+    payload = b''.join(
+        READING.pack(r.wu_id, (r.date_time - EPOCH) // MICROSECOND, r.tds) for r in readings
+    )
+    return RECORD_HEADER.pack(len(payload), zlib.crc32(payload)) + payload
+
+
+def decode(payload):
+    return [
+        WaterQuality(wu_id=wu_id, date_time=EPOCH + timedelta(microseconds=us), tds=tds)
+        for wu_id, us, tds in READING.iter_unpack(payload)
+    ]
+
+
+def read_records(path, offset=0):
+    """Yield (end offset, payload) for each intact record after `offset`."""
+    with open(path, 'rb') as f:
+        f.seek(offset)
+        while True:
+            header = f.read(RECORD_HEADER.size)
+            if len(header) < RECORD_HEADER.size:
+                return
+            length, crc = RECORD_HEADER.unpack(header)
+            payload = f.read(length)
+            if len(payload) < length or zlib.crc32(payload) != crc or length % READING.size:
+                return
+            offset += RECORD_HEADER.size + length
+            yield offset, payload
+
+
+def fsync_dir(directory):
+    fd = os.open(directory, os.O_RDONLY)
+    try:
+        os.fsync(fd)
+    finally:
+        os.close(fd)
+
+
+# ------------------------------------------------------
+#                        WRITER
+# ------------------------------------------------------
+class Segment:
+
+    def __init__(self, directory):
+        self.name = f"{time.time_ns():020d}-{os.getpid()}"
+        self.path = os.path.join(directory, self.name + OPEN)
+        self.file = open(self.path, 'ab')
+        self.written = 0
+        self.synced = 0
+        self.sync_lock = threading.Lock()
+        fsync_dir(directory)
+
+    def sync(self, target):
+        with self.sync_lock:
+            if self.synced >= target:
+                return
+            end = self.written
+            os.fsync(self.file.fileno())
+            self.synced = end
+
+    def seal(self):
+        with self.sync_lock:
+            self.file.flush()
+            os.fsync(self.file.fileno())
+            self.synced = self.written
+            self.file.close()
+        sealed = self.path[:-len(OPEN)] + SEALED
+        os.rename(self.path, sealed)
+        fsync_dir(os.path.dirname(self.path))
+        self.path = sealed
+
+
+class IngestLog:
+    """Append-only segment writer for one process; safe across threads."""
+
+    def __init__(self, directory, segment_bytes=None):
+        self.directory = directory
+        self.segment_bytes = segment_bytes or ingest_log_segment_bytes()
+        self.pid = os.getpid()
+        self.lock = threading.Lock()
+        self.segment = None
+        os.makedirs(directory, exist_ok=True)
+
+    def append(self, readings):
+        """Write one record and return once it is durable."""
+        record = encode(readings)
+        with self.lock:
+            if self.segment is None or self.segment.written >= self.segment_bytes:
+                if self.segment is not None:
+                    self.segment.seal()
+                self.segment = Segment(self.directory)
+            segment = self.segment
+            segment.file.write(record)
+            segment.file.flush()
+            segment.written += len(record)
+            target = segment.written
+        segment.sync(target)
+
+    def close(self):
+        with self.lock:
+            if self.segment is not None:
+                self.segment.seal()
+                self.segment = None
+
+
+_log = None
+_log_lock = threading.Lock()
+
+
+def get_log():
+    global _log
+    with _log_lock:
+        directory = ingest_log_dir()
+        # a forked worker must not share its parent's segment
+        if _log is None or _log.directory != directory or _log.pid != os.getpid():
+            _log = IngestLog(directory)
+        return _log
+
+
+def append_readings(readings):
+    if readings:
+        get_log().append(readings)
+    return readings
+
+
+@atexit.register
+def close_log():
+    if _log is not None and _log.pid == os.getpid():
+        _log.close()
+
+
+# ------------------------------------------------------
+#                   DRAINING / RECOVERY
+# ------------------------------------------------------
+def list_segments(directory):
+    """(name, path, sealed) for every segment, oldest first."""
+    found = []
+    for filename in os.listdir(directory):
+        name, ext = os.path.splitext(filename)
+        if ext in (OPEN, SEALED):
+            found.append((name, os.path.join(directory, filename), ext == SEALED))
+    return sorted(found)
+
+
+def owner_alive(name):
+    pid = int(name.rsplit('-', 1)[1])
+    try:
+        os.kill(pid, 0)
+    except ProcessLookupError:
+        return False
+    except PermissionError:
+        pass
+    return True
+
+
+def recover(directory=None):
+    """
+    Seal open segments left behind by dead processes, cutting off a torn
+    tail record. Returns the names of the recovered segments.
+    """
+    directory = directory or ingest_log_dir()
+    recovered = []
+    for name, path, sealed in list_segments(directory):
+        if sealed or owner_alive(name):
+            continue
+        end = 0
+        for end, _ in read_records(path):
+            pass
+        with open(path, 'r+b') as f:
+            f.truncate(end)
+            os.fsync(f.fileno())
+        os.rename(path, os.path.join(directory, name + SEALED))
+        recovered.append(name)
+    if recovered:
+        fsync_dir(directory)
+    return recovered
+
+
+@contextmanager
+def drain_lock(directory):
+    """Only one drainer may apply a directory at a time."""
+    with open(os.path.join(directory, 'drain.lock'), 'w') as f:
+        fcntl.flock(f, fcntl.LOCK_EX)
+        try:
+            yield
+        finally:
+            fcntl.flock(f, fcntl.LOCK_UN)
+
+
+def apply(name, readings, offset):
+    """Write `readings` and move the checkpoint to `offset`; returns the rows written."""
+    try:
+        with transaction.atomic():
+            write_readings(readings)
+            IngestLogCheckpoint.objects.filter(segment=name).update(offset=offset)
+        return len(readings)
+    except (IntegrityError, DataError):
+        logger.warning("Batch of %d readings from %s failed, applying row by row",
+                       len(readings), name, exc_info=True)
+
+    with transaction.atomic():
+        written, rejected = write_each(readings, f'ingest-log:{name}')
+        IngestLogCheckpoint.objects.filter(segment=name).update(offset=offset)
+    if rejected:
+        logger.error("Rejected %d readings from %s, see RejectedReading", rejected, name)
+    return written
+
+
+def drain(directory=None, batch=None):
+    """
+    Apply every intact record not yet applied, `batch` readings per
+    transaction, and delete sealed segments once fully applied. Returns
+    the number of readings written.
+    """
+    directory = directory or ingest_log_dir()
+    batch = batch or ingest_log_drain_batch()
+    applied = 0
+
+    with drain_lock(directory):
+        names = set()
+        for name, path, sealed in list_segments(directory):
+            names.add(name)
+            checkpoint, _ = IngestLogCheckpoint.objects.get_or_create(segment=name)
+            offset, readings = checkpoint.offset, []
+            for offset, payload in read_records(path, checkpoint.offset):
+                readings += decode(payload)
+                if len(readings) >= batch:
+                    applied += apply(name, readings, offset)
+                    readings = []
+            if readings:
+                applied += apply(name, readings, offset)
+
+            # the file goes first: a leftover checkpoint is harmless, a
+            # leftover file without its checkpoint would be replayed
+            if sealed and offset == os.path.getsize(path):
+                os.remove(path)
+                names.discard(name)
+
+        IngestLogCheckpoint.objects.exclude(segment__in=names).delete()
+    return applied
@@ -0,0 +1,209 @@
+"""
+In-process write-behind queue for async ingestion.
+
+The async endpoint validates a batch, hands the readings to the
+`IngestPipeline` of the running event loop and answers 202 straight away.
+The pipeline is only started from the ASGI lifespan startup event, which
+guarantees a loop that lives as long as the server. Under WSGI or
+`runserver` each async request gets its own short-lived loop that would
+cancel the writer with unwritten readings in it, so there is no pipeline
+and the endpoint writes the batch before answering 201.
+A single writer task coalesces queued readings into one `write_readings`
+call per `INGEST_BATCH_SIZE` readings or `INGEST_FLUSH_INTERVAL` seconds,
+whichever comes first, and runs it on a dedicated thread so the loop never
+blocks on the database. Readings count against `INGEST_QUEUE_CAPACITY`
+until they are written; past that the endpoint answers 429.
+
+Every queued reading was already answered with 202, so one bad row must
+not take the others down with it: when a merged write fails, each
+submission is written on its own, and the rows of a submission that still
+fails one by one. Rows that fail alone end up in RejectedReading.
+"""
+import asyncio
+import logging
+from concurrent.futures import ThreadPoolExecutor
+
+from asgiref.sync import sync_to_async
+from django.conf import settings
+from django.db import DatabaseError, close_old_connections, connections
+
+from .ingest import ingest_batch_size, unsaved, write_each, write_readings
+from .live import broker
+
+
+logger = logging.getLogger(__name__)
+
+
+def ingest_queue_capacity():
+    return getattr(settings, 'INGEST_QUEUE_CAPACITY', 50000)
+
+
+def ingest_flush_interval():
+    return getattr(settings, 'INGEST_FLUSH_INTERVAL', 0.5)
+
+
+def write_batch(submissions):
+    """
+    Write queued submissions together, falling back to each on its own.
+    Runs on the writer thread, which keeps its own connection. Returns
+    (written, rejected).
+    """
+    close_old_connections()
+    readings = [reading for submission in submissions for reading in submission]
+    try:
+        write_readings(readings)
+        return len(readings), 0
+    except DatabaseError:
+        logger.warning("Write of %d queued readings failed, retrying apart", len(readings), exc_info=True)
+
+    written = rejected = 0
+    for submission in submissions:
+        try:
+            write_readings(unsaved(submission))
+            written += len(submission)
+        except DatabaseError:
+            # nothing else will retry these; keep what fails alone
+            done, failed = write_each(submission, 'ingest-queue', errors=DatabaseError)
+            written += done
+            rejected += failed
+    return written, rejected
+
+
+class QueueFull(Exception):
+    pass
+
+
+class IngestPipeline:
+
+    def __init__(self, capacity=None, batch_size=None, interval=None):
+        self.capacity = capacity or ingest_queue_capacity()
+        self.batch_size = batch_size or ingest_batch_size()
+        self.interval = interval if interval is not None else ingest_flush_interval()
+
+        self.loop = asyncio.get_running_loop()
+        self.queue = asyncio.Queue()
+        self.pending = 0          # queued or being written
+        self.written = 0
+        self.failed = 0
+        self.closing = False
+
+        self.executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix='ingest-writer')
+        self.write = sync_to_async(write_batch, thread_sensitive=False, executor=self.executor)
+        self.writer = self.loop.create_task(self.run())
+
+    def submit(self, readings):
+        """Queue validated, unsaved readings, or raise QueueFull."""
+        if self.closing or self.pending + len(readings) > self.capacity:
+            raise QueueFull()
+        self.pending += len(readings)
+        self.queue.put_nowait(readings)
+
+    async def next_batch(self):
+        """
+        Wait for readings, then keep collecting submissions until the batch
+        is full or the window closes. Returns (submissions, stop).
+        """
+        first = await self.queue.get()
+        if first is None:
+            return [], True
+
+        batch = [first]
+        size = len(first)
+        deadline = self.loop.time() + self.interval
+        while size < self.batch_size:
+            timeout = deadline - self.loop.time()
+            if timeout <= 0:
+                break
+            try:
+                more = await asyncio.wait_for(self.queue.get(), timeout)
+            except asyncio.TimeoutError:
+                break
+            if more is None:
+                return batch, True
+            batch.append(more)
+            size += len(more)
+        return batch, False
+
+    async def run(self):
+        stop = False
+        while not stop:
+            batch, stop = await self.next_batch()
+            size = sum(map(len, batch))
+            if not size:
+                continue
+            try:
+                written, rejected = await self.write(batch)
+                self.written += written
+                self.failed += rejected
+                if rejected:
+                    logger.error("Rejected %d queued readings, see RejectedReading", rejected)
+            except Exception:
+                self.failed += size
+                logger.exception("Dropped %d queued readings", size)
+            finally:
+                self.pending -= size
+
+    async def close(self):
+        """Stop accepting readings, write everything queued and stop the writer."""
+        if not self.closing:
+            self.closing = True
+            self.queue.put_nowait(None)
+        await self.writer
+        await sync_to_async(connections.close_all, thread_sensitive=False, executor=self.executor)()
+        self.executor.shutdown(wait=True)
+
+
+# ------------------------------------------------------
+#                    PROCESS PIPELINE
+# ------------------------------------------------------
+_pipeline = None
+
+
+def get_pipeline():
+    """The pipeline started on the running event loop, or None without one."""
+    pipeline = _pipeline
+    if pipeline is None or pipeline.closing or pipeline.loop is not asyncio.get_running_loop():
+        return None
+    return pipeline
+
+
+async def start_pipeline():
+    """Start the pipeline on the running loop; call it from a long-lived loop only."""
+    global _pipeline
+    if get_pipeline() is None:
+        _pipeline = IngestPipeline()
+    return _pipeline
+
+
+async def shutdown_pipeline():
+    global _pipeline
+    pipeline, _pipeline = _pipeline, None
+    if pipeline is not None and pipeline.loop is asyncio.get_running_loop():
+        await pipeline.close()
+
+
+class Lifespan:
+    """
+    ASGI wrapper answering lifespan events (Django's handler rejects them).
+    Startup enables the ingest queue on the server's loop; on shutdown the
+    server waits for queued readings to be written, and live feed streams
+    end instead of holding the server open.
+    """
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope['type'] != 'lifespan':
+            return await self.app(scope, receive, send)
+
+        while True:
+            message = await receive()
+            if message['type'] == 'lifespan.startup':
+                await start_pipeline()
+                await send({'type': 'lifespan.startup.complete'})
+            elif message['type'] == 'lifespan.shutdown':
+                await shutdown_pipeline()
+                broker.close()
+                await send({'type': 'lifespan.shutdown.complete'})
+                return
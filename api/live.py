@@ -0,0 +1,235 @@
+"""
+Live feed of new readings and maintenance records (server-sent events).
+
+GET /api/live/?wu=1,2 holds one connection per dashboard open and pushes
+what is written for those units, instead of the dashboard polling
+/api/water-quality/. Events:
+
+- `readings`: a list of readings, as the list endpoint renders them;
+- `maintenance`: {"action": "saved" | "deleted", "record": {...}};
+- `dropped`: {"count": n}, events this client missed because it fell
+  behind; it should refetch what it shows.
+
+Fan-out is in-process. The `readings_ingested` signal and Maintenance
+saves/deletes publish to the Broker, which pushes each event to the
+subscribers of its unit. Every subscriber has a buffer of LIVE_BUFFER_SIZE
+events that drops the oldest when full, so a slow client never holds up
+ingest or grows memory. Events arriving within LIVE_COALESCE_SECONDS are
+sent as one write, with their readings merged into a single event.
+
+Only writes made by this process are seen: serve the feed from the ASGI
+process that takes ingest (/ingest/, /bulk/). Readings applied by
+`drain_ingest_log` in another process do not appear. Needs ASGI, since
+each open stream is a coroutine, not a thread.
+"""
+import asyncio
+import json
+import threading
+from collections import defaultdict, deque
+
+from django.conf import settings
+from django.db import transaction
+from django.db.models.signals import post_save, post_delete
+from django.dispatch import receiver
+
+from .exports import format_datetime
+from .models import Maintenance
+from .serializers import MaintenanceSerializer
+from .signals import readings_ingested
+
+
+def live_buffer_size():
+    return getattr(settings, 'LIVE_BUFFER_SIZE', 1000)
+
+
+def live_coalesce_seconds():
+    return getattr(settings, 'LIVE_COALESCE_SECONDS', 0.25)
+
+
+def live_keepalive_seconds():
+    return getattr(settings, 'LIVE_KEEPALIVE_SECONDS', 15)
+
+
+def live_max_units():
+    return getattr(settings, 'LIVE_MAX_UNITS', 100)
+
+
+# ------------------------------------------------------
+#                       PUB / SUB
+# ------------------------------------------------------
+class Subscriber:
+    """One open stream: a bounded, drop-oldest buffer woken on its event loop."""
+
+    def __init__(self, wu_ids, size, loop):
+        self.wu_ids = frozenset(wu_ids)
+        self.loop = loop
+        self.lock = threading.Lock()
+        self.events = deque(maxlen=size)
+        self.dropped = 0
+        self.closed = False
+        self.ready = asyncio.Event()
+
+    def push(self, event):
+        """Called from any thread."""
+        with self.lock:
+            if len(self.events) == self.events.maxlen:
+                self.dropped += 1
+            self.events.append(event)
+        self.wake()
+
+    def close(self):
+        self.closed = True
+        self.wake()
+
+    def wake(self):
+        try:
+            self.loop.call_soon_threadsafe(self.ready.set)
+        except RuntimeError:
+            # the loop is gone; the stream ends with it
+            self.closed = True
+
+    def take(self):
+        """Buffered events and the number dropped since the last take."""
+        self.ready.clear()
+        with self.lock:
+            events, dropped = list(self.events), self.dropped
+            self.events.clear()
+            self.dropped = 0
+        return events, dropped
+
+
+class Broker:
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.by_unit = defaultdict(set)
+
+    def subscribe(self, wu_ids, size=None):
+        subscriber = Subscriber(wu_ids, size or live_buffer_size(), asyncio.get_running_loop())
+        with self.lock:
+            for wu_id in subscriber.wu_ids:
+                self.by_unit[wu_id].add(subscriber)
+        return subscriber
+
+    def unsubscribe(self, subscriber):
+        with self.lock:
+            for wu_id in subscriber.wu_ids:
+                subscribers = self.by_unit.get(wu_id)
+                if subscribers is not None:
+                    subscribers.discard(subscriber)
+                    if not subscribers:
+                        del self.by_unit[wu_id]
+
+    def watched(self, wu_id):
+        return wu_id in self.by_unit
+
+    def publish(self, wu_id, event):
+        with self.lock:
+            subscribers = list(self.by_unit.get(wu_id, ()))
+        for subscriber in subscribers:
+            subscriber.push(event)
+
+    def close(self):
+        """End every open stream (server shutdown)."""
+        with self.lock:
+            subscribers = {s for group in self.by_unit.values() for s in group}
+        for subscriber in subscribers:
+            subscriber.close()
+
+    def __len__(self):
+        with self.lock:
+            return len({s for group in self.by_unit.values() for s in group})
+
+
+broker = Broker()
+
+
+# ------------------------------------------------------
+#                       PUBLISHERS
+# ------------------------------------------------------
+def reading_row(reading):
+    return {
+        'id': reading.id, 'wu': reading.wu_id,
+        'date_time': format_datetime(reading.date_time), 'tds': reading.tds,
+    }
+
+
+@receiver(readings_ingested)
+def publish_readings(sender, readings, **kwargs):
+    # already sent after commit; nothing is formatted for unwatched units
+    by_unit = defaultdict(list)
+    for reading in readings:
+        if broker.watched(reading.wu_id):
+            by_unit[reading.wu_id].append(reading_row(reading))
+    for wu_id, rows in by_unit.items():
+        broker.publish(wu_id, ('readings', rows))
+
+
+def publish_maintenance(instance, action):
+    if not broker.watched(instance.wu_id):
+        return
+    event = ('maintenance', {'action': action, 'record': MaintenanceSerializer(instance).data})
+    transaction.on_commit(lambda: broker.publish(instance.wu_id, event))
+
+
+@receiver(post_save, sender=Maintenance)
+def maintenance_saved(sender, instance, **kwargs):
+    publish_maintenance(instance, 'saved')
+
+
+@receiver(post_delete, sender=Maintenance)
+def maintenance_deleted(sender, instance, **kwargs):
+    publish_maintenance(instance, 'deleted')
+
+
+# ------------------------------------------------------
+#                      EVENT STREAM
+# ------------------------------------------------------
+def sse(event, data):
+    return f"event: {event}\ndata: {json.dumps(data, separators=(',', ':'))}\n\n"
+
+
+def render(events, dropped):
+    """One chunk for a flush: dropped notice, merged readings, maintenance."""
+    chunks = [sse('dropped', {'count': dropped})] if dropped else []
+    readings = [row for kind, payload in events if kind == 'readings' for row in payload]
+    if readings:
+        chunks.append(sse('readings', readings))
+    chunks += [sse('maintenance', payload) for kind, payload in events if kind == 'maintenance']
+    return ''.join(chunks)
+
+
+async def event_stream(wu_ids, keepalive=None, coalesce=None):
+    """Async iterator of SSE chunks for `wu_ids`, until the client goes away."""
+    keepalive = live_keepalive_seconds() if keepalive is None else keepalive
+    coalesce = live_coalesce_seconds() if coalesce is None else coalesce
+    subscriber = broker.subscribe(wu_ids)
+    try:
+        yield "retry: 3000\n: connected\n\n"
+        while not subscriber.closed:
+            try:
+                await asyncio.wait_for(subscriber.ready.wait(), keepalive)
+            except asyncio.TimeoutError:
+                # comment line: keeps proxies from closing an idle stream
+                yield ": keepalive\n\n"
+                continue
+            if coalesce:
+                await asyncio.sleep(coalesce)
+            chunk = render(*subscriber.take())
+            if chunk:
+                yield chunk
+    finally:
+        broker.unsubscribe(subscriber)
+
+
+def parse_unit_ids(value):
+    """`1,2,3` -> [1, 2, 3]; ValueError when empty, malformed or too many."""
+    try:
+        wu_ids = sorted({int(part) for part in value.split(',') if part.strip()})
+    except ValueError:
+        raise ValueError("Unit ids must be integers, e.g. ?wu=1,2.")
+    if not wu_ids:
+        raise ValueError("Give one or more unit ids, e.g. ?wu=1,2.")
+    if len(wu_ids) > live_max_units():
+        raise ValueError(f"At most {live_max_units()} units per stream.")
+    return wu_ids
@@ -0,0 +1,49 @@
+import time
+
+from django.core.management.base import BaseCommand, CommandError
+
+from api.archive import (
+    archive_dir, retention_days, retention_cutoff, days_to_archive, archive_before,
+)
+
+
+class Command(BaseCommand):
+    help = (
+        "Move raw readings older than the retention period into the compressed "
+        "archive, after making sure their rollups are complete. Run it from cron, "
+        "or leave it running with --every."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--days', type=int,
+                            help="Raw readings to keep, in days (default: READINGS_RETENTION_DAYS).")
+        parser.add_argument('--dir', help="Archive directory (default: ARCHIVE_DIR).")
+        parser.add_argument('--batch', type=int, help="Rows deleted per transaction.")
+        parser.add_argument('--dry-run', action='store_true',
+                            help="List the days that would be archived and exit.")
+        parser.add_argument('--every', type=float,
+                            help="Repeat every this many seconds instead of exiting.")
+
+    def handle(self, *args, **options):
+        days = options['days'] if options['days'] is not None else retention_days()
+        directory = options['dir'] or archive_dir()
+        if days is None or days < 1:
+            raise CommandError("No retention period: set READINGS_RETENTION_DAYS or pass --days.")
+        if not directory:
+            raise CommandError("No archive directory: set ARCHIVE_DIR or pass --dir.")
+
+        while True:
+            cutoff = retention_cutoff(days)
+            if options['dry_run']:
+                for day, readings in days_to_archive(cutoff):
+                    self.stdout.write(f"{day}: {readings} readings")
+                return
+
+            total = 0
+            for day, readings in archive_before(cutoff, directory, options['batch']):
+                self.stdout.write(f"{day}: archived {readings} readings")
+                total += readings
+            self.stdout.write(self.style.SUCCESS(f"{total} readings archived before {cutoff:%Y-%m-%d}"))
+            if not options['every']:
+                return
+            time.sleep(options['every'])
@@ -0,0 +1,24 @@
+import time
+
+from django.core.management.base import BaseCommand
+
+from api.alerts import check_silence
+
+
+class Command(BaseCommand):
+    help = (
+        "Fire `silent` alert rules for units that stopped reporting. Threshold "
+        "rules are evaluated on ingest; run this from cron or with --every."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--every', type=float,
+                            help="Repeat every this many seconds instead of exiting.")
+
+    def handle(self, *args, **options):
+        while True:
+            for rule in check_silence():
+                self.stdout.write(f"Unit {rule.wu_id}: no data for {rule.threshold:g} minutes")
+            if not options['every']:
+                return
+            time.sleep(options['every'])
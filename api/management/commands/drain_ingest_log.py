@@ -0,0 +1,37 @@
+import time
+
+from django.core.management.base import BaseCommand, CommandError
+
+from api.ingest_log import ingest_log_dir, recover, drain
+
+
+class Command(BaseCommand):
+    help = (
+        "Apply readings from the local ingest log to WaterQuality. Open segments "
+        "left by crashed processes are recovered first."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--dir', help="Log directory (default: INGEST_LOG_DIR).")
+        parser.add_argument('--batch', type=int, help="Readings per transaction.")
+        parser.add_argument('--interval', type=float, default=1.0,
+                            help="Seconds between passes when following the log.")
+        parser.add_argument('--once', action='store_true', help="Drain once and exit.")
+
+    def handle(self, *args, **options):
+        directory = options['dir'] or ingest_log_dir()
+        if not directory:
+            raise CommandError("No log directory: set INGEST_LOG_DIR or pass --dir.")
+
+        for name in recover(directory):
+            self.stdout.write(f"Recovered segment {name}")
+
+        while True:
+            applied = drain(directory, batch=options['batch'])
+            if applied:
+                self.stdout.write(f"Applied {applied} readings")
+            if options['once']:
+                return
+            # segments of crashed writers show up between passes too
+            recover(directory)
+            time.sleep(options['interval'])
@@ -0,0 +1,50 @@
+import time
+from datetime import timedelta
+
+from django.core.management.base import BaseCommand, CommandError
+
+from api.management.commands.rebuild_rollups import parse_bound
+from api.synthetic import generate_fleet
+
+
+class Command(BaseCommand):
+    help = (
+        "Add a synthetic fleet: units with diurnal TDS readings, fouling episodes "
+        "and maintenance records, bulk inserted. For benchmarks and load tests."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--units', type=int, default=100, help="Units to create.")
+        parser.add_argument('--readings', type=int, default=1000, help="Readings per unit.")
+        parser.add_argument('--interval', type=float, default=300,
+                            help="Seconds between two readings of a unit.")
+        parser.add_argument('--end', type=parse_bound,
+                            help="Date or datetime of the last readings (default: now).")
+        parser.add_argument('--seed', type=int, default=0)
+        parser.add_argument('--batch', type=int, default=50000, help="Rows per insert transaction.")
+        parser.add_argument('--skip-rollups', action='store_true',
+                            help="Leave rollups stale; run rebuild_rollups later.")
+
+    def handle(self, *args, **options):
+        if options['units'] < 1 or options['readings'] < 1 or options['interval'] <= 0:
+            raise CommandError("--units, --readings and --interval must be positive.")
+
+        total = options['units'] * options['readings']
+        started = time.perf_counter()
+
+        def progress(rows):
+            if options['verbosity'] > 1:
+                self.stdout.write(f"{rows}/{total} readings")
+
+        summary = generate_fleet(
+            options['units'], options['readings'],
+            interval=timedelta(seconds=options['interval']), end=options['end'],
+            seed=options['seed'], batch=options['batch'],
+            rollups=not options['skip_rollups'], progress=progress,
+        )
+        elapsed = time.perf_counter() - started
+        self.stdout.write(self.style.SUCCESS(
+            f"{summary['units']} units, {summary['readings']} readings and "
+            f"{summary['maintenance']} maintenance records from {summary['start']:%Y-%m-%d %H:%M} "
+            f"to {summary['end']:%Y-%m-%d %H:%M} in {elapsed:.1f}s"
+        ))
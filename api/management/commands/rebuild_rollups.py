@@ -0,0 +1,32 @@
+from datetime import datetime
+
+from django.core.management.base import BaseCommand, CommandError
+from django.utils.dateparse import parse_datetime, parse_date
+from django.utils import timezone
+
+from api.rollups import rebuild
+
+
+def parse_bound(value):
+    parsed = parse_datetime(value)
+    if parsed is None:
+        day = parse_date(value)
+        if day is None:
+            raise CommandError(f"Not a date or datetime: {value}")
+        parsed = datetime(day.year, day.month, day.day)
+    if timezone.is_naive(parsed):
+        parsed = timezone.make_aware(parsed)
+    return parsed
+
+
+class Command(BaseCommand):
+    help = "Recompute minute/hour/day TDS rollups from raw WaterQuality rows."
+
+    def add_arguments(self, parser):
+        parser.add_argument('--start', type=parse_bound, help="Date or datetime (inclusive).")
+        parser.add_argument('--end', type=parse_bound, help="Date or datetime (exclusive).")
+        parser.add_argument('--wu', type=int, action='append', help="Water unit id, repeatable.")
+
+    def handle(self, *args, **options):
+        written = rebuild(start=options['start'], end=options['end'], wu_ids=options['wu'])
+        self.stdout.write(self.style.SUCCESS(f"{written} rollup rows written"))
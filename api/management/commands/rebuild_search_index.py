@@ -0,0 +1,14 @@
+from django.core.management.base import BaseCommand
+
+from api.search import install, uninstall
+
+
+class Command(BaseCommand):
+    help = (
+        "Recreate the maintenance full-text index and reindex every record."
+    )
+
+    def handle(self, *args, **options):
+        uninstall()
+        install()
+        self.stdout.write(self.style.SUCCESS("Maintenance search index rebuilt"))
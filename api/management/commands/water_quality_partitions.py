@@ -0,0 +1,44 @@
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connections
+
+from api.partitioning import (
+    supports_partitioning, is_partitioned, convert_to_partitioned, ensure_partitions
+)
+
+
+class Command(BaseCommand):
+    help = "Create monthly WaterQuality partitions ahead of time (PostgreSQL only)."
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--ahead', type=int, default=3,
+            help="Number of future months to prepare (default: 3).",
+        )
+        parser.add_argument(
+            '--convert', action='store_true',
+            help="Rebuild an unpartitioned WaterQuality table as a partitioned one.",
+        )
+        parser.add_argument('--database', default='default')
+
+    def handle(self, *args, **options):
+        conn = connections[options['database']]
+
+        if not supports_partitioning(conn):
+            self.stdout.write(
+                f"{conn.vendor} has no table partitioning; "
+                "relying on the (wu, date_time) indexes instead."
+            )
+            return
+
+        if options['convert']:
+            created = convert_to_partitioned(ahead=options['ahead'], conn=conn)
+        elif not is_partitioned(conn):
+            raise CommandError(
+                "WaterQuality is not partitioned yet. Run with --convert first."
+            )
+        else:
+            created = ensure_partitions(ahead=options['ahead'], conn=conn)
+
+        for name in created:
+            self.stdout.write(f"created {name}")
+        self.stdout.write(self.style.SUCCESS(f"{len(created)} partition(s) created"))
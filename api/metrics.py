@@ -0,0 +1,353 @@
+"""
+Request metrics, exported in Prometheus text format at /metrics.
+
+MetricsMiddleware times every request and labels it with the URL name it
+resolved to (`water-quality-list`, `register`, ...), the viewset action or
+HTTP method, and the status class. A wrapper installed on every database
+connection adds the request's query count and query time. For each label
+set we keep:
+
+- `http_request_duration_seconds`: a histogram over METRICS_BUCKETS,
+  measured to the first byte for streamed responses;
+- `http_request_db_queries_total` / `http_request_db_seconds_total`;
+- `http_response_bytes_total`: streamed bodies are counted as they are sent.
+
+Queries slower than SLOW_QUERY_SECONDS are logged to `api.slow_queries`
+with their SQL (without parameters) and the first project frame that ran
+them, and counted in `db_slow_queries_total`.
+
+Set METRICS_TOKEN to make scrapers send `Authorization: Bearer <token>`.
+
+Recording takes no locks. Each thread writes to its own shard, and a
+scrape sums the shards. A thread's shard is folded into a shared one when
+the thread exits.
+"""
+import logging
+import sys
+import threading
+import time
+import weakref
+from bisect import bisect_left
+from contextvars import ContextVar
+from pathlib import Path
+
+from asgiref.sync import iscoroutinefunction, markcoroutinefunction
+from django.conf import settings
+from django.db.backends.signals import connection_created
+from django.dispatch import receiver
+from django.http import HttpResponse
+from django.utils.crypto import constant_time_compare
+from django.views.decorators.http import require_GET
+
+
+logger = logging.getLogger('api.slow_queries')
+
+PROJECT_DIR = str(Path(__file__).resolve().parent.parent)
+
+# longer statements (huge IN lists) are cut in the slow-query log
+SQL_LOG_CHARS = 2000
+
+DEFAULT_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+
+
+def metrics_enabled():
+    return getattr(settings, 'METRICS_ENABLED', True)
+
+
+def metrics_buckets():
+    return tuple(getattr(settings, 'METRICS_BUCKETS', DEFAULT_BUCKETS))
+
+
+def slow_query_seconds():
+    return getattr(settings, 'SLOW_QUERY_SECONDS', 0.5)
+
+
+def metrics_token():
+    return getattr(settings, 'METRICS_TOKEN', None)
+
+
+# ------------------------------------------------------
+#                   PER-THREAD SHARDS
+# ------------------------------------------------------
+# per label set: [count, duration sum, queries, db seconds, bytes, *bucket counts]
+COUNT, DURATION, QUERIES, DB_SECONDS, BYTES, FIRST_BUCKET = range(6)
+
+
+class Registry:
+
+    def __init__(self):
+        self.local = threading.local()
+        self.lock = threading.Lock()  # shard creation and retirement only
+        self.shards = {}
+        self.retired = {}
+        self.retired_slow = 0
+        self.buckets = None
+
+    def shard(self):
+        try:
+            return self.local.shard
+        except AttributeError:
+            pass
+        shard = self.local.shard = {'series': {}, 'slow': 0}
+        # dropped with the thread's locals when it exits
+        owner = self.local.owner = type('ShardOwner', (), {})()
+        with self.lock:
+            self.shards[id(shard)] = shard
+        weakref.finalize(owner, self.retire, shard)
+        return shard
+
+    def retire(self, shard):
+        with self.lock:
+            self.shards.pop(id(shard), None)
+            self.merge(self.retired, shard['series'])
+            self.retired_slow += shard['slow']
+
+    @staticmethod
+    def merge(into, series):
+        for key, values in list(series.items()):
+            total = into.get(key)
+            if total is None:
+                into[key] = list(values)
+            else:
+                for i, value in enumerate(values):
+                    total[i] += value
+
+    def values(self, key):
+        """This thread's counters for a label set, created on first use."""
+        buckets = self.buckets
+        if buckets is None:
+            buckets = self.buckets = metrics_buckets()
+        series = self.shard()['series']
+        values = series.get(key)
+        if values is None:
+            values = series[key] = [0] * (FIRST_BUCKET + len(buckets))
+        return values
+
+    def observe(self, key, duration, queries, db_seconds, size):
+        values = self.values(key)
+        values[COUNT] += 1
+        values[DURATION] += duration
+        values[QUERIES] += queries
+        values[DB_SECONDS] += db_seconds
+        values[BYTES] += size
+        # cumulative buckets are summed at scrape time
+        index = bisect_left(self.buckets, duration)
+        if index < len(self.buckets):
+            values[FIRST_BUCKET + index] += 1
+
+    def add_bytes(self, key, size):
+        # under ASGI a stream is iterated on another thread than the one
+        # that observed its request, so the series may be new to this shard
+        self.values(key)[BYTES] += size
+
+    def slow_query(self):
+        self.shard()['slow'] += 1
+
+    def snapshot(self):
+        """(series totals, slow query count) across every thread."""
+        with self.lock:
+            shards = list(self.shards.values())
+            totals = {key: list(values) for key, values in self.retired.items()}
+            slow = self.retired_slow
+        for shard in shards:
+            # dict.copy() is atomic under the GIL; values may be a write behind
+            self.merge(totals, shard['series'].copy())
+            slow += shard['slow']
+        return totals, slow
+
+    def clear(self):
+        with self.lock:
+            for shard in self.shards.values():
+                shard['series'].clear()
+                shard['slow'] = 0
+            self.retired.clear()
+            self.retired_slow = 0
+            self.buckets = None
+
+
+registry = Registry()
+
+
+# ------------------------------------------------------
+#                    DATABASE WRAPPER
+# ------------------------------------------------------
+class RequestStats:
+    __slots__ = ('queries', 'db_seconds', 'request')
+
+    def __init__(self, request):
+        self.queries = 0
+        self.db_seconds = 0.0
+        self.request = request
+
+
+_current = ContextVar('request_stats', default=None)
+
+
+def call_site():
+    """First frame of project code outside this module, as `path:line in function`."""
+    frame = sys._getframe(2)
+    while frame is not None:
+        filename = frame.f_code.co_filename
+        if (filename.startswith(PROJECT_DIR) and filename != __file__
+                and 'site-packages' not in filename):
+            return f"{filename[len(PROJECT_DIR) + 1:]}:{frame.f_lineno} in {frame.f_code.co_name}"
+        frame = frame.f_back
+    return "<unknown>"
+
+
+def record_query(execute, sql, params, many, context):
+    start = time.perf_counter()
+    try:
+        return execute(sql, params, many, context)
+    finally:
+        elapsed = time.perf_counter() - start
+        stats = _current.get()
+        if stats is not None:
+            stats.queries += 1
+            stats.db_seconds += elapsed
+        threshold = slow_query_seconds()
+        if threshold is not None and elapsed >= threshold:
+            registry.slow_query()
+            view = request_label(stats.request)[0] if stats is not None else "-"
+            if len(sql) > SQL_LOG_CHARS:
+                sql = f"{sql[:SQL_LOG_CHARS]}... ({len(sql)} chars)"
+            logger.warning("slow query %.3fs in %s at %s: %s", elapsed, view, call_site(), sql)
+
+
+@receiver(connection_created)
+def install_query_recorder(sender, connection, **kwargs):
+    if metrics_enabled() and record_query not in connection.execute_wrappers:
+        connection.execute_wrappers.append(record_query)
+
+
+# ------------------------------------------------------
+#                       MIDDLEWARE
+# ------------------------------------------------------
+def request_label(request):
+    """(view, action) for the resolved URL; action is the method outside viewsets."""
+    match = getattr(request, 'resolver_match', None)
+    if match is None:
+        return '<unmatched>', request.method
+    actions = getattr(match.func, 'actions', None)
+    action = actions.get(request.method.lower()) if actions else None
+    return match.view_name or match._func_path, action or request.method
+
+
+class MetricsMiddleware:
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        self.enabled = metrics_enabled()
+        self.is_async = iscoroutinefunction(get_response)
+        if self.is_async:
+            markcoroutinefunction(self)
+
+    def __call__(self, request):
+        if self.is_async:
+            return self.__acall__(request)
+        if not self.enabled:
+            return self.get_response(request)
+        stats, token, start = self.begin(request)
+        try:
+            response = self.get_response(request)
+        finally:
+            _current.reset(token)
+        return self.finish(request, response, stats, start)
+
+    async def __acall__(self, request):
+        if not self.enabled:
+            return await self.get_response(request)
+        stats, token, start = self.begin(request)
+        try:
+            response = await self.get_response(request)
+        finally:
+            _current.reset(token)
+        return self.finish(request, response, stats, start)
+
+    def begin(self, request):
+        stats = RequestStats(request)
+        return stats, _current.set(stats), time.perf_counter()
+
+    def finish(self, request, response, stats, start):
+        duration = time.perf_counter() - start
+        view, action = request_label(request)
+        key = (view, action, f"{response.status_code // 100}xx")
+
+        if response.streaming:
+            size = 0
+            response.streaming_content = self.count_stream(response, key)
+        else:
+            size = len(response.content)
+        registry.observe(key, duration, stats.queries, stats.db_seconds, size)
+        return response
+
+    @staticmethod
+    def count_stream(response, key):
+        content = response.streaming_content
+        if response.is_async:
+            async def counted():
+                async for chunk in content:
+                    registry.add_bytes(key, len(chunk))
+                    yield chunk
+        else:
+            def counted():
+                for chunk in content:
+                    registry.add_bytes(key, len(chunk))
+                    yield chunk
+        return counted()
+
+
+# ------------------------------------------------------
+#                      EXPOSITION
+# ------------------------------------------------------
+def escape(value):
+    return str(value).replace('\\', r'\\').replace('"', r'\"').replace('\n', r'\n')
+
+
+def render_metrics():
+    totals, slow = registry.snapshot()
+    buckets = registry.buckets or metrics_buckets()
+    lines = [
+        "# HELP http_request_duration_seconds Request latency (to first byte for streams).",
+        "# TYPE http_request_duration_seconds histogram",
+    ]
+    counters = {
+        'http_request_db_queries_total': ("Database queries run by requests.", QUERIES),
+        'http_request_db_seconds_total': ("Time requests spent in database queries.", DB_SECONDS),
+        'http_response_bytes_total': ("Response body bytes sent.", BYTES),
+    }
+    series = sorted(totals.items())
+    for (view, action, status), values in series:
+        labels = f'view="{escape(view)}",action="{escape(action)}",status="{status}"'
+        cumulative = 0
+        for bound, count in zip(buckets, values[FIRST_BUCKET:]):
+            cumulative += count
+            lines.append(f'http_request_duration_seconds_bucket{{{labels},le="{bound}"}} {cumulative}')
+        lines.append(f'http_request_duration_seconds_bucket{{{labels},le="+Inf"}} {values[COUNT]}')
+        lines.append(f'http_request_duration_seconds_sum{{{labels}}} {values[DURATION]}')
+        lines.append(f'http_request_duration_seconds_count{{{labels}}} {values[COUNT]}')
+
+    for name, (help_text, index) in counters.items():
+        lines += [f"# HELP {name} {help_text}", f"# TYPE {name} counter"]
+        for (view, action, status), values in series:
+            labels = f'view="{escape(view)}",action="{escape(action)}",status="{status}"'
+            lines.append(f'{name}{{{labels}}} {values[index]}')
+
+    lines += [
+        "# HELP db_slow_queries_total Queries slower than SLOW_QUERY_SECONDS.",
+        "# TYPE db_slow_queries_total counter",
+        f"db_slow_queries_total {slow}",
+    ]
+    return "\n".join(lines) + "\n"
+
+
+@require_GET
+def metrics_view(request):
+    token = metrics_token()
+    if token and not constant_time_compare(
+        request.headers.get('Authorization', ''), f"Bearer {token}"
+    ):
+        return HttpResponse(status=401)
+    return HttpResponse(render_metrics(), content_type='text/plain; version=0.0.4; charset=utf-8')
@@ -0,0 +1,31 @@
+# Generated by Django 5.2.8 on 2026-10-17 12:20
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('api', '0001_initial'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='waterquality',
+            index=models.Index(fields=['wu', '-date_time'], name='wq_wu_date_time_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='waterquality',
+            index=models.Index(fields=['wu', 'tds', 'date_time'], name='wq_wu_tds_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='waterquality',
+            index=models.Index(fields=['-date_time'], name='wq_date_time_idx'),
+        ),
+        migrations.AlterField(
+            model_name='waterquality',
+            name='wu',
+            field=models.ForeignKey(db_index=False, on_delete=django.db.models.deletion.CASCADE, to='api.waterunit'),
+        ),
+    ]
@@ -0,0 +1,30 @@
+# Generated by Django 5.2.8 on 2026-10-17 12:23
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('api', '0002_water_quality_indexes'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='WaterQualityRollup',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('resolution', models.CharField(choices=[('minute', 'Minute'), ('hour', 'Hour'), ('day', 'Day')], max_length=8)),
+                ('bucket_start', models.DateTimeField()),
+                ('count', models.PositiveIntegerField()),
+                ('tds_sum', models.FloatField()),
+                ('tds_min', models.FloatField()),
+                ('tds_max', models.FloatField()),
+                ('wu', models.ForeignKey(db_index=False, on_delete=django.db.models.deletion.CASCADE, to='api.waterunit')),
+            ],
+            options={
+                'constraints': [models.UniqueConstraint(fields=('wu', 'resolution', 'bucket_start'), name='wq_rollup_bucket_uniq')],
+            },
+        ),
+    ]
@@ -0,0 +1,39 @@
+# Generated by Django 5.2.8 on 2026-10-17 12:27
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+def backfill_latest(apps, schema_editor):
+    WaterUnit = apps.get_model('api', 'WaterUnit')
+    WaterQuality = apps.get_model('api', 'WaterQuality')
+    LatestReading = apps.get_model('api', 'LatestReading')
+
+    latest = []
+    for wu_id in WaterUnit.objects.values_list('id', flat=True).iterator():
+        reading = WaterQuality.objects.filter(wu_id=wu_id).order_by('-date_time', '-id').first()
+        if reading is not None:
+            latest.append(LatestReading(
+                wu_id=wu_id, reading_id=reading.id, date_time=reading.date_time, tds=reading.tds
+            ))
+    LatestReading.objects.bulk_create(latest, batch_size=1000)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('api', '0003_water_quality_rollups'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='LatestReading',
+            fields=[
+                ('wu', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, primary_key=True, related_name='latest_reading', serialize=False, to='api.waterunit')),
+                ('reading_id', models.BigIntegerField(null=True)),
+                ('date_time', models.DateTimeField()),
+                ('tds', models.FloatField()),
+            ],
+        ),
+        migrations.RunPython(backfill_latest, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,20 @@
+# Generated by Django 5.2.8 on 2026-10-17 12:38
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('api', '0004_latest_reading'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='IngestLogCheckpoint',
+            fields=[
+                ('segment', models.CharField(max_length=100, primary_key=True, serialize=False)),
+                ('offset', models.BigIntegerField(default=0)),
+            ],
+        ),
+    ]
@@ -0,0 +1,79 @@
+# Generated by Django 5.2.8 on 2026-10-17 13:04
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+# the index as it was at this migration; api.search may change later
+SQLITE_INSTALL = [
+    "CREATE VIRTUAL TABLE IF NOT EXISTS api_maintenance_fts USING fts5("
+    "problem, description, content='api_maintenance', content_rowid='id', "
+    "tokenize='porter unicode61 remove_diacritics 2', prefix='2 3')",
+    "CREATE TRIGGER IF NOT EXISTS api_maintenance_fts_ai AFTER INSERT ON api_maintenance BEGIN "
+    "INSERT INTO api_maintenance_fts(rowid, problem, description) "
+    "VALUES (new.id, new.problem, new.description); END",
+    "CREATE TRIGGER IF NOT EXISTS api_maintenance_fts_ad AFTER DELETE ON api_maintenance BEGIN "
+    "INSERT INTO api_maintenance_fts(api_maintenance_fts, rowid, problem, description) "
+    "VALUES ('delete', old.id, old.problem, old.description); END",
+    "CREATE TRIGGER IF NOT EXISTS api_maintenance_fts_au "
+    "AFTER UPDATE OF id, problem, description ON api_maintenance BEGIN "
+    "INSERT INTO api_maintenance_fts(api_maintenance_fts, rowid, problem, description) "
+    "VALUES ('delete', old.id, old.problem, old.description); "
+    "INSERT INTO api_maintenance_fts(rowid, problem, description) "
+    "VALUES (new.id, new.problem, new.description); END",
+    "INSERT INTO api_maintenance_fts(api_maintenance_fts, rank) VALUES ('rank', 'bm25(10.0, 1.0)')",
+    "INSERT INTO api_maintenance_fts(api_maintenance_fts) VALUES ('rebuild')",
+]
+
+SQLITE_UNINSTALL = [
+    "DROP TRIGGER IF EXISTS api_maintenance_fts_ai",
+    "DROP TRIGGER IF EXISTS api_maintenance_fts_ad",
+    "DROP TRIGGER IF EXISTS api_maintenance_fts_au",
+    "DROP TABLE IF EXISTS api_maintenance_fts",
+]
+
+POSTGRES_INSTALL = [
+    "ALTER TABLE api_maintenance ADD COLUMN IF NOT EXISTS search_vector tsvector GENERATED ALWAYS AS ("
+    "setweight(to_tsvector('english', coalesce(problem, '')), 'A') || "
+    "setweight(to_tsvector('english', coalesce(description, '')), 'B')) STORED",
+    "CREATE INDEX IF NOT EXISTS maintenance_search_idx ON api_maintenance USING GIN (search_vector)",
+]
+
+POSTGRES_UNINSTALL = [
+    "DROP INDEX IF EXISTS maintenance_search_idx",
+    "ALTER TABLE api_maintenance DROP COLUMN IF EXISTS search_vector",
+]
+
+
+def run(statements):
+    def operation(apps, schema_editor):
+        for sql in statements.get(schema_editor.connection.vendor, []):
+            schema_editor.execute(sql)
+    return operation
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('api', '0007_archive_segment'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='MaintenanceSearchEntry',
+            fields=[
+                ('maintenance', models.OneToOneField(db_column='rowid', db_constraint=False, on_delete=django.db.models.deletion.DO_NOTHING, primary_key=True, related_name='search_entry', serialize=False, to='api.maintenance')),
+                ('document', models.TextField(db_column='api_maintenance_fts')),
+                ('rank', models.FloatField()),
+            ],
+            options={
+                'db_table': 'api_maintenance_fts',
+                'managed': False,
+            },
+        ),
+        # FTS5 table + triggers on SQLite, generated tsvector + GIN on PostgreSQL
+        migrations.RunPython(
+            run({'sqlite': SQLITE_INSTALL, 'postgresql': POSTGRES_INSTALL}),
+            run({'sqlite': SQLITE_UNINSTALL, 'postgresql': POSTGRES_UNINSTALL}),
+        ),
+    ]
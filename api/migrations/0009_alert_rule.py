@@ -0,0 +1,28 @@
+# Generated by Django 5.2.8 on 2026-10-17 13:25
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('api', '0008_maintenance_search'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='AlertRule',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('kind', models.CharField(choices=[('above', 'TDS above threshold'), ('below', 'TDS below threshold'), ('silent', 'No data for threshold minutes')], max_length=8)),
+                ('threshold', models.FloatField()),
+                ('hysteresis', models.FloatField(default=0)),
+                ('is_active', models.BooleanField(default=True)),
+                ('firing', models.BooleanField(default=False)),
+                ('changed_at', models.DateTimeField(blank=True, null=True)),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+                ('wu', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='alert_rules', to='api.waterunit')),
+            ],
+        ),
+    ]
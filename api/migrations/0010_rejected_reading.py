@@ -0,0 +1,25 @@
+# Generated by Django 5.2.8 on 2026-10-17 15:38
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('api', '0009_alert_rule'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='RejectedReading',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('wu_id', models.BigIntegerField()),
+                ('date_time', models.DateTimeField()),
+                ('tds', models.FloatField()),
+                ('source', models.CharField(max_length=100)),
+                ('error', models.TextField()),
+                ('rejected_at', models.DateTimeField(auto_now_add=True, db_index=True)),
+            ],
+        ),
+    ]
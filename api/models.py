@@ -57,16 +57,76 @@ class WaterUnit(models.Model):
 # 3. Water Quality
 # --------------------------
 class WaterQuality(models.Model):
-    wu = models.ForeignKey(WaterUnit, on_delete=models.CASCADE)
+    # indexed through the composite indexes below
+    wu = models.ForeignKey(WaterUnit, on_delete=models.CASCADE, db_index=False)
     date_time = models.DateTimeField()
     tds = models.FloatField()
 
+    class Meta:
+        indexes = [
+            # per-unit listings, newest first
+            models.Index(fields=['wu', '-date_time'], name='wq_wu_date_time_idx'),
+            # per-unit tds range filters, covers the date_time read as well
+            models.Index(fields=['wu', 'tds', 'date_time'], name='wq_wu_tds_idx'),
+            # unfiltered listings, newest first
+            models.Index(fields=['-date_time'], name='wq_date_time_idx'),
+        ]
+
     def __str__(self):
         return f"{self.wu.name} - {self.tds}"
 
 
 # --------------------------
-# 4. Maintenance
+# 4. Latest Reading per Unit
+# --------------------------
+class LatestReading(models.Model):
+    """Denormalized newest WaterQuality row of each unit, kept up on ingest."""
+    wu = models.OneToOneField(
+        WaterUnit, on_delete=models.CASCADE, primary_key=True, related_name='latest_reading'
+    )
+    reading_id = models.BigIntegerField(null=True)
+    date_time = models.DateTimeField()
+    tds = models.FloatField()
+
+    def __str__(self):
+        return f"{self.wu_id} - {self.tds}"
+
+
+# --------------------------
+# 5. Water Quality Rollups
+# --------------------------
+class WaterQualityRollup(models.Model):
+    MINUTE = 'minute'
+    HOUR = 'hour'
+    DAY = 'day'
+    RESOLUTIONS = [(MINUTE, 'Minute'), (HOUR, 'Hour'), (DAY, 'Day')]
+
+    wu = models.ForeignKey(WaterUnit, on_delete=models.CASCADE, db_index=False)
+    resolution = models.CharField(max_length=8, choices=RESOLUTIONS)
+    bucket_start = models.DateTimeField()
+
+    count = models.PositiveIntegerField()
+    tds_sum = models.FloatField()
+    tds_min = models.FloatField()
+    tds_max = models.FloatField()
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(
+                fields=['wu', 'resolution', 'bucket_start'], name='wq_rollup_bucket_uniq'
+            ),
+        ]
+
+    @property
+    def tds_avg(self):
+        return self.tds_sum / self.count if self.count else None
+
+    def __str__(self):
+        return f"{self.wu_id} - {self.resolution} {self.bucket_start}"
+
+
+# --------------------------
+# 6. Maintenance
 # --------------------------
 class Maintenance(models.Model):
     wu = models.ForeignKey(WaterUnit, on_delete=models.CASCADE)
@@ -75,6 +135,137 @@ class Maintenance(models.Model):
     description = models.TextField()
     maintainer = models.ForeignKey(Maintainer, on_delete=models.SET_NULL, null=True)
 
+    @classmethod
+    def from_db(cls, db, field_names, values):
+        instance = super().from_db(db, field_names, values)
+        # remembered so moving a record to another unit can invalidate both
+        instance._loaded_wu_id = instance.__dict__.get('wu_id')
+        return instance
+
     def __str__(self):
         return f"{self.wu.name} - {self.problem}"
 
+
+
+# --------------------------
+# 7. Ingest Log Checkpoints
+# --------------------------
+class IngestLogCheckpoint(models.Model):
+    """
+    How far each ingest log segment has been applied. Updated in the same
+    transaction as the readings it covers, so replays never duplicate rows.
+    """
+    segment = models.CharField(max_length=100, primary_key=True)
+    offset = models.BigIntegerField(default=0)
+
+    def __str__(self):
+        return f"{self.segment} @ {self.offset}"
+
+
+# --------------------------
+# 8. Revoked Access Tokens
+# --------------------------
+class RevokedToken(models.Model):
+    """JWT ids logged out before they expire; see auth.Denylist."""
+    jti = models.CharField(max_length=64, primary_key=True)
+    expires_at = models.DateTimeField(db_index=True)
+
+    def __str__(self):
+        return self.jti
+
+
+# --------------------------
+# 9. Archived Reading Segments
+# --------------------------
+class ArchiveSegment(models.Model):
+    """
+    One compressed file of raw readings moved out of WaterQuality by the
+    retention job. A day gets a further part when late readings arrive
+    for it; see api.archive.
+    """
+    day = models.DateField()
+    part = models.PositiveIntegerField(default=1)
+    path = models.CharField(max_length=255)
+    rows = models.PositiveIntegerField(default=0)
+    created_at = models.DateTimeField(auto_now_add=True)
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=['day', 'part'], name='archive_day_part_uniq'),
+        ]
+
+    def __str__(self):
+        return f"{self.day} part {self.part} ({self.rows} readings)"
+
+
+# --------------------------
+# 10. Maintenance Search Index
+# --------------------------
+class MaintenanceSearchEntry(models.Model):
+    """
+    Read-only view of the SQLite FTS5 index over Maintenance (created and
+    kept in sync by the database, see api.search), so searches can join it.
+    """
+    maintenance = models.OneToOneField(
+        Maintenance, on_delete=models.DO_NOTHING, primary_key=True, db_column='rowid',
+        db_constraint=False, related_name='search_entry',
+    )
+    document = models.TextField(db_column='api_maintenance_fts')
+    rank = models.FloatField()
+
+    class Meta:
+        managed = False
+        db_table = 'api_maintenance_fts'
+
+
+# --------------------------
+# 11. Alert Rules
+# --------------------------
+class AlertRule(models.Model):
+    """
+    A per-unit condition checked as readings arrive (see api.alerts).
+    `above` / `below` compare TDS against `threshold` and clear only once
+    the reading is `hysteresis` back inside it; `silent` fires when the
+    unit has sent nothing for `threshold` minutes. Firing opens a
+    Maintenance record.
+    """
+    ABOVE = 'above'
+    BELOW = 'below'
+    SILENT = 'silent'
+    KIND_CHOICES = [
+        (ABOVE, 'TDS above threshold'),
+        (BELOW, 'TDS below threshold'),
+        (SILENT, 'No data for threshold minutes'),
+    ]
+
+    wu = models.ForeignKey(WaterUnit, on_delete=models.CASCADE, related_name='alert_rules')
+    kind = models.CharField(max_length=8, choices=KIND_CHOICES)
+    threshold = models.FloatField()
+    hysteresis = models.FloatField(default=0)
+    is_active = models.BooleanField(default=True)
+    firing = models.BooleanField(default=False)
+    changed_at = models.DateTimeField(null=True, blank=True)
+    created_at = models.DateTimeField(auto_now_add=True)
+
+    def __str__(self):
+        return f"{self.wu_id} {self.kind} {self.threshold}"
+
+
+# --------------------------
+# 12. Rejected Readings
+# --------------------------
+class RejectedReading(models.Model):
+    """
+    Readings that were accepted (202, or appended to the ingest log) but
+    failed on their own when written later, e.g. because their unit was
+    deleted in between. Kept for inspection instead of being dropped.
+    """
+    wu_id = models.BigIntegerField()
+    date_time = models.DateTimeField()
+    tds = models.FloatField()
+    source = models.CharField(max_length=100)
+    error = models.TextField()
+    rejected_at = models.DateTimeField(auto_now_add=True, db_index=True)
+
+    def __str__(self):
+        return f"{self.wu_id} @ {self.date_time} ({self.source})"
@@ -0,0 +1,230 @@
+import base64
+import binascii
+import json
+from functools import reduce
+from operator import or_
+
+from django.core.exceptions import ValidationError
+from django.db.models import F, Q
+from rest_framework.exceptions import NotFound
+from rest_framework.filters import OrderingFilter
+from rest_framework.pagination import BasePagination
+from rest_framework.response import Response
+from rest_framework.utils.urls import replace_query_param
+
+
+class KeysetPagination(BasePagination):
+    """
+    Cursor pagination over an arbitrary multi-column ordering.
+
+    Unlike DRF's CursorPagination, which only keys on the first ordering
+    field and falls back to an offset for ties, every page here is a pure
+    `WHERE (a, b, id) > (...)` seek: the ordering requested through the
+    view's OrderingFilter gets `id` appended as a tie-breaker and the
+    cursor carries the full key of the last row. Pages stay stable while
+    rows are inserted and cost the same no matter how deep the client is.
+
+    Nulls always sort last so nullable ordering fields stay seekable.
+    """
+    page_size = 100
+    max_page_size = 1000
+    page_size_query_param = 'page_size'
+    cursor_query_param = 'cursor'
+    invalid_cursor_message = 'Invalid cursor'
+
+    def paginate_queryset(self, queryset, request, view=None):
+        self.request = request
+        self.base_url = request.build_absolute_uri()
+        self.page_size = self.get_page_size(request)
+        self.keys = self.get_keys(request, queryset, view)
+
+        position, self.reverse = self.decode_cursor(request)
+        reverse = self.reverse
+        keys = [self.flip(key) for key in self.keys] if reverse else self.keys
+
+        queryset = queryset.order_by(*[self.order_expression(key) for key in keys])
+        if position is not None:
+            queryset = queryset.filter(self.seek(keys, position))
+
+        rows = list(queryset[:self.page_size + 1])
+        has_more = len(rows) > self.page_size
+        rows = rows[:self.page_size]
+        if reverse:
+            rows.reverse()
+
+        # walking backwards, "more" lies behind us and the page we came
+        # from is still ahead
+        if reverse:
+            self.has_next, self.has_previous = True, has_more
+        else:
+            self.has_next, self.has_previous = has_more, position is not None
+        if not rows:
+            self.has_next = self.has_previous = False
+        else:
+            self.first_key, self.last_key = self.row_key(rows[0]), self.row_key(rows[-1])
+        return rows
+
+    def get_paginated_response(self, data):
+        return Response({
+            'next': self.get_next_link(),
+            'previous': self.get_previous_link(),
+            'results': data,
+        })
+
+    def get_paginated_response_schema(self, schema):
+        return {
+            'type': 'object',
+            'required': ['results'],
+            'properties': {
+                'next': {'type': 'string', 'nullable': True, 'format': 'uri'},
+                'previous': {'type': 'string', 'nullable': True, 'format': 'uri'},
+                'results': schema,
+            },
+        }
+
+    # ------------------------------------------------------
+    #                     ORDERING KEYS
+    # ------------------------------------------------------
+    def get_keys(self, request, queryset, view):
+        """
+        [(attname, descending, model_field), ...] taken from the view's
+        OrderingFilter, with the primary key appended as a tie-breaker.
+        """
+        ordering = None
+        for backend in getattr(view, 'filter_backends', []):
+            if issubclass(backend, OrderingFilter):
+                ordering = backend().get_ordering(request, queryset, view)
+                break
+        ordering = list(ordering or queryset.query.order_by or ['-pk'])
+
+        opts = queryset.model._meta
+        keys = []
+        for name in ordering:
+            descending = name.startswith('-')
+            name = name.lstrip('-')
+            if name in queryset.query.annotations:
+                # e.g. a search rank: keyed on the annotation itself
+                keys.append((name, descending, queryset.query.annotations[name].output_field))
+                continue
+            field = opts.pk if name == 'pk' else opts.get_field(name)
+            keys.append((field.attname, descending, field))
+
+        if opts.pk.attname not in [attname for attname, _, _ in keys]:
+            keys.append((opts.pk.attname, keys[-1][1], opts.pk))
+        return keys
+
+    @staticmethod
+    def flip(key):
+        attname, descending, field = key
+        return (attname, not descending, field)
+
+    def order_expression(self, key):
+        attname, descending, field = key
+        if not field.null:
+            return F(attname).desc() if descending else F(attname).asc()
+        # walking a nulls-last ordering backwards visits the nulls first
+        if not self.reverse:
+            return F(attname).desc(nulls_last=True) if descending else F(attname).asc(nulls_last=True)
+        return F(attname).desc(nulls_first=True) if descending else F(attname).asc(nulls_first=True)
+
+    def after(self, key, value):
+        """Q for rows strictly after `value` on one key."""
+        attname, descending, field = key
+        nulls_last = field.null and not self.reverse
+        if value is None:
+            return Q(pk__in=[]) if nulls_last else Q(**{f'{attname}__isnull': False})
+        q = Q(**{f'{attname}__{"lt" if descending else "gt"}': value})
+        if nulls_last:
+            q |= Q(**{f'{attname}__isnull': True})
+        return q
+
+    @staticmethod
+    def equal(key, value):
+        attname = key[0]
+        if value is None:
+            return Q(**{f'{attname}__isnull': True})
+        return Q(**{attname: value})
+
+    def seek(self, keys, position):
+        """Lexicographic `(k1, k2, ...) > position` as an OR of prefixes."""
+        clauses = []
+        for i, key in enumerate(keys):
+            prefix = [self.equal(keys[j], position[j]) for j in range(i)]
+            clauses.append(reduce(lambda a, b: a & b, prefix, self.after(key, position[i])))
+        return reduce(or_, clauses)
+
+    def row_key(self, row):
+        # rows are model instances, or dicts from a values() queryset
+        if isinstance(row, dict):
+            return [row[attname] for attname, _, _ in self.keys]
+        return [getattr(row, attname) for attname, _, _ in self.keys]
+
+    # ------------------------------------------------------
+    #                       CURSORS
+    # ------------------------------------------------------
+    def get_page_size(self, request):
+        try:
+            size = int(request.query_params[self.page_size_query_param])
+        except (KeyError, ValueError):
+            return self.page_size
+        return max(1, min(size, self.max_page_size))
+
+    def ordering_signature(self):
+        return [('-' if descending else '') + attname for attname, descending, _ in self.keys]
+
+    def encode_cursor(self, key, reverse):
+        payload = {
+            'o': self.ordering_signature(),
+            'p': [self.dump(value) for value in key],
+            'r': reverse,
+        }
+        raw = json.dumps(payload, separators=(',', ':')).encode()
+        cursor = base64.urlsafe_b64encode(raw).decode().rstrip('=')
+        return replace_query_param(self.base_url, self.cursor_query_param, cursor)
+
+    def decode_cursor(self, request):
+        encoded = request.query_params.get(self.cursor_query_param)
+        if not encoded:
+            return None, False
+        try:
+            raw = base64.urlsafe_b64decode(encoded + '=' * (-len(encoded) % 4))
+            payload = json.loads(raw)
+            if payload['o'] != self.ordering_signature():
+                raise ValueError("ordering changed")
+            position = [
+                None if value is None else field.to_python(value)
+                for (_, _, field), value in zip(self.keys, payload['p'], strict=True)
+            ]
+            return position, bool(payload['r'])
+        except (TypeError, ValueError, KeyError, binascii.Error, ValidationError):
+            raise NotFound(self.invalid_cursor_message)
+
+    @staticmethod
+    def dump(value):
+        if value is None or isinstance(value, (int, float, str, bool)):
+            return value
+        return value.isoformat()
+
+    def get_next_link(self):
+        if not self.has_next:
+            return None
+        return self.encode_cursor(self.last_key, reverse=False)
+
+    def get_previous_link(self):
+        if not self.has_previous:
+            return None
+        return self.encode_cursor(self.first_key, reverse=True)
+
+
+class WaterQualityPagination(KeysetPagination):
+    page_size = 500
+
+
+class MaintenancePagination(KeysetPagination):
+    page_size = 100
+
+
+class RollupPagination(KeysetPagination):
+    # a page holds one unit's buckets at the default max_points
+    page_size = 1000
+    max_page_size = 10000
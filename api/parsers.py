@@ -0,0 +1,89 @@
+import json
+from collections import namedtuple
+
+import numpy as np
+from django.conf import settings
+from rest_framework.exceptions import ParseError
+from rest_framework.parsers import BaseParser
+
+try:
+    import msgpack
+except ImportError:  # optional, only needed for MsgpackReadingsParser
+    msgpack = None
+
+
+class NDJSONParser(BaseParser):
+    """
+    Newline-delimited JSON: one object per line, blank lines ignored.
+    Parses into a plain list so views can treat it like a JSON array.
+    """
+    media_type = 'application/x-ndjson'
+
+    def parse(self, stream, media_type=None, parser_context=None):
+        parser_context = parser_context or {}
+        encoding = parser_context.get('encoding', settings.DEFAULT_CHARSET)
+
+        rows = []
+        for lineno, line in enumerate(stream, start=1):
+            line = line.strip()
+            if not line:
+                continue
+            try:
+                rows.append(json.loads(line.decode(encoding)))
+            except ValueError as exc:
+                raise ParseError(f"NDJSON parse error on line {lineno} - {exc}")
+        return rows
+
+
+# ------------------------------------------------------
+#                 PACKED READING BATCHES
+# ------------------------------------------------------
+# little-endian (wu_id u32, epoch_ms i64, tds f32), 16 bytes, no padding
+PACKED_READING = np.dtype([('wu', '<u4'), ('epoch_ms', '<i8'), ('tds', '<f4')])
+
+# column arrays of one batch, see ingest.validate_packed
+PackedReadings = namedtuple('PackedReadings', 'wu epoch_ms tds')
+
+
+class PackedReadingsParser(BaseParser):
+    """
+    Fixed-width binary records, decoded straight into column arrays
+    without building a Python object per reading.
+    """
+    media_type = 'application/x-wq-readings'
+
+    def parse(self, stream, media_type=None, parser_context=None):
+        data = stream.read() if stream is not None else b''
+        if len(data) % PACKED_READING.itemsize:
+            raise ParseError(
+                f"Packed readings parse error - body is not a multiple of "
+                f"{PACKED_READING.itemsize} bytes."
+            )
+        records = np.frombuffer(data, dtype=PACKED_READING)
+        return PackedReadings(records['wu'], records['epoch_ms'], records['tds'])
+
+
+class MsgpackReadingsParser(BaseParser):
+    """
+    msgpack map of equal-length columns: {"wu": [...], "epoch_ms": [...],
+    "tds": [...]}. Available when the msgpack package is installed.
+    """
+    media_type = 'application/x-msgpack'
+
+    def parse(self, stream, media_type=None, parser_context=None):
+        if msgpack is None:
+            raise ParseError("msgpack support is not installed.")
+        try:
+            body = msgpack.unpackb(stream.read() if stream is not None else b'')
+            columns = [np.asarray(body[name], dtype=PACKED_READING[name])
+                       for name in PackedReadings._fields]
+        except (ValueError, TypeError, KeyError, OverflowError, msgpack.UnpackException) as exc:
+            raise ParseError(f"msgpack parse error - {exc}")
+
+        if any(column.ndim != 1 or len(column) != len(columns[0]) for column in columns):
+            raise ParseError("msgpack parse error - columns must be flat lists of equal length.")
+        return PackedReadings(*columns)
+
+
+# parsers accepted by the bulk endpoint besides JSON
+READING_PARSERS = [NDJSONParser, PackedReadingsParser] + ([MsgpackReadingsParser] if msgpack else [])
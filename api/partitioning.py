@@ -0,0 +1,177 @@
+"""
+Optional monthly range partitioning of the WaterQuality table.
+
+Only PostgreSQL has declarative partitioning. On every other backend the
+functions here are no-ops and the composite (wu, date_time) index carries
+the load on its own.
+"""
+from datetime import date
+
+from django.db import connection, transaction
+
+from .models import WaterQuality
+
+
+TABLE = WaterQuality._meta.db_table
+DEFAULT_PARTITION = f"{TABLE}_default"
+
+
+def supports_partitioning(conn=connection):
+    return conn.vendor == 'postgresql'
+
+
+def month_start(day):
+    return date(day.year, day.month, 1)
+
+
+def add_months(day, months):
+    month = day.month - 1 + months
+    return date(day.year + month // 12, month % 12 + 1, 1)
+
+
+def partition_name(month):
+    return f"{TABLE}_y{month.year}m{month.month:02d}"
+
+
+# ------------------------------------------------------
+#                     INTROSPECTION
+# ------------------------------------------------------
+def is_partitioned(conn=connection):
+    if not supports_partitioning(conn):
+        return False
+    with conn.cursor() as cursor:
+        cursor.execute(
+            "SELECT 1 FROM pg_partitioned_table pt "
+            "JOIN pg_class c ON c.oid = pt.partrelid "
+            "WHERE c.relname = %s AND pg_table_is_visible(c.oid)",
+            [TABLE],
+        )
+        return cursor.fetchone() is not None
+
+
+def existing_partitions(conn=connection):
+    with conn.cursor() as cursor:
+        cursor.execute(
+            "SELECT c.relname FROM pg_inherits i "
+            "JOIN pg_class c ON c.oid = i.inhrelid "
+            "JOIN pg_class p ON p.oid = i.inhparent "
+            "WHERE p.relname = %s AND pg_table_is_visible(p.oid)",
+            [TABLE],
+        )
+        return {row[0] for row in cursor.fetchall()}
+
+
+# ------------------------------------------------------
+#                     MAINTENANCE
+# ------------------------------------------------------
+def attach_month(month, conn=connection):
+    """
+    Create the partition for `month` and attach it. Rows that already
+    landed in the default partition for that range are moved across first,
+    otherwise PostgreSQL refuses the attach.
+    """
+    name = partition_name(month)
+    qn = conn.ops.quote_name
+    lower, upper = month.isoformat(), add_months(month, 1).isoformat()
+
+    with transaction.atomic(using=conn.alias), conn.cursor() as cursor:
+        cursor.execute(
+            f"CREATE TABLE {qn(name)} (LIKE {qn(TABLE)} INCLUDING DEFAULTS INCLUDING CONSTRAINTS)"
+        )
+        cursor.execute(
+            f"WITH moved AS (DELETE FROM {qn(DEFAULT_PARTITION)} "
+            f"WHERE date_time >= %s AND date_time < %s RETURNING *) "
+            f"INSERT INTO {qn(name)} SELECT * FROM moved",
+            [lower, upper],
+        )
+        cursor.execute(
+            f"ALTER TABLE {qn(TABLE)} ATTACH PARTITION {qn(name)} "
+            f"FOR VALUES FROM (%s) TO (%s)",
+            [lower, upper],
+        )
+    return name
+
+
+def ensure_partitions(ahead=3, since=None, conn=connection):
+    """
+    Make sure a partition exists for every month from `since` (default:
+    this month) up to `ahead` months in the future. Returns the names of
+    the partitions that were created.
+    """
+    if not is_partitioned(conn):
+        return []
+
+    first = month_start(since or date.today())
+    last = add_months(month_start(date.today()), ahead)
+    present = existing_partitions(conn)
+
+    created = []
+    month = first
+    while month <= last:
+        if partition_name(month) not in present:
+            created.append(attach_month(month, conn))
+        month = add_months(month, 1)
+    return created
+
+
+def convert_to_partitioned(ahead=3, conn=connection):
+    """
+    Rebuild WaterQuality as a table partitioned by month on date_time.
+
+    The primary key becomes (id, date_time) since PostgreSQL requires the
+    partition key in every unique constraint; ids keep coming from a
+    sequence so Django still sees a unique `id`. Runs in one transaction
+    and holds an exclusive lock on the table for the duration of the copy.
+    """
+    if not supports_partitioning(conn):
+        raise NotImplementedError(f"Partitioning is not supported on {conn.vendor}")
+    if is_partitioned(conn):
+        return []
+
+    qn = conn.ops.quote_name
+    staging = f"{TABLE}_partitioned"
+    sequence = f"{TABLE}_id_seq"
+    unit_table = WaterQuality._meta.get_field('wu').related_model._meta.db_table
+
+    with transaction.atomic(using=conn.alias), conn.cursor() as cursor:
+        cursor.execute(f"LOCK TABLE {qn(TABLE)} IN ACCESS EXCLUSIVE MODE")
+        cursor.execute(f"SELECT MIN(date_time), MAX(id) FROM {qn(TABLE)}")
+        oldest, max_id = cursor.fetchone()
+
+        cursor.execute(
+            f"CREATE TABLE {qn(staging)} ("
+            f"id bigint NOT NULL, "
+            f"date_time timestamp with time zone NOT NULL, "
+            f"tds double precision NOT NULL, "
+            f"wu_id bigint NOT NULL, "
+            f"PRIMARY KEY (id, date_time)"
+            f") PARTITION BY RANGE (date_time)"
+        )
+        cursor.execute(
+            f"CREATE TABLE {qn(DEFAULT_PARTITION)} PARTITION OF {qn(staging)} DEFAULT"
+        )
+        cursor.execute(
+            f"INSERT INTO {qn(staging)} (id, date_time, tds, wu_id) "
+            f"SELECT id, date_time, tds, wu_id FROM {qn(TABLE)}"
+        )
+        cursor.execute(f"DROP TABLE {qn(TABLE)} CASCADE")
+        cursor.execute(f"ALTER TABLE {qn(staging)} RENAME TO {qn(TABLE)}")
+
+        cursor.execute(f"CREATE SEQUENCE IF NOT EXISTS {qn(sequence)}")
+        cursor.execute("SELECT setval(%s, %s, false)", [sequence, (max_id or 0) + 1])
+        cursor.execute(
+            f"ALTER TABLE {qn(TABLE)} ALTER COLUMN id SET DEFAULT nextval(%s)", [sequence]
+        )
+        cursor.execute(
+            f"ALTER TABLE {qn(TABLE)} ADD CONSTRAINT {qn(TABLE + '_wu_id_fk')} "
+            f"FOREIGN KEY (wu_id) REFERENCES {qn(unit_table)} (id) "
+            f"DEFERRABLE INITIALLY DEFERRED"
+        )
+
+        # recreate the model indexes on the parent; they cascade to partitions
+        with conn.schema_editor(atomic=False) as editor:
+            for index in WaterQuality._meta.indexes:
+                editor.add_index(WaterQuality, index)
+
+    since = oldest.date() if oldest else None
+    return ensure_partitions(ahead=ahead, since=since, conn=conn)
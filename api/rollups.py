@@ -0,0 +1,202 @@
+"""
+Minute / hour / day TDS aggregates per water unit.
+
+Buckets are aligned in UTC and store count, sum, min and max so that
+new readings can be merged into an existing bucket with a single upsert.
+"""
+from datetime import datetime, time, timedelta, timezone as dt_timezone
+
+from django.db import connection, transaction
+from django.db.models import Count, Sum, Min, Max
+from django.db.models.functions import Trunc
+
+from .models import ArchiveSegment, WaterQuality, WaterQualityRollup
+
+
+RESOLUTIONS = [WaterQualityRollup.MINUTE, WaterQualityRollup.HOUR, WaterQualityRollup.DAY]
+
+BUCKET_WIDTH = {
+    WaterQualityRollup.MINUTE: timedelta(minutes=1),
+    WaterQualityRollup.HOUR: timedelta(hours=1),
+    WaterQualityRollup.DAY: timedelta(days=1),
+}
+
+
+def bucket_start(value, resolution):
+    value = value.astimezone(dt_timezone.utc)
+    if resolution == WaterQualityRollup.MINUTE:
+        return value.replace(second=0, microsecond=0)
+    if resolution == WaterQualityRollup.HOUR:
+        return value.replace(minute=0, second=0, microsecond=0)
+    return value.replace(hour=0, minute=0, second=0, microsecond=0)
+
+
+def pick_resolution(start, end, max_points):
+    """
+    Finest resolution that covers [start, end) in at most `max_points`
+    buckets per unit, falling back to daily buckets.
+    """
+    span = end - start
+    for resolution in RESOLUTIONS:
+        if span / BUCKET_WIDTH[resolution] <= max_points:
+            return resolution
+    return WaterQualityRollup.DAY
+
+
+# ------------------------------------------------------
+#                 INCREMENTAL MAINTENANCE
+# ------------------------------------------------------
+def aggregate_readings(readings):
+    """Fold readings into {(wu_id, resolution, bucket): [count, sum, min, max]}."""
+    buckets = {}
+    for reading in readings:
+        for resolution in RESOLUTIONS:
+            key = (reading.wu_id, resolution, bucket_start(reading.date_time, resolution))
+            agg = buckets.get(key)
+            if agg is None:
+                buckets[key] = [1, reading.tds, reading.tds, reading.tds]
+            else:
+                agg[0] += 1
+                agg[1] += reading.tds
+                agg[2] = min(agg[2], reading.tds)
+                agg[3] = max(agg[3], reading.tds)
+    return buckets
+
+
+def upsert_sql(rows, conn):
+    qn = conn.ops.quote_name
+    table = qn(WaterQualityRollup._meta.db_table)
+    least, greatest = ('LEAST', 'GREATEST') if conn.vendor == 'postgresql' else ('MIN', 'MAX')
+    count, total, low, high = qn('count'), qn('tds_sum'), qn('tds_min'), qn('tds_max')
+
+    values = ', '.join(['(%s, %s, %s, %s, %s, %s, %s)'] * rows)
+    return (
+        f"INSERT INTO {table} (wu_id, resolution, bucket_start, {count}, {total}, {low}, {high}) "
+        f"VALUES {values} "
+        f"ON CONFLICT (wu_id, resolution, bucket_start) DO UPDATE SET "
+        f"{count} = {table}.{count} + excluded.{count}, "
+        f"{total} = {table}.{total} + excluded.{total}, "
+        f"{low} = {least}({table}.{low}, excluded.{low}), "
+        f"{high} = {greatest}({table}.{high}, excluded.{high})"
+    )
+
+
+def apply_readings(readings, batch_size=500, conn=connection):
+    """Merge newly written readings into their rollup buckets."""
+    buckets = aggregate_readings(readings)
+    if not buckets:
+        return
+
+    adapt = conn.ops.adapt_datetimefield_value
+    items = list(buckets.items())
+    with transaction.atomic(using=conn.alias), conn.cursor() as cursor:
+        for start in range(0, len(items), batch_size):
+            chunk = items[start:start + batch_size]
+            params = []
+            for (wu_id, resolution, bucket), agg in chunk:
+                params += [wu_id, resolution, adapt(bucket), *agg]
+            cursor.execute(upsert_sql(len(chunk), conn), params)
+
+
+# ------------------------------------------------------
+#                       REBUILD
+# ------------------------------------------------------
+def floor_day(value):
+    return datetime.combine(value.astimezone(dt_timezone.utc).date(), time.min, dt_timezone.utc)
+
+
+def ceil_day(value):
+    day = floor_day(value)
+    return day if day == value else day + timedelta(days=1)
+
+
+def archive_horizon():
+    """Start of the first day not yet archived, or None when nothing is."""
+    last = ArchiveSegment.objects.aggregate(day=Max('day'))['day']
+    return None if last is None else datetime.combine(last, time.min, dt_timezone.utc) + timedelta(days=1)
+
+
+def rebuild(start=None, end=None, wu_ids=None, batch_size=5000):
+    """
+    Recompute every rollup bucket between `start` and `end` (widened to
+    whole days, unbounded when omitted) for the given units, or all units.
+    Archived days are skipped: their raw readings are gone (see
+    `rebuild_archived_day` for one unit-day).
+    Returns the number of rollup rows written.
+    """
+    readings = WaterQuality.objects.all()
+    rollups = WaterQualityRollup.objects.all()
+
+    horizon = archive_horizon()
+    if horizon is not None and (start is None or start < horizon):
+        start = horizon
+    if start is not None:
+        start = floor_day(start)
+        readings = readings.filter(date_time__gte=start)
+        rollups = rollups.filter(bucket_start__gte=start)
+    if end is not None:
+        end = ceil_day(end)
+        readings = readings.filter(date_time__lt=end)
+        rollups = rollups.filter(bucket_start__lt=end)
+    if wu_ids:
+        readings = readings.filter(wu_id__in=wu_ids)
+        rollups = rollups.filter(wu_id__in=wu_ids)
+
+    written = 0
+    with transaction.atomic():
+        rollups.delete()
+        for resolution in RESOLUTIONS:
+            aggregates = (
+                readings
+                .annotate(bucket=Trunc('date_time', resolution, tzinfo=dt_timezone.utc))
+                .values('wu_id', 'bucket')
+                .annotate(
+                    n=Count('id'), total=Sum('tds'), low=Min('tds'), high=Max('tds')
+                )
+                .order_by()
+            )
+            batch = []
+            for row in aggregates.iterator(chunk_size=batch_size):
+                batch.append(WaterQualityRollup(
+                    wu_id=row['wu_id'], resolution=resolution, bucket_start=row['bucket'],
+                    count=row['n'], tds_sum=row['total'], tds_min=row['low'], tds_max=row['high'],
+                ))
+                if len(batch) >= batch_size:
+                    WaterQualityRollup.objects.bulk_create(batch)
+                    written += len(batch)
+                    batch = []
+            WaterQualityRollup.objects.bulk_create(batch)
+            written += len(batch)
+    return written
+
+
+def rebuild_archived_day(day, wu_id):
+    """
+    Recompute one unit's buckets for an archived day from its archived rows
+    plus the late readings of that day still in the table.
+    """
+    from .archive import archived_rows  # archive builds on this module
+
+    end = day + timedelta(days=1)
+    late = list(WaterQuality.objects.filter(wu_id=wu_id, date_time__gte=day, date_time__lt=end))
+    # a run that died before deleting leaves rows in both; the table is current
+    current = {reading.id for reading in late}
+    archived = [
+        WaterQuality(wu_id=row_wu_id, date_time=date_time, tds=tds)
+        for row_id, row_wu_id, date_time, tds in archived_rows(day, end, match=lambda row: row[1] == wu_id)
+        if row_id not in current
+    ]
+    with transaction.atomic():
+        WaterQualityRollup.objects.filter(wu_id=wu_id, bucket_start__gte=day, bucket_start__lt=end).delete()
+        apply_readings(late + archived)
+
+
+def rebuild_around(readings):
+    """Recompute the day buckets touched by `readings` (after an edit or delete)."""
+    horizon = archive_horizon()
+    for reading in readings:
+        day = floor_day(reading.date_time)
+        if horizon is not None and day < horizon:
+            rebuild_archived_day(day, reading.wu_id)
+        else:
+            rebuild(day, day + timedelta(days=1), wu_ids=[reading.wu_id])
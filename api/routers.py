@@ -0,0 +1,110 @@
+"""
+Read-replica routing.
+
+When `READ_DATABASE_ALIAS` names a second database, viewsets using
+`ReplicaReadMixin` send the queries of safe requests (lists, retrieves,
+exports, analytics, rollups) to it, so long reports do not compete with
+ingest on the primary. Writes always go to `default`.
+
+Read-your-writes: after a successful write, the same user's reads stay on
+the primary for `READ_YOUR_WRITES_SECONDS` (tracked in the default cache,
+so point it at a shared backend when running several processes).
+
+A replica may lag, so responses it renders carry no ETag and stay in the
+response cache for at most `READ_REPLICA_CACHE_TIMEOUT` seconds; they can
+never be mistaken for the current version of the data.
+"""
+from contextvars import ContextVar
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db import DEFAULT_DB_ALIAS
+from rest_framework.permissions import SAFE_METHODS
+
+
+_read_alias = ContextVar('read_alias', default=None)
+
+
+def read_database_alias():
+    return getattr(settings, 'READ_DATABASE_ALIAS', None)
+
+
+def read_your_writes_seconds():
+    return getattr(settings, 'READ_YOUR_WRITES_SECONDS', 5)
+
+
+def read_replica_cache_timeout():
+    return getattr(settings, 'READ_REPLICA_CACHE_TIMEOUT', 5)
+
+
+class ReadReplicaRouter:
+    """Reads follow the alias chosen for the current request, if any."""
+
+    def db_for_read(self, model, **hints):
+        return _read_alias.get()
+
+    def db_for_write(self, model, **hints):
+        return DEFAULT_DB_ALIAS
+
+    def allow_relation(self, obj1, obj2, **hints):
+        # every alias holds the same data
+        return True
+
+
+# ------------------------------------------------------
+#                 READ-YOUR-WRITES PINS
+# ------------------------------------------------------
+def pin_key(user):
+    return f'read-primary:{user.pk}'
+
+
+def pin_to_primary(user):
+    cache.set(pin_key(user), True, read_your_writes_seconds())
+
+
+def is_pinned(user):
+    return bool(user and user.is_authenticated and cache.get(pin_key(user)))
+
+
+# ------------------------------------------------------
+#                  VIEWSET INTEGRATION
+# ------------------------------------------------------
+class ReplicaReadMixin:
+
+    read_alias = DEFAULT_DB_ALIAS
+
+    def choose_read_alias(self, request):
+        replica = read_database_alias()
+        if not replica or request.method not in SAFE_METHODS or is_pinned(request.user):
+            return DEFAULT_DB_ALIAS
+        return replica
+
+    def reads_from_replica(self):
+        return self.read_alias != DEFAULT_DB_ALIAS
+
+    def initial(self, request, *args, **kwargs):
+        super().initial(request, *args, **kwargs)
+        self.read_alias = self.choose_read_alias(request)
+        self.read_alias_token = _read_alias.set(self.read_alias)
+
+    def get_queryset(self):
+        # bound explicitly: streamed responses are evaluated after the view returns
+        return super().get_queryset().using(self.read_alias)
+
+    def cache_timeout(self):
+        timeout = super().cache_timeout()
+        return min(timeout, read_replica_cache_timeout()) if self.reads_from_replica() else timeout
+
+    def serves_current_data(self):
+        return not self.reads_from_replica()
+
+    def finalize_response(self, request, response, *args, **kwargs):
+        response = super().finalize_response(request, response, *args, **kwargs)
+        token = getattr(self, 'read_alias_token', None)
+        if token is not None:
+            _read_alias.reset(token)
+            self.read_alias_token = None
+        if (request.method not in SAFE_METHODS and 200 <= response.status_code < 300
+                and request.user.is_authenticated):
+            pin_to_primary(request.user)
+        return response
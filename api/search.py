@@ -0,0 +1,194 @@
+"""
+Full-text search over maintenance problems and descriptions (`?q=`).
+
+The index lives in the database and is maintained by it, so every write
+path (save, delete, bulk_create, queryset update/delete) keeps it current:
+
+- SQLite: an FTS5 table over api_maintenance (external content, porter
+  stemming, prefix indexes) synced by insert/update/delete triggers.
+- PostgreSQL: a stored generated `search_vector` tsvector column (problem
+  weighted above description) with a GIN index.
+
+Every term of the query matches as a prefix ("pum lea" finds "pump
+leaking"), all terms must match, and results come back best match first
+unless another ordering is asked for.
+
+SQLite drops triggers when a migration rebuilds api_maintenance; they
+are put back, and the index rebuilt, after every `migrate`.
+"""
+import re
+
+from django.db import connection, connections
+from django.db.models.signals import post_migrate
+from django.db.models import BooleanField, F, FloatField, Lookup, Q, Value
+from django.db.models.expressions import RawSQL
+from django.dispatch import receiver
+from rest_framework.filters import OrderingFilter
+
+from .models import Maintenance, MaintenanceSearchEntry
+
+
+SEARCH_PARAM = 'q'
+RANK = 'search_rank'
+
+TERM = re.compile(r'\w+')
+
+FTS_TABLE = MaintenanceSearchEntry._meta.db_table
+
+
+# ------------------------------------------------------
+#                    INDEX DEFINITION
+# ------------------------------------------------------
+def sqlite_statements():
+    table = Maintenance._meta.db_table
+    columns = 'problem, description'
+    return [
+        f"CREATE VIRTUAL TABLE IF NOT EXISTS {FTS_TABLE} USING fts5("
+        f"{columns}, content='{table}', content_rowid='id', "
+        f"tokenize='porter unicode61 remove_diacritics 2', prefix='2 3')",
+        f"CREATE TRIGGER IF NOT EXISTS {FTS_TABLE}_ai AFTER INSERT ON {table} BEGIN "
+        f"INSERT INTO {FTS_TABLE}(rowid, {columns}) VALUES (new.id, new.problem, new.description); END",
+        f"CREATE TRIGGER IF NOT EXISTS {FTS_TABLE}_ad AFTER DELETE ON {table} BEGIN "
+        f"INSERT INTO {FTS_TABLE}({FTS_TABLE}, rowid, {columns}) "
+        f"VALUES ('delete', old.id, old.problem, old.description); END",
+        f"CREATE TRIGGER IF NOT EXISTS {FTS_TABLE}_au AFTER UPDATE OF id, {columns} ON {table} BEGIN "
+        f"INSERT INTO {FTS_TABLE}({FTS_TABLE}, rowid, {columns}) "
+        f"VALUES ('delete', old.id, old.problem, old.description); "
+        f"INSERT INTO {FTS_TABLE}(rowid, {columns}) VALUES (new.id, new.problem, new.description); END",
+        # the `rank` column: bm25 with problem weighing ten times description
+        f"INSERT INTO {FTS_TABLE}({FTS_TABLE}, rank) VALUES ('rank', 'bm25(10.0, 1.0)')",
+        f"INSERT INTO {FTS_TABLE}({FTS_TABLE}) VALUES ('rebuild')",
+    ]
+
+
+def postgres_statements():
+    table = Maintenance._meta.db_table
+    return [
+        f"ALTER TABLE {table} ADD COLUMN IF NOT EXISTS search_vector tsvector GENERATED ALWAYS AS ("
+        f"setweight(to_tsvector('english', coalesce(problem, '')), 'A') || "
+        f"setweight(to_tsvector('english', coalesce(description, '')), 'B')) STORED",
+        f"CREATE INDEX IF NOT EXISTS maintenance_search_idx ON {table} USING GIN (search_vector)",
+    ]
+
+
+def install(conn=connection):
+    """Create (or repair) the search index for the connection's vendor."""
+    statements = {'sqlite': sqlite_statements, 'postgresql': postgres_statements}.get(conn.vendor)
+    if statements is None:
+        return
+    with conn.cursor() as cursor:
+        for sql in statements():
+            cursor.execute(sql)
+
+
+def uninstall(conn=connection):
+    table = Maintenance._meta.db_table
+    if conn.vendor == 'sqlite':
+        statements = [f"DROP TRIGGER IF EXISTS {FTS_TABLE}_{suffix}" for suffix in ('ai', 'ad', 'au')]
+        statements.append(f"DROP TABLE IF EXISTS {FTS_TABLE}")
+    elif conn.vendor == 'postgresql':
+        statements = [
+            "DROP INDEX IF EXISTS maintenance_search_idx",
+            f"ALTER TABLE {table} DROP COLUMN IF EXISTS search_vector",
+        ]
+    else:
+        return
+    with conn.cursor() as cursor:
+        for sql in statements:
+            cursor.execute(sql)
+
+
+def sqlite_triggers():
+    return {f"{FTS_TABLE}_{suffix}" for suffix in ('ai', 'ad', 'au')}
+
+
+@receiver(post_migrate)
+def reinstall_triggers(sender, using='default', **kwargs):
+    """Repair the SQLite index once its triggers went missing with a table rebuild."""
+    conn = connections[using]
+    if sender.label != 'api' or conn.vendor != 'sqlite':
+        return
+    with conn.cursor() as cursor:
+        cursor.execute(
+            "SELECT type, name FROM sqlite_master WHERE name = %s OR tbl_name = %s",
+            [FTS_TABLE, Maintenance._meta.db_table],
+        )
+        found = cursor.fetchall()
+    if ('table', FTS_TABLE) not in found:
+        return  # not migrated that far, or rolled back
+    if sqlite_triggers() <= {name for kind, name in found if kind == 'trigger'}:
+        return
+    # writes made without the triggers are caught up by the rebuild
+    install(conn)
+
+
+# ------------------------------------------------------
+#                        QUERIES
+# ------------------------------------------------------
+def search_terms(text):
+    return TERM.findall(text.lower())
+
+
+def search(queryset, text):
+    """
+    Maintenance rows matching every term of `text` as a prefix, annotated
+    with `search_rank` (lower is better).
+    """
+    terms = search_terms(text)
+    if not terms:
+        return queryset.none()
+
+    table = Maintenance._meta.db_table
+    vendor = connection.vendor
+    if vendor == 'sqlite':
+        # joined, so the index drives the query and ranks each hit once;
+        # bm25 is negative, best first
+        match = ' '.join(f'"{term}"*' for term in terms)
+        return queryset.filter(search_entry__document__match=match).annotate(
+            **{RANK: F('search_entry__rank')}
+        )
+
+    if vendor == 'postgresql':
+        query = ' & '.join(f'{term}:*' for term in terms)
+        rank = RawSQL(
+            f"-ts_rank({table}.search_vector, to_tsquery('english', %s))",
+            [query], output_field=FloatField(),
+        )
+        hits = RawSQL(
+            f"{table}.search_vector @@ to_tsquery('english', %s)", [query], output_field=BooleanField()
+        )
+        return queryset.filter(hits).annotate(**{RANK: rank})
+
+    # other backends: unranked substring match on every term
+    for term in terms:
+        queryset = queryset.filter(Q(problem__icontains=term) | Q(description__icontains=term))
+    return queryset.annotate(**{RANK: Value(0.0, output_field=FloatField())})
+
+
+class FullTextMatch(Lookup):
+    lookup_name = 'match'
+
+    def as_sql(self, compiler, connection):
+        lhs, lhs_params = self.process_lhs(compiler, connection)
+        rhs, rhs_params = self.process_rhs(compiler, connection)
+        return f"{lhs} MATCH {rhs}", [*lhs_params, *rhs_params]
+
+
+MaintenanceSearchEntry._meta.get_field('document').register_lookup(FullTextMatch)
+
+
+class SearchOrderingFilter(OrderingFilter):
+    """Orders search results by relevance unless `?ordering=` says otherwise."""
+
+    def get_default_ordering(self, view):
+        if view.request.query_params.get(SEARCH_PARAM):
+            return [RANK]
+        return super().get_default_ordering(view)
+
+    def get_ordering(self, request, queryset, view):
+        ordering = super().get_ordering(request, queryset, view)
+        if ordering and RANK not in queryset.query.annotations:
+            # relevance only exists for a search
+            ordering = [term for term in ordering if term.lstrip('-') != RANK]
+            return ordering or super().get_default_ordering(view)
+        return ordering
@@ -1,5 +1,29 @@
+import math
+
 from rest_framework import serializers
-from .models import WaterUnit, WaterQuality, Maintenance, Maintainer
+from .models import (
+    WaterUnit, WaterQuality, WaterQualityRollup, LatestReading, Maintenance, Maintainer, AlertRule
+)
+
+
+def finite(value):
+    # FloatField takes "NaN" and "Infinity", which the database or JSON cannot hold
+    if not math.isfinite(value):
+        raise serializers.ValidationError("A valid number is required.")
+
+
+class ExpandableFieldsMixin:
+    """
+    Accepts `expand=[...]` and swaps the named relation fields for nested
+    read-only serializers. The caller is expected to select_related them.
+    """
+    expandable_fields = {}
+
+    def __init__(self, *args, expand=(), **kwargs):
+        super().__init__(*args, **kwargs)
+        for name in expand:
+            if name in self.expandable_fields:
+                self.fields[name] = self.expandable_fields[name](read_only=True)
 
 
 class MaintainerSerializer(serializers.ModelSerializer):
@@ -8,6 +32,13 @@ class MaintainerSerializer(serializers.ModelSerializer):
         fields = ['id', 'name', 'email']
 
 
+class PublicMaintainerSerializer(serializers.ModelSerializer):
+    """What anyone may see of a maintainer, e.g. nested in public reads."""
+    class Meta:
+        model = Maintainer
+        fields = ['id', 'name']
+
+
 class RegisterMaintainerSerializer(serializers.ModelSerializer):
     class Meta:
         model = Maintainer
@@ -28,14 +59,34 @@ class WaterUnitSerializer(serializers.ModelSerializer):
         fields = '__all__'
 
 
-class WaterQualitySerializer(serializers.ModelSerializer):
+class LatestReadingSerializer(serializers.ModelSerializer):
+    class Meta:
+        model = LatestReading
+        fields = ['date_time', 'tds']
+
+
+class WaterUnitStatusSerializer(serializers.ModelSerializer):
+    latest = LatestReadingSerializer(source='latest_reading', read_only=True, default=None)
+
+    class Meta:
+        model = WaterUnit
+        fields = ['id', 'name', 'location', 'latest']
+
+
+class WaterQualitySerializer(ExpandableFieldsMixin, serializers.ModelSerializer):
+    expandable_fields = {'wu': WaterUnitSerializer}
+
     class Meta:
         model = WaterQuality
         fields = '__all__'
         read_only_fields = ["date_time"]
+        extra_kwargs = {'tds': {'validators': [finite]}}
 
 
-class MaintenanceSerializer(serializers.ModelSerializer):
+class MaintenanceSerializer(ExpandableFieldsMixin, serializers.ModelSerializer):
+    # maintenance reads are public: no email addresses
+    expandable_fields = {'wu': WaterUnitSerializer, 'maintainer': PublicMaintainerSerializer}
+
     class Meta:
         model = Maintenance
         fields = '__all__'
@@ -43,3 +94,67 @@ class MaintenanceSerializer(serializers.ModelSerializer):
             'datetime': {'required': False},
         }
 
+
+
+class AlertRuleSerializer(serializers.ModelSerializer):
+    class Meta:
+        model = AlertRule
+        fields = '__all__'
+        read_only_fields = ['firing', 'changed_at', 'created_at']
+
+    def validate(self, attrs):
+        kind = attrs.get('kind', getattr(self.instance, 'kind', None))
+        threshold = attrs.get('threshold', getattr(self.instance, 'threshold', None))
+        if kind == AlertRule.SILENT and threshold is not None and threshold <= 0:
+            raise serializers.ValidationError({'threshold': 'Minutes must be positive.'})
+        if attrs.get('hysteresis', 0) < 0:
+            raise serializers.ValidationError({'hysteresis': 'Must not be negative.'})
+        return attrs
+
+
+class WaterQualityReadingSerializer(serializers.Serializer):
+    """
+    One row of a bulk ingest batch. `wu` is taken as a raw id so the whole
+    batch can be checked against WaterUnit in a single query, and
+    `date_time` is the device's own sample time (defaults to now).
+    """
+    wu = serializers.IntegerField(min_value=1)
+    tds = serializers.FloatField(validators=[finite])
+    date_time = serializers.DateTimeField(required=False)
+
+
+class WaterQualityRollupSerializer(serializers.ModelSerializer):
+    tds_avg = serializers.FloatField(read_only=True)
+
+    class Meta:
+        model = WaterQualityRollup
+        fields = ['wu', 'resolution', 'bucket_start', 'count', 'tds_avg', 'tds_min', 'tds_max']
+
+
+class RollupQuerySerializer(serializers.Serializer):
+    """Query parameters of the rollup endpoint."""
+    wu = serializers.IntegerField(required=False)
+    start = serializers.DateTimeField()
+    end = serializers.DateTimeField(required=False)
+    resolution = serializers.ChoiceField(choices=WaterQualityRollup.RESOLUTIONS, required=False)
+    max_points = serializers.IntegerField(min_value=1, max_value=10000, default=1000)
+
+    def validate(self, attrs):
+        if 'end' in attrs and attrs['end'] <= attrs['start']:
+            raise serializers.ValidationError({"end": "Must be after start."})
+        return attrs
+
+
+class AnalyticsQuerySerializer(serializers.Serializer):
+    """Query parameters of the analytics endpoint, on top of the filters."""
+    wu = serializers.IntegerField()
+    window = serializers.IntegerField(min_value=2, max_value=100000, default=60)
+    z = serializers.FloatField(min_value=0, default=3.0)
+    low = serializers.FloatField(required=False)
+    high = serializers.FloatField(required=False)
+    series = serializers.BooleanField(default=False)
+
+
+class DownsampleQuerySerializer(serializers.Serializer):
+    downsample = serializers.IntegerField(min_value=2, max_value=100000)
+    method = serializers.ChoiceField(choices=['lttb', 'minmax', 'avg'], default='lttb')
@@ -0,0 +1,7 @@
+from django.dispatch import Signal
+
+# Sent once per successful write of one or more WaterQuality rows, after the
+# surrounding transaction has committed.
+#   sender   -> WaterQuality
+#   readings -> list of the WaterQuality instances that were written
+readings_ingested = Signal()
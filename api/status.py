@@ -0,0 +1,103 @@
+"""
+Latest reading per unit, for the fleet overview.
+
+LatestReading is upserted in the same transaction as the readings, and
+the serialized overview lives in the cache until a reading or a unit is
+written.
+"""
+from django.conf import settings
+from django.core.cache import cache
+from django.db import connection, transaction
+from django.db.models.signals import post_save, post_delete
+from django.dispatch import receiver
+
+from .models import WaterUnit, WaterQuality, LatestReading
+from .signals import readings_ingested
+
+
+STATUS_CACHE_KEY = 'water-unit-status'
+
+
+def status_cache_timeout():
+    return getattr(settings, 'STATUS_CACHE_TIMEOUT', 300)
+
+
+# ------------------------------------------------------
+#                    LATEST READINGS
+# ------------------------------------------------------
+def newest_per_unit(readings):
+    newest = {}
+    for reading in readings:
+        current = newest.get(reading.wu_id)
+        if current is None or (reading.date_time, reading.pk or 0) >= (current.date_time, current.pk or 0):
+            newest[reading.wu_id] = reading
+    return newest
+
+
+def upsert_sql(rows, conn):
+    qn = conn.ops.quote_name
+    table = qn(LatestReading._meta.db_table)
+    values = ', '.join(['(%s, %s, %s, %s)'] * rows)
+    # older device timestamps never replace a newer reading
+    return (
+        f"INSERT INTO {table} (wu_id, reading_id, date_time, tds) VALUES {values} "
+        f"ON CONFLICT (wu_id) DO UPDATE SET "
+        f"reading_id = excluded.reading_id, date_time = excluded.date_time, tds = excluded.tds "
+        f"WHERE excluded.date_time >= {table}.date_time"
+    )
+
+
+def apply_latest(readings, conn=connection):
+    """Move each unit's LatestReading forward to the newest of `readings`."""
+    newest = newest_per_unit(readings)
+    if not newest:
+        return
+
+    adapt = conn.ops.adapt_datetimefield_value
+    params = []
+    for wu_id, reading in newest.items():
+        params += [wu_id, reading.pk, adapt(reading.date_time), reading.tds]
+    with conn.cursor() as cursor:
+        cursor.execute(upsert_sql(len(newest), conn), params)
+
+
+def refresh_latest(wu_ids):
+    """Recompute LatestReading from scratch, after an edit or delete."""
+    for wu_id in set(wu_ids):
+        reading = WaterQuality.objects.filter(wu_id=wu_id).order_by('-date_time', '-id').first()
+        if reading is None:
+            LatestReading.objects.filter(wu_id=wu_id).delete()
+        else:
+            LatestReading.objects.update_or_create(wu_id=wu_id, defaults={
+                'reading_id': reading.pk, 'date_time': reading.date_time, 'tds': reading.tds,
+            })
+    transaction.on_commit(invalidate_status)
+
+
+# ------------------------------------------------------
+#                     STATUS CACHE
+# ------------------------------------------------------
+def unit_status():
+    """Every unit with its latest reading, from the cache or one query."""
+    from .serializers import WaterUnitStatusSerializer
+
+    data = cache.get(STATUS_CACHE_KEY)
+    if data is None:
+        units = WaterUnit.objects.select_related('latest_reading').order_by('id')
+        data = list(WaterUnitStatusSerializer(units, many=True).data)
+        cache.set(STATUS_CACHE_KEY, data, status_cache_timeout())
+    return data
+
+
+def invalidate_status():
+    cache.delete(STATUS_CACHE_KEY)
+
+
+@receiver(readings_ingested)
+def readings_changed(sender, readings, **kwargs):
+    invalidate_status()
+
+
+@receiver([post_save, post_delete], sender=WaterUnit)
+def unit_changed(sender, **kwargs):
+    transaction.on_commit(invalidate_status)
@@ -0,0 +1,159 @@
+"""
+Synthetic fleets for benchmarks and load tests (`manage.py generate_fleet`).
+
+Every unit gets its own baseline TDS, a diurnal swing that peaks in the
+afternoon, sensor noise and a phase offset, so units do not all report in
+the same second. Now and then a unit starts fouling: its TDS climbs step
+by step until a "High TDS" maintenance record is opened and the level
+drops back to the baseline. Routine services are scattered in between.
+
+The simulation steps through time for the whole fleet at once with numpy.
+Rows are inserted in time order, as live ingest would write them, with
+raw executemany in chunks of `batch` rows. Rollups, LatestReading and the
+cache versions are then brought up to date. The same seed gives the same
+fleet.
+"""
+import math
+from datetime import timedelta
+
+import numpy as np
+from django.db import connection, transaction
+from django.utils import timezone
+
+from .models import WaterUnit, WaterQuality, Maintenance
+from .rollups import rebuild
+from .status import refresh_latest
+from .versions import bump, bump_readings
+
+
+AREAS = ["North", "South", "East", "West", "Central", "Harbour", "Hillside", "Riverside"]
+
+ROUTINE = [
+    ("Routine service", "Pre-filters replaced and housing cleaned."),
+    ("Routine service", "Sediment cartridge changed, flow rate checked."),
+    ("Sensor calibration", "TDS probe recalibrated against reference solution."),
+    ("Leak inspection", "Fittings tightened after minor leak at the inlet valve."),
+    ("Pump check", "Booster pump pressure verified, no fault found."),
+]
+
+# per step: chance a clean unit starts fouling, and of a routine visit
+FOULING_CHANCE = 0.002
+ROUTINE_CHANCE = 0.0005
+
+
+def fleet_profile(rng, units):
+    """Per-unit parameters as arrays."""
+    return {
+        'base': rng.uniform(80, 250, units),
+        'swing': rng.uniform(10, 60, units),
+        'peak_hour': rng.normal(15, 1.5, units),
+        'noise': rng.uniform(2, 8, units),
+        # climb per step while fouling, and the level that gets a unit serviced
+        'fouling_rate': rng.uniform(0.5, 3.0, units),
+        'limit': rng.uniform(1.5, 2.2, units),
+    }
+
+
+def create_units(count):
+    first = (WaterUnit.objects.order_by('-id').values_list('id', flat=True).first() or 0) + 1
+    WaterUnit.objects.bulk_create(
+        WaterUnit(name=f"Unit {first + i}", location=f"{AREAS[i % len(AREAS)]} {1 + i // len(AREAS)}")
+        for i in range(count)
+    )
+    return np.array(
+        WaterUnit.objects.filter(id__gte=first).order_by('id').values_list('id', flat=True)[:count]
+    )
+
+
+def generate_fleet(units, readings, interval=timedelta(minutes=5), end=None, seed=0,
+                   batch=50000, rollups=True, progress=None):
+    """
+    Create `units` units with `readings` readings each, the last one just
+    before `end` (default now). Returns a summary dict; `progress(rows)` is
+    called after each chunk.
+    """
+    rng = np.random.default_rng(seed)
+    end = end or timezone.now()
+    start = end - interval * readings
+    step_seconds = interval.total_seconds()
+
+    wu_ids = create_units(units)
+    wu_list = wu_ids.tolist()
+    profile = fleet_profile(rng, units)
+    phase = rng.uniform(0, step_seconds, units)
+    fouling = np.zeros(units)
+    fouling_on = np.zeros(units, dtype=bool)
+
+    table = connection.ops.quote_name(WaterQuality._meta.db_table)
+    sql = f"INSERT INTO {table} (wu_id, date_time, tds) VALUES (%s, %s, %s)"
+    adapt = connection.ops.adapt_datetimefield_value
+
+    maintenance = []
+    rows = []
+    written = 0
+
+    def flush():
+        nonlocal rows, written
+        with transaction.atomic(), connection.cursor() as cursor:
+            cursor.executemany(sql, rows)
+        written += len(rows)
+        rows = []
+        if progress:
+            progress(written)
+
+    for step in range(readings):
+        moment = start + interval * step
+        stamps = [moment + timedelta(seconds=offset) for offset in phase.tolist()]
+        local = timezone.localtime(moment)
+        hours = local.hour + local.minute / 60 + local.second / 3600 + phase / 3600
+
+        tds = (
+            profile['base']
+            + profile['swing'] * np.cos(2 * math.pi * (hours - profile['peak_hour']) / 24)
+            + fouling
+            + rng.normal(0, 1, units) * profile['noise']
+        )
+        tds = np.round(np.clip(tds, 0, None), 1)
+        rows += zip(wu_list, map(adapt, stamps), tds.tolist())
+
+        # fouling: climbs until serviced, then back to the baseline
+        fouling_on |= rng.random(units) < FOULING_CHANCE
+        fouling[fouling_on] += profile['fouling_rate'][fouling_on]
+        serviced = fouling_on & (tds > profile['base'] * profile['limit'])
+        for index in np.flatnonzero(serviced).tolist():
+            maintenance.append(Maintenance(
+                wu_id=wu_list[index], datetime=stamps[index] + timedelta(minutes=int(rng.integers(20, 240))),
+                problem="High TDS",
+                description=f"TDS reached {tds[index]:g} ppm. Membrane fouling, RO membrane "
+                            f"flushed and carbon filter replaced.",
+            ))
+        fouling[serviced] = 0
+        fouling_on &= ~serviced
+
+        for index in np.flatnonzero(rng.random(units) < ROUTINE_CHANCE).tolist():
+            problem, description = ROUTINE[int(rng.integers(len(ROUTINE)))]
+            maintenance.append(Maintenance(
+                wu_id=wu_list[index], datetime=stamps[index], problem=problem, description=description,
+            ))
+
+        if len(rows) >= batch:
+            flush()
+    if rows:
+        flush()
+
+    # a fouling service may be scheduled past `end`; keep only what happened
+    maintenance = [record for record in maintenance if record.datetime < end]
+    Maintenance.objects.bulk_create(maintenance, batch_size=1000)
+
+    with transaction.atomic():
+        if rollups:
+            rebuild(start, end, wu_ids=wu_list)
+        refresh_latest(wu_list)
+        # bulk writes skip the signals that normally invalidate cached responses
+        bump_readings(wu_list)
+        bump('water-unit', 'maintenance', *(f'maintenance:wu:{wu_id}' for wu_id in wu_list))
+
+    return {
+        'units': units, 'readings': written, 'maintenance': len(maintenance),
+        'start': start, 'end': end,
+    }
@@ -0,0 +1,136 @@
+from datetime import timedelta
+from unittest import mock
+
+from django.core.management import call_command
+from django.db import OperationalError
+from django.utils import timezone
+from rest_framework.test import APITestCase
+from rest_framework.authtoken.models import Token
+
+from api.alerts import engine, apply_change, check_silence
+from api.versions import get_versions
+from api.ingest import write_readings
+from api.models import WaterUnit, WaterQuality, Maintenance, Maintainer, AlertRule
+
+
+class AlertEngineTest(APITestCase):
+
+    def setUp(self):
+        engine.invalidate()
+        engine.last_seen.clear()
+        # rules of rolled-back tests must not fire for reused unit ids
+        self.addCleanup(engine.invalidate)
+        self.addCleanup(engine.last_seen.clear)
+        self.unit = WaterUnit.objects.create(name="Unit 1", location="Area 1")
+        self.start = timezone.now() - timedelta(hours=1)
+        self.sent = 0
+
+    def ingest(self, *values, unit=None):
+        readings = []
+        for tds in values:
+            self.sent += 1
+            readings.append(WaterQuality(
+                wu=unit or self.unit, tds=tds, date_time=self.start + timedelta(seconds=self.sent)
+            ))
+        with self.captureOnCommitCallbacks(execute=True):
+            write_readings(readings)
+
+    def rule(self, **kwargs):
+        with self.captureOnCommitCallbacks(execute=True):
+            return AlertRule.objects.create(wu=self.unit, **kwargs)
+
+    def test_threshold_with_hysteresis(self):
+        rule = self.rule(kind=AlertRule.ABOVE, threshold=500, hysteresis=50)
+
+        self.ingest(400, 600, 700)
+        self.assertEqual(Maintenance.objects.count(), 1)
+        record = Maintenance.objects.get()
+        self.assertEqual(record.wu, self.unit)
+        self.assertEqual(record.problem, "TDS above 500")
+        self.assertIn("600", record.description)
+        rule.refresh_from_db()
+        self.assertTrue(rule.firing)
+
+        self.ingest(480)  # inside the hysteresis band: still firing
+        self.ingest(440, 650)
+        self.assertEqual(Maintenance.objects.count(), 2)
+
+    def test_failed_change_does_not_stop_other_receivers(self):
+        rule = self.rule(kind=AlertRule.ABOVE, threshold=500)
+        before = get_versions([f'water-quality:wu:{self.unit.id}'])
+        with mock.patch('api.alerts.apply_change', side_effect=OperationalError("database is locked")), \
+                self.assertLogs('api.alerts', 'ERROR'):
+            self.ingest(600)
+        self.assertNotEqual(get_versions([f'water-quality:wu:{self.unit.id}']), before)
+        rule.refresh_from_db()
+        self.assertFalse(rule.firing)
+
+        # reloaded from the database, so the next crossing fires
+        self.ingest(650)
+        self.assertEqual(Maintenance.objects.count(), 1)
+
+    def test_below(self):
+        self.rule(kind=AlertRule.BELOW, threshold=50, hysteresis=10)
+        self.ingest(40, 55, 30, 61, 20)
+        self.assertEqual(Maintenance.objects.count(), 2)
+
+    def test_no_queries_without_state_change(self):
+        self.rule(kind=AlertRule.ABOVE, threshold=500)
+        engine.rules()
+        readings = [WaterQuality(wu=self.unit, tds=100, date_time=self.start)] * 100
+        with self.assertNumQueries(0):
+            self.assertEqual(engine.evaluate(readings), [])
+
+    def test_stale_readings_are_skipped(self):
+        self.rule(kind=AlertRule.ABOVE, threshold=500)
+        self.ingest(100)
+        late = WaterQuality(wu=self.unit, tds=900, date_time=self.start - timedelta(days=1))
+        self.assertEqual(engine.evaluate([late]), [])
+
+    def test_only_one_process_opens_maintenance(self):
+        rule = self.rule(kind=AlertRule.ABOVE, threshold=500)
+        # another process already flipped the rule
+        AlertRule.objects.filter(pk=rule.pk).update(firing=True)
+        self.ingest(900)
+        self.assertFalse(Maintenance.objects.exists())
+
+        cached = engine.rules()[self.unit.id][0]
+        self.assertTrue(cached.firing)
+        self.assertIsNone(apply_change(cached, True))
+
+    def test_silent_units(self):
+        rule = self.rule(kind=AlertRule.SILENT, threshold=30)
+        self.ingest(100)
+        self.assertEqual(check_silence(now=self.start + timedelta(minutes=10)), [])
+
+        fired = check_silence(now=self.start + timedelta(minutes=45))
+        self.assertEqual([r.id for r in fired], [rule.id])
+        self.assertEqual(Maintenance.objects.get().problem, "No data for 30 minutes")
+        # already firing: not opened twice
+        call_command('check_alerts', stdout=open('/dev/null', 'w'))
+        self.assertEqual(Maintenance.objects.count(), 1)
+
+        self.ingest(100)
+        rule.refresh_from_db()
+        self.assertFalse(rule.firing)
+
+    def test_rules_api(self):
+        user = Maintainer.objects.create_user("alerts@example.com", "Alerts", "pass1234")
+        self.client.credentials(HTTP_AUTHORIZATION=f"Token {Token.objects.create(user=user).key}")
+        engine.rules()
+
+        with self.captureOnCommitCallbacks(execute=True):
+            res = self.client.post("/api/alert-rule/", {
+                "wu": self.unit.id, "kind": "above", "threshold": 300, "hysteresis": 20,
+            }, format="json")
+        self.assertEqual(res.status_code, 201)
+        self.assertFalse(res.data["firing"])
+
+        # picked up without waiting for the refresh interval
+        self.ingest(350)
+        self.assertEqual(Maintenance.objects.count(), 1)
+
+        res = self.client.post("/api/alert-rule/", {
+            "wu": self.unit.id, "kind": "silent", "threshold": 0,
+        }, format="json")
+        self.assertEqual(res.status_code, 400)
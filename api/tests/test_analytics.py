@@ -0,0 +1,67 @@
+from datetime import timedelta
+
+import numpy as np
+from django.utils import timezone
+from rest_framework.test import APITestCase
+
+from api.analytics import analyze, rolling_mean_std
+from api.models import WaterUnit, WaterQuality
+
+
+class RollingStatsTest(APITestCase):
+
+    def test_matches_naive_window(self):
+        values = np.random.default_rng(0).normal(200, 15, 500)
+        mean, std = rolling_mean_std(values, 20)
+
+        self.assertTrue(np.isnan(mean[:20]).all())
+        for i in [20, 137, 499]:
+            window = values[i - 20:i]
+            self.assertAlmostEqual(mean[i], window.mean(), places=8)
+            self.assertAlmostEqual(std[i], window.std(), places=6)
+
+    def test_spike_after_flat_window(self):
+        values = np.array([200.0] * 30 + [200.4, 260.0])
+        times = np.arange(len(values), dtype=float)
+        result, (_, _, _, std, _) = analyze(times, values, window=20)
+        # a flat window's rolling std is float residue, not exactly 0
+        self.assertLess(std[30], 1e-6)
+        # jitter below the sensor resolution is not an anomaly, the spike is
+        self.assertEqual([a[1] for a in result["anomalies"]], [260.0])
+
+
+class AnalyticsEndpointTest(APITestCase):
+
+    def setUp(self):
+        self.unit = WaterUnit.objects.create(name="Unit 1", location="Area 1")
+        start = timezone.now() - timedelta(days=1)
+        tds = [200 + (i % 5) for i in range(100)]
+        tds[80] = 900
+        WaterQuality.objects.bulk_create(
+            WaterQuality(wu=self.unit, tds=v, date_time=start + timedelta(minutes=i))
+            for i, v in enumerate(tds)
+        )
+
+    def test_flags_spike_and_breaches(self):
+        res = self.client.get(
+            "/api/water-quality/analytics/",
+            {"wu": self.unit.id, "window": 30, "high": 500},
+        )
+        self.assertEqual(res.status_code, 200)
+        self.assertEqual(res.data["count"], 100)
+        self.assertEqual([a["tds"] for a in res.data["anomalies"]], [900])
+        self.assertEqual(res.data["breaches"]["above"], 1)
+        self.assertEqual(res.data["summary"]["max"], 900)
+
+    def test_series_and_filters(self):
+        res = self.client.get(
+            "/api/water-quality/analytics/",
+            {"wu": self.unit.id, "max_tds": 500, "series": "true", "window": 10},
+        )
+        self.assertEqual(res.data["count"], 99)
+        self.assertEqual(len(res.data["series"]["tds"]), 99)
+        self.assertIsNone(res.data["series"]["mean"][0])
+
+    def test_requires_unit(self):
+        res = self.client.get("/api/water-quality/analytics/")
+        self.assertEqual(res.status_code, 400)
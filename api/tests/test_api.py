@@ -1,3 +1,4 @@
+from django.core.cache import caches
 from rest_framework.test import APITestCase
 from django.urls import reverse
 from rest_framework import status
@@ -9,6 +10,9 @@ from api.models import WaterUnit, WaterQuality, Maintenance, Maintainer
 class APITest(APITestCase):
 
     def setUp(self):
+        for cache in caches.all():
+            cache.clear()
+
         # ---------------------------
         # 1. Register a maintainer
         # ---------------------------
@@ -113,13 +117,14 @@ class APITest(APITestCase):
         # Filter tds >= 200
         res = self.client.get("/api/water-quality/?min_tds=200")
         self.assertEqual(res.status_code, 200)
-        self.assertEqual(len(res.data), 1)
-        self.assertEqual(res.data[0]["tds"], 300)
+        self.assertEqual(len(res.data["results"]), 1)
+        self.assertEqual(res.data["results"][0]["tds"], 300)
 
         # Test ordering
         res = self.client.get("/api/water-quality/?ordering=-tds")
         self.assertEqual(res.status_code, 200)
-        self.assertGreaterEqual(res.data[0]["tds"], res.data[-1]["tds"])
+        results = res.data["results"]
+        self.assertGreaterEqual(results[0]["tds"], results[-1]["tds"])
 
 
     # -------------------------------------------------------------------
@@ -142,10 +147,51 @@ class APITest(APITestCase):
         # FILTER maintenance by problem_contains
         res = self.client.get("/api/maintenance/?problem_contains=motor")
         self.assertEqual(res.status_code, 200)
-        self.assertEqual(len(res.data), 1)
+        self.assertEqual(len(res.data["results"]), 1)
 
         # FILTER by date
         today = timezone.now().date().isoformat()
         res = self.client.get(f"/api/maintenance/?date={today}")
         self.assertEqual(res.status_code, 200)
 
+
+
+    # -------------------------------------------------------------------
+    #                     QUERY COUNT REGRESSIONS
+    # -------------------------------------------------------------------
+
+    def test_list_query_counts(self):
+        maintainer = Maintainer.objects.get(pk=self.maintainer_id)
+        units = WaterUnit.objects.bulk_create(
+            WaterUnit(name=f"Unit {i}", location="Area") for i in range(20)
+        )
+        now = timezone.now()
+        WaterQuality.objects.bulk_create(
+            WaterQuality(wu=units[i % 20], tds=i, date_time=now) for i in range(500)
+        )
+        Maintenance.objects.bulk_create(
+            Maintenance(
+                wu=units[i % 20], maintainer=maintainer, datetime=now,
+                problem="Filter", description="Replaced",
+            )
+            for i in range(500)
+        )
+
+        # one query for the page, however many rows it has; the first request
+        # caches the token
+        self.client.get("/api/user/")
+        for url in [
+            "/api/water-unit/",
+            "/api/water-quality/?page_size=500",
+            "/api/water-quality/?page_size=500&expand=wu",
+            "/api/maintenance/?page_size=500",
+            "/api/maintenance/?page_size=500&expand=wu,maintainer",
+        ]:
+            with self.assertNumQueries(1, msg=url):
+                res = self.client.get(url)
+            self.assertEqual(res.status_code, 200)
+
+        res = self.client.get("/api/maintenance/?page_size=1&expand=wu,maintainer")
+        record = res.data["results"][0]
+        self.assertEqual(record["wu"]["name"], "Unit 19")
+        self.assertNotIn("email", record["maintainer"])
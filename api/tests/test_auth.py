@@ -0,0 +1,121 @@
+from django.utils import timezone
+from rest_framework.test import APITestCase, APIClient
+from rest_framework.authtoken.models import Token
+from rest_framework_simplejwt.tokens import AccessToken, RefreshToken
+
+from api.auth import denylist, principals
+from api.models import Maintainer, RevokedToken, WaterUnit
+
+
+class AuthenticationTest(APITestCase):
+
+    def setUp(self):
+        principals.clear()
+        denylist.clear()
+        self.user = Maintainer.objects.create_user("auth@example.com", "Auth", "pass1234")
+        self.token = Token.objects.create(user=self.user)
+
+    def login(self):
+        res = self.client.post(
+            "/api/auth/login/", {"email": "auth@example.com", "password": "pass1234"}, format="json"
+        )
+        self.assertEqual(res.status_code, 200)
+        return res.data
+
+    def jwt(self):
+        return self.login()["access"]
+
+    def refresh(self, token):
+        return self.client.post("/api/auth/refresh/", {"refresh": token}, format="json")
+
+    def test_jwt_reads_need_no_queries(self):
+        self.client.credentials(HTTP_AUTHORIZATION=f"Bearer {self.jwt()}")
+
+        res = self.client.get("/api/user/")  # loads the denylist
+        self.assertEqual(res.data, {"id": self.user.id, "name": "Auth", "email": "auth@example.com"})
+
+        with self.assertNumQueries(0):
+            res = self.client.get("/api/user/")
+        self.assertEqual(res.status_code, 200)
+
+    def test_jwt_logout_revokes(self):
+        tokens = self.login()
+        self.client.credentials(HTTP_AUTHORIZATION=f"Bearer {tokens['access']}")
+        self.assertEqual(self.client.post("/api/logout/").status_code, 400)  # refresh missing
+        res = self.client.post("/api/logout/", {"refresh": tokens["refresh"]}, format="json")
+        self.assertEqual(res.status_code, 200)
+        self.assertTrue(RevokedToken.objects.exists())
+
+        self.assertEqual(self.client.get("/api/user/").status_code, 401)
+        self.client.credentials()
+        self.assertEqual(self.refresh(tokens["refresh"]).status_code, 401)
+        self.client.credentials(HTTP_AUTHORIZATION=f"Bearer {tokens['access']}")
+
+        # other processes pick it up on their next denylist refresh
+        denylist.clear()
+        principals.clear()
+        self.assertEqual(self.client.get("/api/user/").status_code, 401)
+
+    def test_refresh_rotates_and_rereads_claims(self):
+        self.user.is_admin = True
+        self.user.save()
+        tokens = self.login()
+        self.user.is_admin = False
+        self.user.save()
+
+        res = self.refresh(tokens["refresh"])
+        self.assertEqual(res.status_code, 200)
+        self.assertIs(AccessToken(res.data["access"])["is_admin"], False)
+        self.assertNotIn("is_admin", RefreshToken(res.data["refresh"]).payload)
+
+        # the old refresh token was used up by the rotation
+        self.assertEqual(self.refresh(tokens["refresh"]).status_code, 401)
+        self.assertEqual(self.refresh(res.data["refresh"]).status_code, 200)
+
+    def test_bad_jwt(self):
+        self.client.credentials(HTTP_AUTHORIZATION="Bearer not-a-token")
+        self.assertEqual(self.client.get("/api/user/").status_code, 401)
+
+    def test_legacy_token_is_cached_until_deleted(self):
+        self.client.credentials(HTTP_AUTHORIZATION=f"Token {self.token.key}")
+        with self.assertNumQueries(1):
+            self.client.get("/api/user/")
+        with self.assertNumQueries(0):
+            res = self.client.get("/api/user/")
+        self.assertEqual(res.data["email"], "auth@example.com")
+
+        self.assertEqual(self.client.post("/api/logout/").status_code, 200)
+        self.assertEqual(self.client.get("/api/user/").status_code, 401)
+
+    def test_cookie(self):
+        self.client.cookies["auth_token"] = self.token.key
+        res = self.client.get("/api/user/")
+        self.assertEqual(res.data["id"], self.user.id)
+
+    def test_cookie_requires_csrf_for_writes(self):
+        client = APIClient(enforce_csrf_checks=True)
+        client.cookies["auth_token"] = self.token.key
+        unit = WaterUnit.objects.create(name="Unit", location="Area")
+        record = {
+            "wu": unit.id, "datetime": timezone.now().isoformat(),
+            "problem": "Pump", "description": "Leak",
+        }
+
+        # a cross-site form post carries the cookie but no CSRF token
+        res = client.post("/api/maintenance/", record, format="json")
+        self.assertEqual(res.status_code, 403)
+        self.assertIn("CSRF", res.data["detail"])
+        res = client.post("/api/water-quality/ingest/", [{"wu": unit.id, "tds": 1}], format="json")
+        self.assertEqual(res.status_code, 403)
+
+        csrf = "x" * 32
+        client.cookies["csrftoken"] = csrf
+        res = client.post("/api/maintenance/", record, format="json", HTTP_X_CSRFTOKEN=csrf)
+        self.assertEqual(res.status_code, 201)
+
+        # reads and header credentials need no token
+        self.assertEqual(client.get("/api/user/").status_code, 200)
+        del client.cookies["auth_token"]
+        client.credentials(HTTP_AUTHORIZATION=f"Token {self.token.key}")
+        res = client.post("/api/maintenance/", record, format="json")
+        self.assertEqual(res.status_code, 201)
@@ -0,0 +1,117 @@
+from django.core.cache import caches
+from django.test import override_settings
+from django.utils import timezone
+from rest_framework.test import APITestCase
+from rest_framework.authtoken.models import Token
+
+from api.caching import stats
+from api.models import WaterUnit, WaterQuality, Maintainer, Maintenance
+
+
+class ResponseCacheTest(APITestCase):
+
+    def setUp(self):
+        for cache in caches.all():
+            cache.clear()
+        stats.reset()
+
+        user = Maintainer.objects.create_user("cache@example.com", "cache", "pass1234")
+        user.is_admin = True
+        user.save()
+        token = Token.objects.create(user=user)
+        self.client.credentials(HTTP_AUTHORIZATION=f"Token {token.key}")
+
+        self.units = [
+            WaterUnit.objects.create(name=f"Unit {i}", location="Area") for i in range(2)
+        ]
+        for unit in self.units:
+            WaterQuality.objects.create(wu=unit, tds=100, date_time=timezone.now())
+
+    def ingest(self, unit, tds):
+        with self.captureOnCommitCallbacks(execute=True):
+            res = self.client.post("/api/water-quality/bulk/", [{"wu": unit.id, "tds": tds}], format="json")
+        self.assertEqual(res.status_code, 201)
+
+    def test_hit_serves_identical_bytes(self):
+        first = self.client.get(f"/api/water-quality/?wu={self.units[0].id}")
+        self.assertEqual(first["X-Cache"], "MISS")
+
+        with self.assertNumQueries(0):  # the token is cached too
+            second = self.client.get(f"/api/water-quality/?wu={self.units[0].id}")
+        self.assertEqual(second["X-Cache"], "HIT")
+        self.assertEqual(second.content, first.content)
+
+    @override_settings(SINGLE_WORKER=False)
+    def test_bypassed_with_per_process_versions(self):
+        url = f"/api/water-quality/?wu={self.units[0].id}"
+        self.client.get(url)
+        res = self.client.get(url)
+        self.assertEqual(res.status_code, 200)
+        self.assertNotIn("X-Cache", res)
+        self.assertEqual(stats.snapshot()["stores"], 0)
+
+    def test_key_is_normalized(self):
+        a, _ = self.units
+        self.client.get(f"/api/water-quality/?wu={a.id}&min_tds=50&ignored=1")
+        res = self.client.get(f"/api/water-quality/?min_tds=50&wu={a.id}")
+        self.assertEqual(res["X-Cache"], "HIT")
+
+    def test_write_invalidates_only_its_unit(self):
+        a, b = self.units
+        self.client.get(f"/api/water-quality/?wu={a.id}")
+        self.client.get(f"/api/water-quality/?wu={b.id}")
+        self.client.get("/api/water-quality/")
+
+        self.ingest(b, 300)
+
+        self.assertEqual(self.client.get(f"/api/water-quality/?wu={a.id}")["X-Cache"], "HIT")
+        res = self.client.get(f"/api/water-quality/?wu={b.id}")
+        self.assertEqual(res["X-Cache"], "MISS")
+        self.assertEqual(len(res.json()["results"]), 2)
+        self.assertEqual(self.client.get("/api/water-quality/")["X-Cache"], "MISS")
+
+    def test_stats_endpoint(self):
+        url = f"/api/water-quality/?wu={self.units[0].id}"
+        self.client.get(url)
+        self.client.get(url)
+        self.client.get(url)
+
+        res = self.client.get("/api/cache/stats/")
+        self.assertEqual(res.status_code, 200)
+        self.assertEqual(res.data["hits"], 2)
+        self.assertEqual(res.data["misses"], 1)
+        self.assertAlmostEqual(res.data["hit_ratio"], 2 / 3, places=3)
+
+        caches["responses"].clear()
+        self.client.get(url)
+        self.assertEqual(stats.snapshot()["evictions"], 1)
+
+    def test_expanded_relations_invalidate(self):
+        maintainer = Maintainer.objects.get(email="cache@example.com")
+        Maintenance.objects.create(
+            wu=self.units[0], maintainer=maintainer, datetime=timezone.now(),
+            problem="Pump", description="Leak",
+        )
+        url = "/api/maintenance/?expand=wu,maintainer"
+        self.client.credentials()  # public read
+
+        first = self.client.get(url)
+        nested = first.data["results"][0]["maintainer"]
+        self.assertEqual(nested, {"id": maintainer.id, "name": "cache"})  # no email
+        self.assertEqual(self.client.get(url)["X-Cache"], "HIT")
+
+        with self.captureOnCommitCallbacks(execute=True):
+            WaterUnit.objects.filter(pk=self.units[0].pk).update(name="Renamed")
+            self.units[0].refresh_from_db()
+            self.units[0].save()
+        res = self.client.get(url, HTTP_IF_NONE_MATCH=first["ETag"])
+        self.assertEqual(res.status_code, 200)
+        self.assertEqual(res["X-Cache"], "MISS")
+        self.assertEqual(res.data["results"][0]["wu"]["name"], "Renamed")
+
+        with self.captureOnCommitCallbacks(execute=True):
+            maintainer.name = "Someone else"
+            maintainer.save()
+        res = self.client.get(url)
+        self.assertEqual(res["X-Cache"], "MISS")
+        self.assertEqual(res.data["results"][0]["maintainer"]["name"], "Someone else")
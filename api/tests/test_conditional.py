@@ -0,0 +1,99 @@
+from django.core.cache import caches
+from django.test import override_settings
+from django.utils import timezone
+from rest_framework.test import APITestCase
+from rest_framework.authtoken.models import Token
+
+from api.models import WaterUnit, Maintenance, Maintainer
+
+
+class ConditionalGetTest(APITestCase):
+
+    def setUp(self):
+        for cache in caches.all():
+            cache.clear()
+        self.user = Maintainer.objects.create_user("etag@example.com", "etag", "pass1234")
+        token = Token.objects.create(user=self.user)
+        self.client.credentials(HTTP_AUTHORIZATION=f"Token {token.key}")
+
+        with self.captureOnCommitCallbacks(execute=True):
+            self.units = [
+                WaterUnit.objects.create(name=f"Unit {i}", location="Area") for i in range(2)
+            ]
+
+    def add_maintenance(self, unit):
+        with self.captureOnCommitCallbacks(execute=True):
+            return Maintenance.objects.create(
+                wu=unit, datetime=timezone.now(), problem="Filter", description="",
+                maintainer=self.user,
+            )
+
+    def test_unit_list_304_without_queries(self):
+        res = self.client.get("/api/water-unit/")
+        self.assertEqual(res.status_code, 200)
+        etag = res["ETag"]
+
+        with self.assertNumQueries(0):  # the token is cached too
+            res = self.client.get("/api/water-unit/", HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(res.status_code, 304)
+
+        with self.captureOnCommitCallbacks(execute=True):
+            self.client.patch(f"/api/water-unit/{self.units[0].id}/", {"name": "X"}, format="json")
+        res = self.client.get("/api/water-unit/", HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(res.status_code, 200)
+        self.assertNotEqual(res["ETag"], etag)
+
+    @override_settings(SINGLE_WORKER=False)
+    def test_off_with_per_process_cache_and_several_workers(self):
+        etag = self.client.get("/api/water-unit/")
+        self.assertNotIn("ETag", etag)
+        res = self.client.get("/api/water-unit/", HTTP_IF_NONE_MATCH='"anything"')
+        self.assertEqual(res.status_code, 200)
+
+    @override_settings(SINGLE_WORKER=False, CACHES={
+        'default': {'BACKEND': 'django.core.cache.backends.dummy.DummyCache'},
+    })
+    def test_on_with_shared_cache(self):
+        self.assertIn("ETag", self.client.get("/api/water-unit/"))
+
+    def test_etag_varies_by_query(self):
+        a = self.client.get("/api/water-unit/")["ETag"]
+        b = self.client.get("/api/water-unit/?format=json")["ETag"]
+        self.assertNotEqual(a, b)
+
+    def test_maintenance_per_unit_scope(self):
+        first, second = self.units
+        self.add_maintenance(first)
+
+        url = f"/api/maintenance/?wu={first.id}"
+        etag = self.client.get(url)["ETag"]
+
+        # a write on another unit leaves this unit's listing valid
+        self.add_maintenance(second)
+        self.assertEqual(self.client.get(url, HTTP_IF_NONE_MATCH=etag).status_code, 304)
+
+        # but the unfiltered listing is invalidated
+        all_etag = self.client.get("/api/maintenance/")["ETag"]
+        self.add_maintenance(second)
+        self.assertEqual(
+            self.client.get("/api/maintenance/", HTTP_IF_NONE_MATCH=all_etag).status_code, 200
+        )
+
+        self.add_maintenance(first)
+        self.assertEqual(self.client.get(url, HTTP_IF_NONE_MATCH=etag).status_code, 200)
+
+    def test_moving_record_invalidates_old_unit(self):
+        first, second = self.units
+        record = self.add_maintenance(first)
+        url = f"/api/maintenance/?wu={first.id}"
+        etag = self.client.get(url)["ETag"]
+
+        with self.captureOnCommitCallbacks(execute=True):
+            res = self.client.patch(f"/api/maintenance/{record.id}/", {"wu": second.id}, format="json")
+        self.assertEqual(res.status_code, 200)
+        self.assertEqual(self.client.get(url, HTTP_IF_NONE_MATCH=etag).status_code, 200)
+
+    def test_if_modified_since(self):
+        res = self.client.get("/api/water-unit/")
+        res = self.client.get("/api/water-unit/", HTTP_IF_MODIFIED_SINCE=res["Last-Modified"])
+        self.assertEqual(res.status_code, 304)
@@ -0,0 +1,16 @@
+from django.db import connection
+from django.test import TestCase
+
+
+class SQLitePragmaTest(TestCase):
+
+    def pragma(self, name):
+        with connection.cursor() as cursor:
+            cursor.execute(f"PRAGMA {name}")
+            return cursor.fetchone()[0]
+
+    def test_pragmas_applied_to_connections(self):
+        if connection.vendor != 'sqlite':
+            self.skipTest("SQLite only")
+        self.assertEqual(self.pragma('synchronous'), 1)  # NORMAL
+        self.assertEqual(self.pragma('busy_timeout'), 5000)
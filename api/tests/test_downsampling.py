@@ -0,0 +1,98 @@
+import json
+import math
+from datetime import datetime, timedelta, timezone as dt_timezone
+
+from django.core.cache import caches
+from rest_framework.test import APITestCase
+
+from api.downsampling import lttb, minmax, average
+from api.models import WaterUnit, WaterQuality
+
+
+START = datetime(2025, 1, 1, tzinfo=dt_timezone.utc)
+
+
+def series(values):
+    return [(i, 1, START + timedelta(minutes=i), v) for i, v in enumerate(values)]
+
+
+class DownsamplingTest(APITestCase):
+
+    def setUp(self):
+        self.values = [100 + 50 * math.sin(i / 40) for i in range(1000)]
+        self.values[333] = 900  # a spike every method but avg must keep
+
+    def test_lttb_keeps_ends_and_peak(self):
+        rows = series(self.values)
+        out = list(lttb(iter(rows), len(rows), 100))
+        self.assertEqual(len(out), 100)
+        self.assertEqual(out[0], rows[0])
+        self.assertEqual(out[-1], rows[-1])
+        self.assertIn(rows[333], out)
+        self.assertEqual(out, sorted(out, key=lambda row: row[2]))
+
+    def test_lttb_passthrough_when_small(self):
+        rows = series(self.values[:50])
+        self.assertEqual(list(lttb(iter(rows), 50, 100)), rows)
+
+    def test_minmax_keeps_peak(self):
+        rows = series(self.values)
+        out = list(minmax(iter(rows), len(rows), 100))
+        self.assertLessEqual(len(out), 100)
+        self.assertIn(rows[333], out)
+
+    def test_average_buckets(self):
+        rows = series([1, 3, 5, 7])
+        out = list(average(iter(rows), 4, 2))
+        self.assertEqual([row[3] for row in out], [2, 6])
+        self.assertIsNone(out[0][0])
+
+
+class DownsampleEndpointTest(APITestCase):
+
+    def setUp(self):
+        for cache in caches.all():
+            cache.clear()
+
+        self.units = [
+            WaterUnit.objects.create(name=f"Unit {i}", location="Area") for i in range(2)
+        ]
+        WaterQuality.objects.bulk_create(
+            WaterQuality(wu=unit, tds=i % 17, date_time=START + timedelta(minutes=i))
+            for unit in self.units for i in range(300)
+        )
+
+    def test_list_downsamples_per_unit(self):
+        res = self.client.get("/api/water-quality/", {"downsample": 20, "method": "lttb"})
+        self.assertEqual(res.status_code, 200)
+        self.assertEqual(res.data["next"], None)
+        self.assertEqual(len(res.data["results"]), 40)
+        for unit in self.units:
+            points = [row for row in res.data["results"] if row["wu"] == unit.id]
+            self.assertEqual(len(points), 20)
+            self.assertEqual(points[0]["date_time"], "2025-01-01T00:00:00Z")
+
+    def test_export_downsamples(self):
+        res = self.client.get(
+            "/api/water-quality/export/",
+            {"wu": self.units[0].id, "downsample": 10, "method": "avg"},
+        )
+        lines = b"".join(res.streaming_content).decode().splitlines()
+        self.assertEqual(len(lines), 10)
+        self.assertIsNone(json.loads(lines[0])["id"])
+
+    def test_rejects_bad_method(self):
+        res = self.client.get("/api/water-quality/", {"downsample": 20, "method": "nope"})
+        self.assertEqual(res.status_code, 400)
+
+    def test_rejects_ordering(self):
+        res = self.client.get("/api/water-quality/", {"downsample": 20, "ordering": "-tds"})
+        self.assertEqual(res.status_code, 400)
+        self.assertIn("ordering", res.data)
+
+    def test_lttb_two_points_keeps_the_ends(self):
+        res = self.client.get(
+            "/api/water-quality/", {"wu": self.units[0].id, "downsample": 2, "method": "lttb"}
+        )
+        points = [row["date_time"] for row in res.data["results"]]
+        self.assertEqual(points, ["2025-01-01T00:00:00Z", "2025-01-01T04:59:00Z"])
@@ -0,0 +1,78 @@
+import csv
+import io
+import json
+import warnings
+from datetime import timedelta
+
+from asgiref.sync import sync_to_async
+from django.test import TransactionTestCase, override_settings
+from django.utils import timezone
+from rest_framework.test import APITestCase
+
+from api.models import WaterUnit, WaterQuality
+from api.serializers import WaterQualitySerializer
+
+
+class ExportTest(APITestCase):
+
+    def setUp(self):
+        self.unit = WaterUnit.objects.create(name="Unit 1", location="Area 1")
+        other = WaterUnit.objects.create(name="Unit 2", location="Area 2")
+        start = timezone.now() - timedelta(hours=1)
+        for i in range(5):
+            WaterQuality.objects.create(wu=self.unit, tds=100 + i, date_time=start + timedelta(minutes=i))
+        WaterQuality.objects.create(wu=other, tds=999, date_time=start)
+
+    def expected(self):
+        queryset = WaterQuality.objects.filter(wu=self.unit).order_by('-date_time')
+        return [dict(row) for row in WaterQualitySerializer(queryset, many=True).data]
+
+    def test_ndjson_matches_serializer(self):
+        res = self.client.get(f"/api/water-quality/export/?wu={self.unit.id}")
+        self.assertEqual(res.status_code, 200)
+        self.assertEqual(res["Content-Type"], "application/x-ndjson")
+
+        body = b"".join(res.streaming_content).decode()
+        rows = [json.loads(line) for line in body.splitlines()]
+        self.assertEqual(rows, self.expected())
+
+    def test_csv(self):
+        res = self.client.get(f"/api/water-quality/export/?wu={self.unit.id}&format=csv")
+        self.assertEqual(res.status_code, 200)
+        self.assertTrue(res["Content-Type"].startswith("text/csv"))
+
+        body = b"".join(res.streaming_content).decode()
+        rows = list(csv.DictReader(io.StringIO(body)))
+        self.assertEqual(len(rows), 5)
+        self.assertEqual(
+            [row["date_time"] for row in rows],
+            [row["date_time"] for row in self.expected()],
+        )
+
+
+@override_settings(EXPORT_CHUNK_SIZE=2)
+class AsgiExportTest(TransactionTestCase):
+    # chunks are fetched on their own thread and connection, so rows must commit
+
+    def setUp(self):
+        self.unit = WaterUnit.objects.create(name="Unit 1", location="Area 1")
+        start = timezone.now() - timedelta(hours=1)
+        for i in range(5):
+            WaterQuality.objects.create(wu=self.unit, tds=100 + i, date_time=start + timedelta(minutes=i))
+
+    def expected(self):
+        queryset = WaterQuality.objects.filter(wu=self.unit).order_by('-date_time')
+        return [dict(row) for row in WaterQualitySerializer(queryset, many=True).data]
+
+    async def test_streams_without_buffering(self):
+        with warnings.catch_warnings():
+            # "must consume synchronous iterators" means the whole export was buffered
+            warnings.simplefilter("error")
+            res = await self.async_client.get(f"/api/water-quality/export/?wu={self.unit.id}")
+            self.assertEqual(res.status_code, 200)
+            self.assertTrue(res.is_async)
+            chunks = [chunk async for chunk in res.streaming_content]
+
+        self.assertEqual(len(chunks), 3)
+        rows = [json.loads(line) for line in b"".join(chunks).decode().splitlines()]
+        self.assertEqual(rows, await sync_to_async(self.expected)())
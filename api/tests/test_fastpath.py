@@ -0,0 +1,71 @@
+from datetime import timedelta
+
+from django.core.cache import caches
+from django.test import override_settings
+from django.utils import timezone
+from rest_framework.test import APITestCase
+from rest_framework.authtoken.models import Token
+
+from api.fastpath import row_encoder
+from api.models import WaterUnit, WaterQuality, Maintainer, Maintenance
+from api.serializers import WaterQualitySerializer, MaintenanceSerializer, WaterUnitSerializer
+
+
+class FastListTest(APITestCase):
+
+    def setUp(self):
+        for cache in caches.all():
+            cache.clear()
+
+        self.user = Maintainer.objects.create_user("fast@example.com", "fast", "pass1234")
+        token = Token.objects.create(user=self.user)
+        self.client.credentials(HTTP_AUTHORIZATION=f"Token {token.key}")
+
+        now = timezone.now().replace(microsecond=123456)
+        self.units = [
+            WaterUnit.objects.create(name=f"Unit {i}", location="Area") for i in range(2)
+        ]
+        for i in range(7):
+            WaterQuality.objects.create(
+                wu=self.units[i % 2], tds=100.5 + i, date_time=now - timedelta(minutes=i)
+            )
+            Maintenance.objects.create(
+                wu=self.units[i % 2], maintainer=self.user, problem=f"Problem {i}",
+                description="", datetime=now - timedelta(hours=i),
+            )
+
+    def get_both(self, url):
+        fast = self.client.get(url)
+        for cache in caches.all():
+            cache.clear()
+        with override_settings(FAST_LIST_SERIALIZATION=False):
+            slow = self.client.get(url)
+        self.assertEqual(fast.status_code, 200)
+        self.assertEqual(slow.status_code, 200)
+        return fast, slow
+
+    def test_encoders_compile(self):
+        for serializer_class in (WaterQualitySerializer, MaintenanceSerializer, WaterUnitSerializer):
+            self.assertIsNotNone(row_encoder(serializer_class))
+
+    def test_output_is_byte_identical(self):
+        for url in (
+            "/api/water-quality/",
+            f"/api/water-quality/?wu={self.units[0].id}&ordering=tds",
+            "/api/maintenance/",
+            "/api/water-unit/",
+        ):
+            fast, slow = self.get_both(url)
+            self.assertEqual(fast.content, slow.content, url)
+
+    def test_pages_and_cursors_match(self):
+        url = "/api/water-quality/?page_size=3"
+        while url:
+            fast, slow = self.get_both(url)
+            self.assertEqual(fast.content, slow.content)
+            url = fast.json()["next"]
+
+    def test_expand_uses_serializer(self):
+        fast, slow = self.get_both("/api/water-quality/?expand=wu")
+        self.assertEqual(fast.content, slow.content)
+        self.assertIsInstance(fast.json()["results"][0]["wu"], dict)
@@ -0,0 +1,27 @@
+from datetime import datetime, timezone as dt_timezone
+
+from django.core.cache import caches
+from rest_framework.test import APITestCase
+
+from api.models import WaterUnit, WaterQuality
+
+
+class DateFilterTest(APITestCase):
+
+    def setUp(self):
+        for cache in caches.all():
+            cache.clear()
+
+    def test_date_matches_whole_day_only(self):
+        unit = WaterUnit.objects.create(name="Unit 1", location="Area 1")
+        for stamp in [
+            datetime(2025, 3, 1, 23, 59, 59, tzinfo=dt_timezone.utc),
+            datetime(2025, 3, 2, 0, 0, 0, tzinfo=dt_timezone.utc),
+            datetime(2025, 3, 2, 23, 59, 59, tzinfo=dt_timezone.utc),
+            datetime(2025, 3, 3, 0, 0, 0, tzinfo=dt_timezone.utc),
+        ]:
+            WaterQuality.objects.create(wu=unit, tds=100, date_time=stamp)
+
+        res = self.client.get(f"/api/water-quality/?wu={unit.id}&date=2025-03-02")
+        self.assertEqual(res.status_code, 200)
+        self.assertEqual(len(res.data["results"]), 2)
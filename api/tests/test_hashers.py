@@ -0,0 +1,61 @@
+from django.contrib.auth.hashers import make_password, get_hasher, identify_hasher
+from django.test import TestCase, override_settings
+from rest_framework.test import APITestCase
+from rest_framework.authtoken.models import Token
+
+from api.hashers import pool
+from api.models import Maintainer
+
+
+class PooledHasherTest(TestCase):
+
+    def test_hashes_in_pool_and_verifies(self):
+        encoded = make_password("s3cret")
+        self.assertEqual(identify_hasher(encoded).algorithm, get_hasher().algorithm)
+        self.assertIsNotNone(pool.executor)
+
+        hasher = identify_hasher(encoded)
+        self.assertTrue(hasher.verify("s3cret", encoded))
+        self.assertFalse(hasher.verify("wrong", encoded))
+
+    @override_settings(PASSWORD_HASH_WORKERS=0)
+    def test_inline_matches_pool(self):
+        hasher = get_hasher('pbkdf2_sha256')
+        inline = hasher.encode("s3cret", "fixedsalt", iterations=1000)
+        with self.settings(PASSWORD_HASH_WORKERS=1):
+            pooled = hasher.encode("s3cret", "fixedsalt", iterations=1000)
+        self.assertEqual(inline, pooled)
+
+
+class LoginTest(APITestCase):
+
+    def setUp(self):
+        self.user = Maintainer.objects.create_user("login@example.com", "Login", "pass1234")
+
+    def login(self):
+        return self.client.post(
+            "/api/login/", {"username": "login@example.com", "password": "pass1234"}, format="json"
+        )
+
+    def test_login_reuses_loaded_token(self):
+        token = Token.objects.create(user=self.user)
+        with self.assertNumQueries(2):  # user + token
+            res = self.login()
+        self.assertEqual(res.status_code, 200)
+        self.assertEqual(res.data["token"], token.key)
+        self.assertEqual(res.data["maintainer_id"], self.user.id)
+
+    def test_old_hash_upgraded_on_login(self):
+        self.user.password = make_password("pass1234", hasher='pbkdf2_sha256')
+        self.user.save()
+
+        self.assertEqual(self.login().status_code, 200)
+        self.user.refresh_from_db()
+        self.assertEqual(identify_hasher(self.user.password).algorithm, get_hasher().algorithm)
+        self.assertNotEqual(get_hasher().algorithm, 'pbkdf2_sha256')
+
+    def test_bad_password(self):
+        res = self.client.post(
+            "/api/login/", {"username": "login@example.com", "password": "nope"}, format="json"
+        )
+        self.assertEqual(res.status_code, 400)
@@ -0,0 +1,132 @@
+import json
+import struct
+import unittest
+from datetime import datetime, timezone as dt_timezone
+
+from rest_framework.test import APITestCase
+from rest_framework import status
+from rest_framework.authtoken.models import Token
+
+from api.models import WaterUnit, WaterQuality, Maintainer
+from api.parsers import msgpack
+
+
+class BulkIngestTest(APITestCase):
+
+    def setUp(self):
+        user = Maintainer.objects.create_user("ingest@example.com", "ingest", "pass1234")
+        token = Token.objects.create(user=user)
+        self.client.credentials(HTTP_AUTHORIZATION=f"Token {token.key}")
+
+        self.unit = WaterUnit.objects.create(name="Unit 1", location="Area 1")
+
+    def test_bulk_json_array(self):
+        res = self.client.post("/api/water-quality/bulk/", [
+            {"wu": self.unit.id, "tds": 120, "date_time": "2025-01-01T08:00:00Z"},
+            {"wu": self.unit.id, "tds": 130},
+        ], format="json")
+
+        self.assertEqual(res.status_code, status.HTTP_201_CREATED)
+        self.assertEqual(res.data["created"], 2)
+        self.assertEqual(WaterQuality.objects.count(), 2)
+
+        # device timestamp is kept
+        self.assertTrue(
+            WaterQuality.objects.filter(tds=120, date_time__year=2025).exists()
+        )
+
+    def test_bulk_ndjson_partial_errors(self):
+        body = "\n".join(json.dumps(row) for row in [
+            {"wu": self.unit.id, "tds": 100},
+            {"wu": 9999, "tds": 100},
+            {"wu": self.unit.id, "tds": "not a number"},
+            {"wu": self.unit.id, "tds": 200},
+        ])
+
+        with self.assertNumQueries(9):
+            # auth + unit lookup + insert + rollup and latest upserts, plus savepoints
+            res = self.client.post(
+                "/api/water-quality/bulk/", body, content_type="application/x-ndjson"
+            )
+
+        self.assertEqual(res.status_code, status.HTTP_207_MULTI_STATUS)
+        self.assertEqual(res.data["created"], 2)
+        self.assertEqual([e["index"] for e in res.data["errors"]], [1, 2])
+        self.assertEqual(WaterQuality.objects.count(), 2)
+
+    def test_non_finite_tds_is_rejected_per_row(self):
+        res = self.client.post("/api/water-quality/bulk/", [
+            {"wu": self.unit.id, "tds": 100},
+            {"wu": self.unit.id, "tds": "NaN"},
+            {"wu": self.unit.id, "tds": "Infinity"},
+            {"wu": self.unit.id, "tds": "-inf"},
+        ], format="json")
+
+        self.assertEqual(res.status_code, status.HTTP_207_MULTI_STATUS)
+        self.assertEqual(res.data["created"], 1)
+        self.assertEqual(
+            [(e["index"], list(e["errors"])) for e in res.data["errors"]],
+            [(1, ["tds"]), (2, ["tds"]), (3, ["tds"])],
+        )
+        self.assertEqual(WaterQuality.objects.count(), 1)
+
+        res = self.client.post(
+            "/api/water-quality/", {"wu": self.unit.id, "tds": "Infinity"}, format="json"
+        )
+        self.assertEqual(res.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertEqual(self.client.get("/api/water-quality/").status_code, 200)
+
+    def test_bulk_rejects_non_list(self):
+        res = self.client.post(
+            "/api/water-quality/bulk/", {"wu": self.unit.id, "tds": 1}, format="json"
+        )
+        self.assertEqual(res.status_code, status.HTTP_400_BAD_REQUEST)
+
+    def test_bulk_packed_binary(self):
+        stamp = datetime(2025, 1, 1, 8, 0, 0, 250000, tzinfo=dt_timezone.utc)
+        epoch_ms = int(stamp.timestamp() * 1000)
+        body = b"".join([
+            struct.pack("<Iqf", self.unit.id, epoch_ms, 120.5),
+            struct.pack("<Iqf", 9999, epoch_ms, 100),
+            struct.pack("<Iqf", self.unit.id, epoch_ms, float("nan")),
+            struct.pack("<Iqf", 0, epoch_ms, 1),
+        ])
+        res = self.client.post(
+            "/api/water-quality/bulk/", body, content_type="application/x-wq-readings"
+        )
+
+        self.assertEqual(res.status_code, status.HTTP_207_MULTI_STATUS)
+        self.assertEqual(res.data["created"], 1)
+        self.assertEqual(
+            [(e["index"], list(e["errors"])) for e in res.data["errors"]],
+            [(1, ["wu"]), (2, ["tds"]), (3, ["wu"])],
+        )
+        reading = WaterQuality.objects.get()
+        self.assertEqual((reading.tds, reading.date_time), (120.5, stamp))
+
+    def test_bulk_packed_rejects_truncated_body(self):
+        res = self.client.post(
+            "/api/water-quality/bulk/", struct.pack("<Iqf", self.unit.id, 0, 1)[:-1],
+            content_type="application/x-wq-readings"
+        )
+        self.assertEqual(res.status_code, status.HTTP_400_BAD_REQUEST)
+
+    @unittest.skipIf(msgpack is None, "msgpack not installed")
+    def test_bulk_msgpack_columns(self):
+        body = msgpack.packb({
+            "wu": [self.unit.id, self.unit.id],
+            "epoch_ms": [1735718400000, 1735718460000],
+            "tds": [100.0, 101.5],
+        })
+        res = self.client.post("/api/water-quality/bulk/", body, content_type="application/x-msgpack")
+
+        self.assertEqual(res.status_code, status.HTTP_201_CREATED)
+        self.assertEqual(
+            sorted(WaterQuality.objects.values_list("tds", flat=True)), [100.0, 101.5]
+        )
+
+        res = self.client.post(
+            "/api/water-quality/bulk/", msgpack.packb({"wu": [1], "tds": [1.0]}),
+            content_type="application/x-msgpack"
+        )
+        self.assertEqual(res.status_code, status.HTTP_400_BAD_REQUEST)
@@ -0,0 +1,151 @@
+import os
+import shutil
+import tempfile
+from datetime import timedelta
+
+from django.core.management import call_command
+from django.test import TestCase, TransactionTestCase, override_settings
+from django.utils import timezone
+from rest_framework.test import APITestCase
+from rest_framework.authtoken.models import Token
+
+from api.ingest_log import (
+    IngestLog, OPEN, SEALED, append_readings, close_log, drain, encode, list_segments, recover,
+)
+from api.models import (
+    WaterUnit, WaterQuality, LatestReading, IngestLogCheckpoint, Maintainer, RejectedReading,
+)
+
+
+class IngestLogTest(TestCase):
+
+    def setUp(self):
+        self.dir = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.dir)
+        self.unit = WaterUnit.objects.create(name="Unit", location="Area")
+        self.now = timezone.now()
+
+    def readings(self, *values):
+        return [
+            WaterQuality(wu_id=self.unit.id, tds=tds, date_time=self.now - timedelta(seconds=i))
+            for i, tds in enumerate(values)
+        ]
+
+    def drain(self, **kwargs):
+        with self.captureOnCommitCallbacks(execute=True):
+            return drain(self.dir, **kwargs)
+
+    def test_round_trip(self):
+        log = IngestLog(self.dir)
+        log.append(self.readings(10.5, 20))
+        log.append(self.readings(30))
+
+        self.assertEqual(self.drain(batch=2), 3)
+        rows = list(WaterQuality.objects.order_by('tds').values_list('tds', 'date_time'))
+        self.assertEqual(rows, [(10.5, self.now), (20, self.now - timedelta(seconds=1)), (30, self.now)])
+        self.assertEqual(LatestReading.objects.get(wu=self.unit).date_time, self.now)
+
+        # nothing is applied twice; the open segment stays until sealed
+        self.assertEqual(self.drain(), 0)
+        self.assertEqual(len(list_segments(self.dir)), 1)
+
+        log.close()
+        self.assertEqual(self.drain(), 0)
+        self.assertEqual(list_segments(self.dir), [])
+        self.assertFalse(IngestLogCheckpoint.objects.exists())
+        self.assertEqual(WaterQuality.objects.count(), 3)
+
+    def test_segments_rotate(self):
+        record = len(encode(self.readings(1)))
+        log = IngestLog(self.dir, segment_bytes=record * 2)
+        for tds in range(5):
+            log.append(self.readings(tds))
+        log.close()
+
+        segments = list_segments(self.dir)
+        self.assertEqual(len(segments), 3)
+        self.assertTrue(all(sealed for _, _, sealed in segments))
+        self.assertEqual(self.drain(), 5)
+        self.assertEqual(list_segments(self.dir), [])
+
+    def test_recover_dead_writer_with_torn_tail(self):
+        path = os.path.join(self.dir, f"{1:020d}-999999999{OPEN}")
+        with open(path, 'wb') as f:
+            f.write(encode(self.readings(1, 2)))
+            f.write(encode(self.readings(3))[:-3])
+
+        # our own open segment is left alone
+        IngestLog(self.dir).append(self.readings(4))
+
+        self.assertEqual(recover(self.dir), [f"{1:020d}-999999999"])
+        self.assertTrue(os.path.exists(path[:-len(OPEN)] + SEALED))
+        self.assertEqual(self.drain(), 3)
+        self.assertEqual(sorted(WaterQuality.objects.values_list('tds', flat=True)), [1, 2, 4])
+
+    def test_command(self):
+        with override_settings(INGEST_LOG_DIR=self.dir):
+            append_readings(self.readings(7))
+            close_log()
+            with self.captureOnCommitCallbacks(execute=True):
+                call_command('drain_ingest_log', '--once', stdout=open(os.devnull, 'w'))
+        self.assertEqual(WaterQuality.objects.get().tds, 7)
+
+
+
+class DeletedUnitTest(TransactionTestCase):
+    # foreign keys are only checked when a transaction really commits
+
+    def setUp(self):
+        self.dir = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.dir)
+        self.unit = WaterUnit.objects.create(name="Unit", location="Area")
+        self.gone = WaterUnit.objects.create(name="Gone", location="Area")
+
+    def test_rows_of_a_deleted_unit_are_rejected_and_skipped(self):
+        now = timezone.now()
+        log = IngestLog(self.dir)
+        log.append([WaterQuality(wu_id=self.unit.id, tds=1, date_time=now)])
+        log.append([
+            WaterQuality(wu_id=self.gone.id, tds=2, date_time=now),
+            WaterQuality(wu_id=self.unit.id, tds=3, date_time=now),
+        ])
+        log.close()
+        gone_id = self.gone.id
+        self.gone.delete()
+
+        with self.assertLogs("api.ingest_log", "ERROR"):
+            self.assertEqual(drain(self.dir), 2)
+        self.assertEqual(sorted(WaterQuality.objects.values_list('tds', flat=True)), [1, 3])
+        rejected = RejectedReading.objects.get()
+        self.assertEqual((rejected.wu_id, rejected.tds), (gone_id, 2))
+        self.assertTrue(rejected.source.startswith("ingest-log:"))
+
+        # the log is done with; the next pass has nothing left to fail on
+        self.assertEqual(list_segments(self.dir), [])
+        self.assertEqual(drain(self.dir), 0)
+
+
+class BulkToLogTest(APITestCase):
+
+    def setUp(self):
+        self.dir = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.dir)
+        user = Maintainer.objects.create_user("wal@example.com", "wal", "pass1234")
+        token = Token.objects.create(user=user)
+        self.client.credentials(HTTP_AUTHORIZATION=f"Token {token.key}")
+        self.unit = WaterUnit.objects.create(name="Unit", location="Area")
+
+    def test_bulk_appends_to_log(self):
+        with override_settings(INGEST_LOG_DIR=self.dir):
+            res = self.client.post(
+                "/api/water-quality/bulk/",
+                [{"wu": self.unit.id, "tds": 5}, {"wu": 0, "tds": 1}], format="json"
+            )
+            close_log()
+        self.assertEqual(res.status_code, 207)
+        self.assertEqual(res.data["queued"], 1)
+        self.assertFalse(WaterQuality.objects.exists())
+
+        with self.captureOnCommitCallbacks(execute=True):
+            self.assertEqual(drain(self.dir), 1)
+        self.assertEqual(WaterQuality.objects.get().tds, 5)
@@ -0,0 +1,139 @@
+import asyncio
+
+from asgiref.sync import sync_to_async
+from django.test import TransactionTestCase, override_settings
+from rest_framework.authtoken.models import Token
+
+from api import ingest_queue
+from api.ingest_queue import Lifespan, get_pipeline, start_pipeline, shutdown_pipeline
+from api.models import (
+    WaterUnit, WaterQuality, WaterQualityRollup, LatestReading, Maintainer, RejectedReading,
+)
+
+
+URL = "/api/water-quality/ingest/"
+
+
+@override_settings(INGEST_FLUSH_INTERVAL=5)
+class AsyncIngestTest(TransactionTestCase):
+    # the writer runs on its own thread and connection, so rows must really commit
+
+    def setUp(self):
+        user = Maintainer.objects.create_user("queue@example.com", "queue", "pass1234")
+        self.token = Token.objects.create(user=user).key
+        self.unit = WaterUnit.objects.create(name="Unit", location="Area")
+
+    def tearDown(self):
+        ingest_queue._pipeline = None
+
+    def post(self, body, **extra):
+        return self.async_client.post(
+            URL, body, content_type="application/json",
+            headers={"Authorization": f"Token {self.token}"}, **extra
+        )
+
+    async def test_queued_readings_are_written_on_flush(self):
+        await start_pipeline()
+        res = await self.post([{"wu": self.unit.id, "tds": 120}, {"wu": self.unit.id, "tds": 80}])
+        self.assertEqual(res.status_code, 202)
+        self.assertEqual(res.json(), {"queued": 2, "errors": []})
+
+        # still inside the 5 s window: nothing written yet
+        self.assertEqual(await WaterQuality.objects.acount(), 0)
+
+        await shutdown_pipeline()
+        self.assertEqual(await WaterQuality.objects.acount(), 2)
+        latest = await LatestReading.objects.aget(wu_id=self.unit.id)
+        self.assertEqual(latest.wu_id, self.unit.id)
+        self.assertTrue(await WaterQualityRollup.objects.filter(wu_id=self.unit.id).aexists())
+
+    async def test_batch_size_triggers_write(self):
+        with self.settings(INGEST_BATCH_SIZE=3):
+            await start_pipeline()
+            for tds in (1, 2, 3):
+                res = await self.post([{"wu": self.unit.id, "tds": tds}])
+                self.assertEqual(res.status_code, 202)
+
+            pipeline = get_pipeline()
+            for _ in range(100):
+                if pipeline.written == 3:
+                    break
+                await asyncio.sleep(0.02)
+            self.assertEqual(pipeline.written, 3)
+            self.assertEqual(await WaterQuality.objects.acount(), 3)
+            await shutdown_pipeline()
+
+    async def test_full_queue_answers_429(self):
+        with self.settings(INGEST_QUEUE_CAPACITY=3):
+            await start_pipeline()
+            res = await self.post([{"wu": self.unit.id, "tds": 1}, {"wu": self.unit.id, "tds": 2}])
+            self.assertEqual(res.status_code, 202)
+
+            res = await self.post([{"wu": self.unit.id, "tds": 3}, {"wu": self.unit.id, "tds": 4}])
+            self.assertEqual(res.status_code, 429)
+            self.assertEqual(res["Retry-After"], "1")
+
+            await shutdown_pipeline()
+            self.assertEqual(await WaterQuality.objects.acount(), 2)
+
+    async def test_failed_submission_does_not_drop_the_others(self):
+        gone = await WaterUnit.objects.acreate(name="Gone", location="Area")
+        await start_pipeline()
+        for body in (
+            [{"wu": self.unit.id, "tds": 1}],
+            [{"wu": gone.id, "tds": 2}, {"wu": self.unit.id, "tds": 3}],
+            [{"wu": self.unit.id, "tds": 4}],
+        ):
+            res = await self.post(body)
+            self.assertEqual(res.status_code, 202)
+        # deleted after its readings were accepted
+        gone_id = gone.id
+        await gone.adelete()
+
+        pipeline = get_pipeline()
+        with self.assertLogs("api.ingest_queue", "ERROR"):
+            await shutdown_pipeline()
+        self.assertEqual((pipeline.written, pipeline.failed, pipeline.pending), (3, 1, 0))
+        tds = [value async for value in WaterQuality.objects.order_by('tds').values_list('tds', flat=True)]
+        self.assertEqual(tds, [1, 3, 4])
+        rejected = await RejectedReading.objects.aget()
+        self.assertEqual((rejected.wu_id, rejected.tds, rejected.source), (gone_id, 2, "ingest-queue"))
+
+    async def test_invalid_rows_and_auth(self):
+        res = await self.post([{"wu": 999999, "tds": 1}])
+        self.assertEqual(res.status_code, 400)
+        self.assertEqual(res.json()["errors"][0]["index"], 0)
+
+        res = await self.async_client.post(URL, [], content_type="application/json")
+        self.assertEqual(res.status_code, 401)
+
+    async def test_without_lifespan_rows_are_written_inline(self):
+        # WSGI / runserver: no long-lived loop, so nothing may be left queued
+        res = await self.post([{"wu": self.unit.id, "tds": 120}])
+        self.assertEqual(res.status_code, 201)
+        self.assertEqual(res.json(), {"written": 1, "errors": []})
+        self.assertIsNone(get_pipeline())
+        self.assertEqual(await WaterQuality.objects.acount(), 1)
+
+    async def test_lifespan_starts_queue_and_shutdown_flushes(self):
+        messages = asyncio.Queue()
+        sent = []
+
+        async def receive():
+            return await messages.get()
+
+        async def send(message):
+            sent.append(message["type"])
+
+        server = asyncio.ensure_future(Lifespan(None)({"type": "lifespan"}, receive, send))
+        messages.put_nowait({"type": "lifespan.startup"})
+        while not sent:
+            await asyncio.sleep(0.01)
+
+        res = await self.post([{"wu": self.unit.id, "tds": 50}])
+        self.assertEqual(res.status_code, 202)
+
+        messages.put_nowait({"type": "lifespan.shutdown"})
+        await server
+        self.assertEqual(sent, ["lifespan.startup.complete", "lifespan.shutdown.complete"])
+        self.assertEqual(await sync_to_async(WaterQuality.objects.count)(), 1)
@@ -0,0 +1,101 @@
+import json
+
+from asgiref.sync import sync_to_async
+from django.test import TestCase, override_settings
+from django.utils import timezone
+
+from api.live import broker, event_stream
+from api.models import WaterUnit, WaterQuality, Maintenance
+from api.signals import readings_ingested
+
+
+def parse(chunk):
+    """SSE chunk -> [(event, data), ...]"""
+    events = []
+    for block in chunk.strip().split("\n\n"):
+        fields = dict(line.split(": ", 1) for line in block.splitlines() if not line.startswith(":"))
+        if "event" in fields:
+            events.append((fields["event"], json.loads(fields["data"])))
+    return events
+
+
+class LiveFeedTest(TestCase):
+
+    def setUp(self):
+        self.unit = WaterUnit.objects.create(name="Unit 1", location="Area 1")
+        self.other = WaterUnit.objects.create(name="Unit 2", location="Area 2")
+
+    def publish(self, wu, *values):
+        readings = [
+            WaterQuality(id=i + 1, wu=wu, tds=tds, date_time=timezone.now())
+            for i, tds in enumerate(values)
+        ]
+        readings_ingested.send(sender=WaterQuality, readings=readings)
+
+    async def open(self, *units):
+        stream = event_stream([unit.id for unit in units], keepalive=5, coalesce=0)
+        self.assertIn(": connected", await anext(stream))
+        return stream
+
+    async def test_pushes_readings_of_watched_units(self):
+        stream = await self.open(self.unit)
+        self.publish(self.other, 999)
+        self.publish(self.unit, 120, 80)
+
+        events = parse(await anext(stream))
+        self.assertEqual(events[0][0], "readings")
+        self.assertEqual([row["tds"] for row in events[0][1]], [120, 80])
+        self.assertEqual({row["wu"] for row in events[0][1]}, {self.unit.id})
+
+        await stream.aclose()
+        self.assertEqual(len(broker), 0)
+        self.assertFalse(broker.watched(self.unit.id))
+
+    async def test_bursts_are_coalesced(self):
+        stream = await self.open(self.unit, self.other)
+        self.publish(self.unit, 1)
+        self.publish(self.other, 2)
+        self.publish(self.unit, 3)
+
+        events = parse(await anext(stream))
+        self.assertEqual([event for event, _ in events], ["readings"])
+        self.assertEqual([row["tds"] for row in events[0][1]], [1, 2, 3])
+        await stream.aclose()
+
+    @override_settings(LIVE_BUFFER_SIZE=2)
+    async def test_slow_consumer_drops_oldest(self):
+        stream = await self.open(self.unit)
+        for tds in range(5):
+            self.publish(self.unit, tds)
+
+        events = parse(await anext(stream))
+        self.assertEqual(events[0], ("dropped", {"count": 3}))
+        self.assertEqual([row["tds"] for row in events[1][1]], [3, 4])
+        await stream.aclose()
+
+    async def test_maintenance_events(self):
+        stream = await self.open(self.unit)
+
+        def create():
+            with self.captureOnCommitCallbacks(execute=True):
+                return Maintenance.objects.create(
+                    wu=self.unit, datetime=timezone.now(), problem="Pump", description="Leak"
+                )
+        record = await sync_to_async(create)()
+
+        (event, data), = parse(await anext(stream))
+        self.assertEqual(event, "maintenance")
+        self.assertEqual(data["action"], "saved")
+        self.assertEqual(data["record"]["id"], record.id)
+        await stream.aclose()
+
+    async def test_endpoint(self):
+        res = await self.async_client.get("/api/live/", {"wu": "x"})
+        self.assertEqual(res.status_code, 400)
+
+        res = await self.async_client.get("/api/live/", {"wu": f"{self.unit.id},{self.other.id}"})
+        self.assertEqual(res.status_code, 200)
+        self.assertEqual(res["Content-Type"], "text/event-stream")
+        content = aiter(res.streaming_content)
+        self.assertIn(b": connected", await anext(content))
+        await content.aclose()
@@ -0,0 +1,113 @@
+import re
+import threading
+
+from django.core.cache import caches
+from django.test import TransactionTestCase, override_settings
+from django.utils import timezone
+from rest_framework.test import APITestCase
+from rest_framework.authtoken.models import Token
+
+from api.metrics import registry, render_metrics
+from api.models import WaterUnit, WaterQuality, Maintainer
+
+
+def sample(text, name, **labels):
+    """Value of one series in an exposition, or None."""
+    wanted = ",".join(f'{key}="{value}"' for key, value in labels.items())
+    for line in text.splitlines():
+        match = re.fullmatch(rf'{name}\{{(.*)\}} (\S+)', line)
+        if match and all(part in match.group(1).split(",") for part in wanted.split(",")):
+            return float(match.group(2))
+    return None
+
+
+class MetricsTest(APITestCase):
+
+    def setUp(self):
+        for cache in caches.all():
+            cache.clear()
+        registry.clear()
+        user = Maintainer.objects.create_user("metrics@example.com", "metrics", "pass1234")
+        self.token = Token.objects.create(user=user).key
+        self.client.credentials(HTTP_AUTHORIZATION=f"Token {self.token}")
+        WaterUnit.objects.create(name="Unit 1", location="Area 1")
+
+    def test_viewset_actions_are_labelled(self):
+        for _ in range(3):
+            self.client.get("/api/water-unit/")
+        self.client.get("/api/user/")
+        self.client.get("/api/missing/")
+
+        text = self.client.get("/metrics").content.decode()
+        labels = dict(view="water-unit-list", action="list", status="2xx")
+        self.assertEqual(sample(text, "http_request_duration_seconds_count", **labels), 3)
+        self.assertEqual(sample(text, "http_request_duration_seconds_bucket", le="+Inf", **labels), 3)
+        self.assertGreater(sample(text, "http_request_db_queries_total", **labels), 0)
+        self.assertGreater(sample(text, "http_response_bytes_total", **labels), 0)
+        self.assertEqual(
+            sample(text, "http_request_duration_seconds_count", view="user_info", action="GET"), 1
+        )
+        self.assertEqual(
+            sample(text, "http_request_duration_seconds_count", view="<unmatched>", status="4xx"), 1
+        )
+
+    def test_streamed_bytes_are_counted(self):
+        WaterQuality.objects.create(wu=WaterUnit.objects.get(), tds=120, date_time=timezone.now())
+        res = self.client.get("/api/water-quality/export/")
+        body = b"".join(res.streaming_content)
+        self.assertGreater(len(body), 0)
+        labels = dict(view="water-quality-export", action="export")
+        self.assertEqual(sample(render_metrics(), "http_response_bytes_total", **labels), len(body))
+
+    @override_settings(SLOW_QUERY_SECONDS=0)
+    def test_slow_query_log(self):
+        with self.assertLogs("api.slow_queries", "WARNING") as logs:
+            self.client.get("/api/water-unit/")
+        self.assertIn("water-unit-list", logs.output[0])
+        self.assertIn("SELECT", logs.output[0])
+        slow = re.search(r"^db_slow_queries_total (\d+)$", render_metrics(), re.M)
+        self.assertGreater(int(slow.group(1)), 0)
+
+    def test_shards_of_finished_threads_are_kept(self):
+        def request():
+            registry.observe(("thread", "GET", "2xx"), 0.01, 2, 0.001, 10)
+        threads = [threading.Thread(target=request) for _ in range(4)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+
+        text = render_metrics()
+        labels = dict(view="thread", action="GET", status="2xx")
+        self.assertEqual(sample(text, "http_request_duration_seconds_count", **labels), 4)
+        self.assertEqual(sample(text, "http_request_db_queries_total", **labels), 8)
+
+    @override_settings(METRICS_TOKEN="secret")
+    def test_token(self):
+        self.client.credentials()
+        self.assertEqual(self.client.get("/metrics").status_code, 401)
+        res = self.client.get("/metrics", HTTP_AUTHORIZATION="Bearer secret")
+        self.assertEqual(res.status_code, 200)
+        self.assertTrue(res["Content-Type"].startswith("text/plain; version=0.0.4"))
+
+
+class AsgiMetricsTest(TransactionTestCase):
+    # the stream is read on another thread and connection, so rows must commit
+
+    def setUp(self):
+        for cache in caches.all():
+            cache.clear()
+        registry.clear()
+        user = Maintainer.objects.create_user("metrics@example.com", "metrics", "pass1234")
+        self.token = Token.objects.create(user=user).key
+        unit = WaterUnit.objects.create(name="Unit 1", location="Area 1")
+        WaterQuality.objects.create(wu=unit, tds=120, date_time=timezone.now())
+
+    async def test_streamed_bytes_are_counted(self):
+        res = await self.async_client.get(
+            "/api/water-quality/export/", headers={"Authorization": f"Token {self.token}"}
+        )
+        body = b"".join([chunk async for chunk in res.streaming_content])
+        self.assertGreater(len(body), 0)
+        labels = dict(view="water-quality-export", action="export")
+        self.assertEqual(sample(render_metrics(), "http_response_bytes_total", **labels), len(body))
@@ -0,0 +1,145 @@
+import json
+import shutil
+import tempfile
+from datetime import timedelta
+from io import StringIO
+
+from django.core.management import call_command
+from django.utils import timezone
+from rest_framework.authtoken.models import Token
+from rest_framework.test import APITestCase
+
+from api.archive import archive_day, archived_rows, retention_cutoff
+from api.models import WaterUnit, WaterQuality, WaterQualityRollup, ArchiveSegment, Maintainer
+from api.rollups import apply_readings, floor_day, rebuild
+
+
+class RetentionTest(APITestCase):
+
+    def setUp(self):
+        self.dir = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.dir)
+        override = self.settings(ARCHIVE_DIR=self.dir, READINGS_RETENTION_DAYS=30, ARCHIVE_DELETE_BATCH=2)
+        override.enable()
+        self.addCleanup(override.disable)
+
+        self.unit = WaterUnit.objects.create(name="Unit 1", location="Area 1")
+        self.other = WaterUnit.objects.create(name="Unit 2", location="Area 2")
+        self.old = floor_day(timezone.now() - timedelta(days=40)) + timedelta(hours=6)
+        for day in range(2):
+            for i in range(3):
+                when = self.old + timedelta(days=day, minutes=i)
+                WaterQuality.objects.create(wu=self.unit, tds=100 + i, date_time=when)
+                WaterQuality.objects.create(wu=self.other, tds=200 + i, date_time=when + timedelta(seconds=30))
+        WaterQuality.objects.create(wu=self.unit, tds=50, date_time=timezone.now() - timedelta(hours=1))
+
+    def archive(self, *args):
+        out = StringIO()
+        call_command('archive_readings', *args, stdout=out)
+        return out.getvalue()
+
+    def export(self, query=""):
+        res = self.client.get(f"/api/water-quality/export/{query}")
+        self.assertEqual(res.status_code, 200)
+        return [json.loads(line) for line in b"".join(res.streaming_content).decode().splitlines()]
+
+    def day_rollups(self):
+        return dict(
+            WaterQualityRollup.objects.filter(resolution=WaterQualityRollup.DAY, wu=self.unit)
+            .values_list('bucket_start', 'count')
+        )
+
+    def test_archives_old_days_and_keeps_rollups(self):
+        output = self.archive()
+        self.assertIn("12 readings archived", output)
+
+        self.assertEqual(WaterQuality.objects.count(), 1)
+        self.assertEqual(ArchiveSegment.objects.count(), 2)
+        self.assertEqual(len(list(archived_rows())), 12)
+
+        rollups = self.day_rollups()
+        self.assertEqual(rollups[floor_day(self.old)], 3)
+        self.assertEqual(rollups[floor_day(self.old) + timedelta(days=1)], 3)
+
+        # archived days have no raw rows left to rebuild from
+        rebuild()
+        after = self.day_rollups()
+        self.assertEqual({bucket: after.get(bucket) for bucket in rollups}, rollups)
+
+    def test_dry_run(self):
+        output = self.archive("--dry-run")
+        self.assertIn(f"{self.old.date()}: 6 readings", output)
+        self.assertEqual(WaterQuality.objects.count(), 13)
+        self.assertFalse(ArchiveSegment.objects.exists())
+
+    def test_export_is_transparent(self):
+        queries = [
+            "", f"?wu={self.unit.id}", "?ordering=date_time", "?min_tds=101&max_tds=201",
+            f"?date={self.old.date()}", f"?start={(self.old + timedelta(minutes=1)).isoformat()}",
+        ]
+        before = {query: self.export(query.replace('+', '%2B')) for query in queries}
+        self.archive()
+        for query in queries:
+            self.assertEqual(self.export(query.replace('+', '%2B')), before[query], query)
+
+    def test_export_limits_on_archived_days(self):
+        self.archive()
+        self.assertEqual(self.client.get("/api/water-quality/export/?ordering=tds").status_code, 400)
+        self.assertEqual(self.client.get("/api/water-quality/export/?downsample=10").status_code, 400)
+        recent = (timezone.now() - timedelta(days=1)).isoformat().replace('+', '%2B')
+        self.assertEqual(self.client.get(f"/api/water-quality/export/?start={recent}&ordering=tds").status_code, 200)
+
+    def test_late_readings_get_a_new_part(self):
+        self.archive()
+        late = WaterQuality.objects.create(wu=self.unit, tds=150, date_time=self.old + timedelta(hours=1))
+        self.assertEqual(len(self.export(f"?wu={self.unit.id}")), 8)
+
+        self.assertEqual(archive_day(self.old.date()), 1)
+        self.assertEqual(
+            list(ArchiveSegment.objects.filter(day=self.old.date()).values_list('part', 'rows')),
+            [(1, 6), (2, 1)],
+        )
+        self.assertFalse(WaterQuality.objects.filter(pk=late.pk).exists())
+        self.assertEqual(len(self.export(f"?wu={self.unit.id}")), 8)
+
+    def test_edit_and_delete_late_reading_on_archived_day(self):
+        user = Maintainer.objects.create_user("late@example.com", "late", "pass1234")
+        self.client.credentials(HTTP_AUTHORIZATION=f"Token {Token.objects.create(user=user).key}")
+        self.archive()
+        late = WaterQuality.objects.create(wu=self.unit, tds=500, date_time=self.old + timedelta(hours=1))
+        apply_readings([late])
+
+        def day():
+            return WaterQualityRollup.objects.filter(
+                wu=self.unit, resolution='day', bucket_start=floor_day(self.old)
+            ).values_list('count', 'tds_sum', 'tds_min', 'tds_max').get()
+
+        self.assertEqual(day(), (4, 803, 100, 500))
+
+        res = self.client.patch(f"/api/water-quality/{late.id}/", {"tds": 90}, format="json")
+        self.assertEqual(res.status_code, 200)
+        self.assertEqual(day(), (4, 393, 90, 102))
+
+        res = self.client.delete(f"/api/water-quality/{late.id}/")
+        self.assertEqual(res.status_code, 204)
+        self.assertEqual(day(), (3, 303, 100, 102))
+        self.assertFalse(WaterQualityRollup.objects.filter(
+            wu=self.unit, resolution='hour', bucket_start=self.old + timedelta(hours=1)
+        ).exists())
+        # the other unit's archived day is untouched
+        self.assertEqual(
+            WaterQualityRollup.objects.get(wu=self.other, resolution='day', bucket_start=floor_day(self.old)).count, 3
+        )
+
+    def test_resumes_after_interrupted_delete(self):
+        day = self.old.date()
+        archive_day(day)
+        # a run that wrote its part but died before deleting the rows
+        segment = ArchiveSegment.objects.get(day=day)
+        restored = [WaterQuality(id=row[0], wu_id=row[1], date_time=row[2], tds=row[3])
+                    for row in archived_rows(self.old - timedelta(hours=6), self.old + timedelta(hours=18))]
+        WaterQuality.objects.bulk_create(restored)
+
+        self.assertEqual(archive_day(day), 0)
+        self.assertEqual(ArchiveSegment.objects.filter(day=day).get(), segment)
+        self.assertFalse(WaterQuality.objects.filter(date_time__lt=retention_cutoff(39)).exists())
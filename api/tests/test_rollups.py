@@ -0,0 +1,101 @@
+from datetime import datetime, timedelta, timezone as dt_timezone
+from io import StringIO
+
+from django.core.management import call_command
+from rest_framework.test import APITestCase
+from rest_framework.authtoken.models import Token
+
+from api.models import WaterUnit, WaterQuality, WaterQualityRollup, Maintainer
+
+
+def utc(*args):
+    return datetime(*args, tzinfo=dt_timezone.utc)
+
+
+class RollupTest(APITestCase):
+
+    def setUp(self):
+        user = Maintainer.objects.create_user("rollup@example.com", "rollup", "pass1234")
+        token = Token.objects.create(user=user)
+        self.client.credentials(HTTP_AUTHORIZATION=f"Token {token.key}")
+        self.unit = WaterUnit.objects.create(name="Unit 1", location="Area 1")
+
+    def ingest(self, rows):
+        res = self.client.post("/api/water-quality/bulk/", [
+            {"wu": self.unit.id, "tds": tds, "date_time": stamp.isoformat()} for stamp, tds in rows
+        ], format="json")
+        self.assertEqual(res.status_code, 201)
+
+    def test_incremental_matches_rebuild(self):
+        self.ingest([(utc(2025, 1, 1, 10, 0, 5), 100), (utc(2025, 1, 1, 10, 0, 40), 200)])
+        self.ingest([(utc(2025, 1, 1, 10, 30), 50), (utc(2025, 1, 2, 9), 400)])
+
+        hour = WaterQualityRollup.objects.get(
+            wu=self.unit, resolution="hour", bucket_start=utc(2025, 1, 1, 10)
+        )
+        self.assertEqual((hour.count, hour.tds_min, hour.tds_max), (3, 50, 200))
+        self.assertAlmostEqual(hour.tds_avg, 350 / 3)
+
+        def snapshot():
+            return sorted(WaterQualityRollup.objects.values_list(
+                "resolution", "bucket_start", "count", "tds_sum", "tds_min", "tds_max"
+            ))
+
+        incremental = snapshot()
+        call_command("rebuild_rollups", stdout=StringIO())
+        self.assertEqual(snapshot(), incremental)
+        self.assertEqual(len(incremental), 3 + 2 + 2)
+
+    def test_delete_updates_rollups(self):
+        self.ingest([(utc(2025, 1, 1, 10), 100), (utc(2025, 1, 1, 11), 300)])
+        reading = WaterQuality.objects.get(tds=300)
+
+        res = self.client.delete(f"/api/water-quality/{reading.id}/")
+        self.assertEqual(res.status_code, 204)
+
+        day = WaterQualityRollup.objects.get(resolution="day", bucket_start=utc(2025, 1, 1))
+        self.assertEqual((day.count, day.tds_max), (1, 100))
+
+    def test_endpoint_picks_resolution(self):
+        start = utc(2025, 1, 1)
+        self.ingest([(start + timedelta(hours=h), h) for h in range(0, 24 * 30, 6)])
+
+        res = self.client.get(
+            "/api/water-quality/rollup/",
+            {"wu": self.unit.id, "start": start.isoformat(), "end": (start + timedelta(days=30)).isoformat()},
+        )
+        self.assertEqual(res.status_code, 200)
+        self.assertEqual(res.data["resolution"], "hour")
+
+        res = self.client.get(
+            "/api/water-quality/rollup/",
+            {"start": start.isoformat(), "end": (start + timedelta(days=365)).isoformat()},
+        )
+        self.assertEqual(res.data["resolution"], "day")
+        self.assertEqual(len(res.data["results"]), 30)
+        self.assertEqual(res.data["results"][0]["count"], 4)
+
+    def test_endpoint_requires_start(self):
+        res = self.client.get("/api/water-quality/rollup/")
+        self.assertEqual(res.status_code, 400)
+
+    def test_endpoint_pages_across_units(self):
+        start = utc(2025, 1, 1)
+        self.ingest([(start + timedelta(days=d), 100) for d in range(3)])
+        other = WaterUnit.objects.create(name="Unit 2", location="Area 2")
+        self.unit = other
+        self.ingest([(start + timedelta(days=d), 200) for d in range(3)])
+
+        url = "/api/water-quality/rollup/"
+        params = {"start": start.isoformat(), "end": (start + timedelta(days=365)).isoformat(), "page_size": 4}
+        res = self.client.get(url, params)
+        self.assertEqual(res.data["resolution"], "day")
+        self.assertEqual(len(res.data["results"]), 4)
+        self.assertIsNotNone(res.data["next"])
+
+        rest = self.client.get(res.data["next"])
+        self.assertEqual(rest.data["resolution"], "day")
+        self.assertIsNone(rest.data["next"])
+        buckets = [(row["wu"], row["bucket_start"]) for row in res.data["results"] + rest.data["results"]]
+        self.assertEqual(len(set(buckets)), 6)
+        self.assertEqual([wu for wu, _ in buckets], sorted(wu for wu, _ in buckets))
@@ -0,0 +1,82 @@
+from django.core.cache import caches
+from django.test import TestCase, override_settings
+from rest_framework.test import APIRequestFactory, APITestCase, force_authenticate
+from rest_framework.authtoken.models import Token
+
+from api.models import Maintainer, WaterUnit, WaterQuality
+from api.routers import ReadReplicaRouter, _read_alias, is_pinned, pin_to_primary
+from api.views import WaterQualityViewSet
+
+
+@override_settings(READ_DATABASE_ALIAS='replica')
+class ReplicaChoiceTest(TestCase):
+    # only decides the alias; no query is sent to the (unconfigured) replica
+
+    def setUp(self):
+        for cache in caches.all():
+            cache.clear()
+        self.user = Maintainer.objects.create_user("replica@example.com", "Replica", "pass1234")
+
+    def view_for(self, method, user=None):
+        request = getattr(APIRequestFactory(), method)("/api/water-quality/")
+        if user is not None:
+            force_authenticate(request, user)
+        view = WaterQualityViewSet(action_map={method: 'list'}, format_kwarg=None, kwargs={})
+        view.request = view.initialize_request(request)
+        return view, view.request
+
+    def test_safe_reads_go_to_replica(self):
+        view, request = self.view_for('get')
+        self.assertEqual(view.choose_read_alias(request), 'replica')
+
+        view.read_alias = 'replica'
+        self.assertEqual(view.get_queryset().db, 'replica')
+        self.assertFalse(view.serves_current_data())
+
+    def test_writes_and_pinned_users_use_primary(self):
+        view, request = self.view_for('post', self.user)
+        self.assertEqual(view.choose_read_alias(request), 'default')
+
+        view, request = self.view_for('get', self.user)
+        self.assertEqual(view.choose_read_alias(request), 'replica')
+        pin_to_primary(self.user)
+        self.assertEqual(view.choose_read_alias(request), 'default')
+
+    @override_settings(READ_DATABASE_ALIAS=None)
+    def test_no_replica_configured(self):
+        view, request = self.view_for('get')
+        self.assertEqual(view.choose_read_alias(request), 'default')
+
+    def test_router_follows_request_alias(self):
+        router = ReadReplicaRouter()
+        self.assertIsNone(router.db_for_read(WaterQuality))
+        token = _read_alias.set('replica')
+        try:
+            self.assertEqual(router.db_for_read(WaterQuality), 'replica')
+            self.assertEqual(router.db_for_write(WaterQuality), 'default')
+        finally:
+            _read_alias.reset(token)
+
+
+class ReadYourWritesTest(APITestCase):
+
+    def setUp(self):
+        for cache in caches.all():
+            cache.clear()
+        self.user = Maintainer.objects.create_user("ryw@example.com", "RYW", "pass1234")
+        token = Token.objects.create(user=self.user)
+        self.client.credentials(HTTP_AUTHORIZATION=f"Token {token.key}")
+        self.unit = WaterUnit.objects.create(name="Unit", location="Area")
+
+    def test_successful_write_pins_user(self):
+        res = self.client.post("/api/water-quality/bulk/", [{"wu": 0, "tds": 1}], format="json")
+        self.assertEqual(res.status_code, 400)
+        self.assertFalse(is_pinned(self.user))
+
+        res = self.client.post("/api/water-quality/bulk/", [{"wu": self.unit.id, "tds": 1}], format="json")
+        self.assertEqual(res.status_code, 201)
+        self.assertTrue(is_pinned(self.user))
+
+        # reads leave no alias behind
+        self.client.get("/api/water-quality/")
+        self.assertIsNone(_read_alias.get())
@@ -0,0 +1,95 @@
+from django.core.cache import caches
+from django.core.management import call_command
+from django.core.management.sql import emit_post_migrate_signal
+from django.db import connection
+from django.utils import timezone
+from rest_framework.test import APITestCase
+
+from api.models import WaterUnit, Maintenance
+from api.search import FTS_TABLE
+
+
+class MaintenanceSearchTest(APITestCase):
+
+    def setUp(self):
+        for cache in caches.all():
+            cache.clear()
+        self.unit = WaterUnit.objects.create(name="Unit 1", location="Area 1")
+        self.records = {
+            key: Maintenance.objects.create(
+                wu=self.unit, datetime=timezone.now(), problem=problem, description=description
+            )
+            for key, problem, description in [
+                ("pump", "Pump leaking", "Seal worn out near the inlet"),
+                ("filter", "Filter clogged", "Replaced cartridge, pump pressure normal"),
+                ("sensor", "TDS sensor drift", "Recalibrated the probe"),
+            ]
+        }
+
+    def search(self, q, **params):
+        res = self.client.get("/api/maintenance/", {"q": q, **params})
+        self.assertEqual(res.status_code, 200)
+        return [row["id"] for row in res.data["results"]]
+
+    def ids(self, *keys):
+        return [self.records[key].id for key in keys]
+
+    def test_ranks_problem_above_description(self):
+        self.assertEqual(self.search("pump"), self.ids("pump", "filter"))
+
+    def test_prefix_and_all_terms(self):
+        self.assertEqual(self.search("recal"), self.ids("sensor"))
+        self.assertEqual(self.search("pum lea"), self.ids("pump"))
+        self.assertEqual(self.search("pump sensor"), [])
+        self.assertEqual(self.search("!!"), [])
+
+    def test_index_follows_saves_and_deletes(self):
+        record = self.records["sensor"]
+        record.description = "Replaced the conductivity probe"
+        with self.captureOnCommitCallbacks(execute=True):
+            record.save()
+        self.assertEqual(self.search("conductivity"), self.ids("sensor"))
+        self.assertEqual(self.search("recalibrated"), [])
+
+        with self.captureOnCommitCallbacks(execute=True):
+            record.delete()
+        self.assertEqual(self.search("conductivity"), [])
+
+    def test_explicit_ordering_and_pages(self):
+        self.assertEqual(
+            self.search("pump", ordering="datetime"), self.ids("pump", "filter")
+        )
+        res = self.client.get("/api/maintenance/", {"q": "pump", "page_size": 1})
+        self.assertEqual([row["id"] for row in res.data["results"]], self.ids("pump"))
+        res = self.client.get(res.data["next"])
+        self.assertEqual([row["id"] for row in res.data["results"]], self.ids("filter"))
+        self.assertIsNone(res.data["next"])
+
+    def test_rank_ordering_ignored_without_search(self):
+        res = self.client.get("/api/maintenance/", {"ordering": "search_rank"})
+        self.assertEqual(res.status_code, 200)
+        self.assertEqual(len(res.data["results"]), 3)
+
+    def test_rebuild_command(self):
+        with connection.cursor() as cursor:
+            cursor.execute(f"DROP TRIGGER {FTS_TABLE}_ai")
+        call_command('rebuild_search_index', stdout=open('/dev/null', 'w'))
+        Maintenance.objects.create(
+            wu=self.unit, datetime=timezone.now(), problem="Valve stuck", description=""
+        )
+        self.assertEqual(len(self.search("valve")), 1)
+
+    def test_migrate_reinstalls_dropped_triggers(self):
+        with connection.cursor() as cursor:
+            cursor.execute(f"DROP TRIGGER {FTS_TABLE}_ai")
+        # written while the trigger is gone, e.g. by a data migration
+        Maintenance.objects.create(
+            wu=self.unit, datetime=timezone.now(), problem="Valve stuck", description=""
+        )
+        emit_post_migrate_signal(0, False, connection.alias)
+        self.assertEqual(len(self.search("valve")), 1)
+        with self.captureOnCommitCallbacks(execute=True):
+            Maintenance.objects.create(
+                wu=self.unit, datetime=timezone.now(), problem="Valve replaced", description=""
+            )
+        self.assertEqual(len(self.search("valve")), 2)
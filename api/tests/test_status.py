@@ -0,0 +1,67 @@
+from django.core.cache import caches
+from rest_framework.test import APITestCase
+from rest_framework.authtoken.models import Token
+
+from api.models import WaterUnit, WaterQuality, LatestReading, Maintainer
+
+
+class UnitStatusTest(APITestCase):
+
+    def setUp(self):
+        for cache in caches.all():
+            cache.clear()
+        user = Maintainer.objects.create_user("status@example.com", "status", "pass1234")
+        token = Token.objects.create(user=user)
+        self.client.credentials(HTTP_AUTHORIZATION=f"Token {token.key}")
+
+        self.units = [
+            WaterUnit.objects.create(name=f"Unit {i}", location="Area") for i in range(3)
+        ]
+
+    def ingest(self, rows):
+        with self.captureOnCommitCallbacks(execute=True):
+            res = self.client.post("/api/water-quality/bulk/", [
+                {"wu": unit.id, "tds": tds, "date_time": stamp} for unit, tds, stamp in rows
+            ], format="json")
+        self.assertEqual(res.status_code, 201)
+
+    def test_status_tracks_newest_reading(self):
+        a, b, _ = self.units
+        self.ingest([
+            (a, 100, "2025-01-01T10:00:00Z"),
+            (a, 150, "2025-01-01T12:00:00Z"),
+            (b, 200, "2025-01-01T09:00:00Z"),
+        ])
+        # a late, older reading must not replace the newer one
+        self.ingest([(a, 999, "2025-01-01T11:00:00Z")])
+
+        with self.assertNumQueries(1):
+            # a single status query, the token is cached
+            res = self.client.get("/api/water-unit/status/")
+        self.assertEqual(res.status_code, 200)
+
+        by_id = {row["id"]: row for row in res.data}
+        self.assertEqual(by_id[a.id]["latest"]["tds"], 150)
+        self.assertEqual(by_id[a.id]["latest"]["date_time"], "2025-01-01T12:00:00Z")
+        self.assertEqual(by_id[b.id]["latest"]["tds"], 200)
+        self.assertIsNone(by_id[self.units[2].id]["latest"])
+
+        # cached until something is written
+        with self.assertNumQueries(0):
+            self.client.get("/api/water-unit/status/")
+
+        self.ingest([(b, 250, "2025-01-02T00:00:00Z")])
+        res = self.client.get("/api/water-unit/status/")
+        self.assertEqual({row["id"]: row for row in res.data}[b.id]["latest"]["tds"], 250)
+
+    def test_delete_falls_back_to_previous(self):
+        a = self.units[0]
+        self.ingest([(a, 100, "2025-01-01T10:00:00Z"), (a, 150, "2025-01-01T12:00:00Z")])
+        newest = WaterQuality.objects.get(tds=150)
+
+        with self.captureOnCommitCallbacks(execute=True):
+            self.client.delete(f"/api/water-quality/{newest.id}/")
+
+        self.assertEqual(LatestReading.objects.get(wu=a).tds, 100)
+        res = self.client.get("/api/water-unit/status/")
+        self.assertEqual({row["id"]: row for row in res.data}[a.id]["latest"]["tds"], 100)
@@ -0,0 +1,67 @@
+from datetime import datetime, timedelta, timezone as dt_timezone
+from io import StringIO
+
+from django.core.management import call_command
+from django.db.models import Avg, Sum
+from django.test import TestCase
+from django.utils import timezone
+
+from api.models import WaterUnit, WaterQuality, WaterQualityRollup, LatestReading, Maintenance
+from api.synthetic import generate_fleet
+
+
+class SyntheticFleetTest(TestCase):
+
+    end = datetime(2025, 3, 10, tzinfo=dt_timezone.utc)
+
+    def generate(self, **kwargs):
+        options = dict(units=5, readings=24 * 12 * 4, end=self.end, seed=1)
+        options.update(kwargs)
+        return generate_fleet(options.pop('units'), options.pop('readings'), **options)
+
+    def test_fleet(self):
+        summary = self.generate()
+        self.assertEqual(WaterUnit.objects.count(), 5)
+        self.assertEqual(WaterQuality.objects.count(), summary['readings'])
+        self.assertEqual(summary['readings'], 5 * 24 * 12 * 4)
+        self.assertEqual(WaterQuality.objects.filter(date_time__gte=self.end).count(), 0)
+        self.assertEqual(
+            WaterQuality.objects.filter(date_time__lt=self.end - timedelta(days=4)).count(), 0
+        )
+        self.assertEqual(Maintenance.objects.count(), summary['maintenance'])
+
+        # bookkeeping a normal ingest does is in place
+        self.assertEqual(LatestReading.objects.count(), 5)
+        newest = WaterQuality.objects.order_by('-date_time').first()
+        self.assertEqual(LatestReading.objects.get(wu_id=newest.wu_id).reading_id, newest.id)
+        counted = WaterQualityRollup.objects.filter(resolution='day').aggregate(n=Sum('count'))['n']
+        self.assertEqual(counted, summary['readings'])
+
+    def test_diurnal_pattern(self):
+        self.generate()
+        readings = WaterQuality.objects.all()
+        afternoon = [r.tds for r in readings if 13 <= timezone.localtime(r.date_time).hour < 17]
+        night = [r.tds for r in readings if 1 <= timezone.localtime(r.date_time).hour < 5]
+        self.assertGreater(sum(afternoon) / len(afternoon), sum(night) / len(night))
+
+    def test_fouling_opens_maintenance(self):
+        self.generate(units=10)
+        problems = set(Maintenance.objects.values_list('problem', flat=True))
+        self.assertIn("High TDS", problems)
+        self.assertFalse(Maintenance.objects.filter(datetime__gte=self.end).exists())
+
+    def test_seed_is_reproducible(self):
+        self.generate(units=2, readings=100)
+        first = list(WaterQuality.objects.order_by('id').values_list('tds', flat=True))
+        WaterQuality.objects.all().delete()
+        self.generate(units=2, readings=100)
+        second = list(WaterQuality.objects.order_by('id').values_list('tds', flat=True))
+        self.assertEqual(first, second)
+
+    def test_command(self):
+        out = StringIO()
+        call_command('generate_fleet', units=3, readings=10, end=self.end, stdout=out)
+        self.assertIn("3 units, 30 readings", out.getvalue())
+        self.assertAlmostEqual(
+            WaterQuality.objects.aggregate(avg=Avg('tds'))['avg'], 165, delta=120
+        )
@@ -2,20 +2,26 @@ from django.urls import path, include
 from rest_framework.routers import DefaultRouter
 
 from .views import (
-    WaterUnitViewSet, WaterQualityViewSet, MaintenanceViewSet,
-    register, LoginMaintainerView, logout, user_info
+    WaterUnitViewSet, WaterQualityViewSet, MaintenanceViewSet, AlertRuleViewSet,
+    register, LoginMaintainerView, logout, user_info, cache_stats, ingest_readings,
+    live_feed,
 )
 
 router = DefaultRouter()
 router.register('water-unit', WaterUnitViewSet, basename='water-unit')
 router.register('water-quality', WaterQualityViewSet, basename='water-quality')
 router.register('maintenance', MaintenanceViewSet, basename='maintenance')
+router.register('alert-rule', AlertRuleViewSet, basename='alert-rule')
     
 urlpatterns = [
     path('register/', register, name="register"),  
     path('login/', LoginMaintainerView.as_view(), name="login"),  
     path('logout/', logout, name="logout"),  
+    # ahead of the router, which would read "ingest" as a reading id
+    path('water-quality/ingest/', ingest_readings, name="ingest_readings"),
     path('', include(router.urls)),
     path('user/', user_info, name="user_info"),
+    path('cache/stats/', cache_stats, name="cache_stats"),
+    path('live/', live_feed, name="live_feed"),
 ]
 
@@ -0,0 +1,174 @@
+"""
+Write-bumped version counters used as HTTP cache validators.
+
+Each scope ("water-unit", "maintenance", "maintenance:wu:7", ...) maps to
+the nanosecond timestamp of its last write, kept in the cache. Reading a
+validator is a single cache lookup and never touches the model tables. A
+scope that fell out of the cache is re-seeded with "now", which only ever
+makes clients revalidate once more than strictly needed.
+
+The counters only work when every process reads the ones every other
+process bumps. With a per-process cache (LocMemCache) and more than one
+worker, a write would leave the other workers answering 304 with stale
+data, so conditional GETs are off unless SINGLE_WORKER is set; a system
+check warns about it.
+"""
+import time
+import zlib
+
+from django.conf import settings
+from django.core import checks
+from django.core.cache import cache, caches
+from django.core.cache.backends.locmem import LocMemCache
+from django.db import transaction
+from django.db.models.signals import post_save, post_delete
+from django.dispatch import receiver
+from django.utils.cache import get_conditional_response
+from django.utils.http import http_date
+
+from .models import WaterUnit, Maintenance, Maintainer
+from .signals import readings_ingested
+
+
+def versions_shared():
+    """Whether a bump in this process reaches every process serving requests."""
+    return getattr(settings, 'SINGLE_WORKER', False) or not isinstance(caches['default'], LocMemCache)
+
+
+@checks.register(checks.Tags.caches)
+def check_versions_shared(app_configs, **kwargs):
+    if versions_shared():
+        return []
+    return [checks.Warning(
+        "The default cache is per process, so ETags, 304s and cached responses are switched off.",
+        hint="Set CACHE_URL to a Redis or Memcached server, or SINGLE_WORKER=1 for one process.",
+        id='api.W001',
+    )]
+
+
+def version_key(scope):
+    return f'version:{scope}'
+
+
+def get_versions(scopes):
+    """Current version of each scope, in order, from one cache round trip."""
+    keys = [version_key(scope) for scope in scopes]
+    found = cache.get_many(keys)
+    missing = [key for key in keys if key not in found]
+    if missing:
+        now = time.time_ns()
+        for key in missing:
+            cache.add(key, now, timeout=None)
+        # a cache that drops the key straight away still gets "now"
+        found.update({key: now for key in missing}, **cache.get_many(missing))
+    return [found[key] for key in keys]
+
+
+def bump(*scopes):
+    now = time.time_ns()
+    cache.set_many({version_key(scope): now for scope in scopes}, timeout=None)
+
+
+def bump_on_commit(*scopes):
+    transaction.on_commit(lambda: bump(*scopes))
+
+
+def reading_scopes(wu_ids):
+    return ['water-quality'] + [f'water-quality:wu:{wu_id}' for wu_id in set(wu_ids)]
+
+
+def bump_readings(wu_ids):
+    """Invalidate water-quality responses for the given units, on commit."""
+    bump_on_commit(*reading_scopes(wu_ids))
+
+
+# ------------------------------------------------------
+#                  VIEWSET INTEGRATION
+# ------------------------------------------------------
+class ConditionalReadMixin:
+    """
+    ETag / Last-Modified on list and retrieve, answered with 304 before the
+    queryset is evaluated. Views set `version_scopes` and may narrow them
+    per request through `get_version_scopes`.
+    """
+    version_scopes = []
+
+    def get_version_scopes(self, request):
+        return self.version_scopes
+
+    def serves_current_data(self):
+        """False when the response may predate the versions (e.g. a replica read)."""
+        return True
+
+    def get_validators(self, request):
+        scopes = self.get_version_scopes(request)
+        versions = get_versions(scopes)
+        # the same versions serve many URLs and formats, so fold those in
+        variant = zlib.crc32(
+            f"{request.get_full_path()}|{request.META.get('HTTP_ACCEPT', '')}".encode()
+        )
+        tag = '-'.join(f"{scope}.{version}" for scope, version in zip(scopes, versions))
+        etag = f'"{tag}-{variant:08x}"'
+        return etag, max(versions) // 1_000_000_000
+
+    def conditional(self, handler, request, *args, **kwargs):
+        if not versions_shared():
+            return handler(request, *args, **kwargs)
+        etag, last_modified = self.get_validators(request)
+        response = get_conditional_response(request, etag=etag, last_modified=last_modified)
+        if response is None:
+            response = handler(request, *args, **kwargs)
+        current = response.status_code == 304 or self.serves_current_data()
+        if 200 <= response.status_code < 400 and current:
+            response['ETag'] = etag
+            response['Last-Modified'] = http_date(last_modified)
+        return response
+
+    def list(self, request, *args, **kwargs):
+        return self.conditional(super().list, request, *args, **kwargs)
+
+    def retrieve(self, request, *args, **kwargs):
+        return self.conditional(super().retrieve, request, *args, **kwargs)
+
+
+# ------------------------------------------------------
+#                       RECEIVERS
+# ------------------------------------------------------
+@receiver([post_save, post_delete], sender=WaterUnit)
+def unit_written(sender, instance, **kwargs):
+    bump_on_commit('water-unit')
+
+
+@receiver(post_delete, sender=WaterUnit)
+def unit_deleted(sender, instance, **kwargs):
+    # readings cascade without signals (a receiver on WaterQuality would
+    # make every unit delete load all of its readings)
+    bump_on_commit('water-quality', 'water-quality:all-units')
+
+
+@receiver(readings_ingested)
+def readings_written(sender, readings, **kwargs):
+    # already sent after commit
+    bump(*reading_scopes(reading.wu_id for reading in readings))
+
+
+@receiver([post_save, post_delete], sender=Maintenance)
+def maintenance_written(sender, instance, **kwargs):
+    scopes = ['maintenance', f'maintenance:wu:{instance.wu_id}']
+    # a move to another unit changes the old unit's listing as well
+    loaded = getattr(instance, '_loaded_wu_id', None)
+    if loaded is not None and loaded != instance.wu_id:
+        scopes.append(f'maintenance:wu:{loaded}')
+    bump_on_commit(*scopes)
+
+
+@receiver(post_save, sender=Maintainer)
+def maintainer_saved(sender, instance, **kwargs):
+    # nested in maintenance responses with ?expand=maintainer
+    bump_on_commit('maintainer')
+
+
+@receiver(post_delete, sender=Maintainer)
+def maintainer_deleted(sender, instance, **kwargs):
+    # SET_NULL rewrites maintenance rows without sending signals
+    bump_on_commit('maintainer', 'maintenance', 'maintenance:all-units')
@@ -1,22 +1,61 @@
-from rest_framework import viewsets
-from rest_framework.permissions import IsAuthenticated, AllowAny
+from rest_framework import viewsets, mixins, status
+from rest_framework.parsers import JSONParser
+from rest_framework.permissions import IsAuthenticated, AllowAny, IsAdminUser
 from rest_framework.authtoken.models import Token
 from rest_framework.authtoken.views import ObtainAuthToken
-from rest_framework.decorators import api_view, permission_classes
+from rest_framework.decorators import api_view, permission_classes, action
 from rest_framework.response import Response
 from rest_framework.filters import OrderingFilter
+from rest_framework.exceptions import AuthenticationFailed, ParseError, PermissionDenied
+from io import BytesIO
+from asgiref.sync import sync_to_async
+from datetime import datetime, time, timedelta, timezone as dt_timezone
+from django.db import transaction
+from django.core.handlers.asgi import ASGIRequest
+from django.http import StreamingHttpResponse, JsonResponse
+from django.views.decorators.csrf import csrf_exempt
+from django.views.decorators.http import require_GET, require_POST
 from django.utils import timezone
+from django_filters.constants import EMPTY_VALUES
 from rest_framework.authtoken.serializers import AuthTokenSerializer
 from django_filters.rest_framework import DjangoFilterBackend
 from django_filters import rest_framework as filters
 from rest_framework import serializers
-from .models import WaterUnit, WaterQuality, Maintenance, Maintainer
+from .models import WaterUnit, WaterQuality, WaterQualityRollup, Maintenance, Maintainer, AlertRule
+from .ingest import (
+    validate_readings, validate_packed, write_readings, record_readings, ingest_max_rows,
+)
+from .ingest_queue import get_pipeline, QueueFull
+from .auth import MaintainerAuthentication, revoke_refresh_token, revoke_token
+from .ingest_log import ingest_log_dir, append_readings
+from .rollups import pick_resolution, bucket_start, rebuild_around, archive_horizon
+from .status import unit_status, refresh_latest
+from .versions import ConditionalReadMixin, bump_readings
+from .caching import ResponseCacheMixin, stats as response_cache_stats
+from .routers import ReplicaReadMixin
+from .fastpath import FastListMixin
+from .pagination import WaterQualityPagination, MaintenancePagination, RollupPagination
+from .parsers import NDJSONParser, PackedReadings, READING_PARSERS
+from .renderers import NDJSONRenderer, CSVRenderer
+from .archive import with_archive, reading_matcher
+from .search import search, SearchOrderingFilter, RANK
+from .live import event_stream, parse_unit_ids
+from .exports import (
+    stream_rows, stream_csv, stream_ndjson, stream_async, format_datetime, format_datetimes,
+)
+from .downsampling import downsample
+from .analytics import load_series, analyze, nan_to_none
 from .serializers import (
     WaterUnitSerializer,
     WaterQualitySerializer,
     MaintenanceSerializer,
     MaintainerSerializer,
-    RegisterMaintainerSerializer
+    RegisterMaintainerSerializer,
+    WaterQualityRollupSerializer,
+    RollupQuerySerializer,
+    AnalyticsQuerySerializer,
+    DownsampleQuerySerializer,
+    AlertRuleSerializer,
 )
 
 # ------------------------------------------------------
@@ -30,22 +69,54 @@ def user_info(request):
     return Response(data)
 
 
+# ------------------------------------------------------
+#                 RESPONSE CACHE STATS
+# ------------------------------------------------------
+@api_view(["GET"])
+@permission_classes([IsAdminUser])
+def cache_stats(request):
+    return Response(response_cache_stats.snapshot())
+
+
 # ------------------------------------------------------
 #                       FILTERS
 # ------------------------------------------------------
+class DayFilter(filters.DateFilter):
+    """
+    Matches a whole local day as a half-open datetime range instead of a
+    `__date` lookup, so the database can use an index on the column.
+    """
+    def filter(self, qs, value):
+        if value in EMPTY_VALUES:
+            return qs
+        start = timezone.make_aware(datetime.combine(value, time.min))
+        end = timezone.make_aware(datetime.combine(value + timedelta(days=1), time.min))
+        return self.get_method(qs)(**{
+            f"{self.field_name}__gte": start,
+            f"{self.field_name}__lt": end,
+        })
+
+
 class WaterQualityFilter(filters.FilterSet):
-    date = filters.DateFilter(field_name="date_time", lookup_expr="date")
+    date = DayFilter(field_name="date_time")
+    start = filters.IsoDateTimeFilter(field_name="date_time", lookup_expr="gte")
+    end = filters.IsoDateTimeFilter(field_name="date_time", lookup_expr="lt")
     min_tds = filters.NumberFilter(field_name="tds", lookup_expr="gte")
     max_tds = filters.NumberFilter(field_name="tds", lookup_expr="lte")
 
     class Meta:
         model = WaterQuality
-        fields = ['wu', 'tds', 'date']
+        fields = ['wu', 'tds', 'date', 'start', 'end']
 
 
 class MaintenanceFilter(filters.FilterSet):
-    date = filters.DateFilter(field_name="datetime", lookup_expr="date")
+    date = DayFilter(field_name="datetime")
     problem_contains = filters.CharFilter(field_name="problem", lookup_expr="icontains")
+    # indexed full-text search over problem and description, see api.search
+    q = filters.CharFilter(method="full_text")
+
+    def full_text(self, queryset, name, value):
+        return search(queryset, value)
 
     class Meta:
         model = Maintenance
@@ -77,7 +148,12 @@ def register(request):
 @api_view(['POST'])
 @permission_classes([IsAuthenticated])
 def logout(request):
-    request.auth.delete()  # deletes the token from DB
+    if isinstance(request.auth, Token):
+        request.auth.delete()  # deletes the token from DB
+    else:
+        # JWT: the refresh token would keep minting access tokens
+        revoke_refresh_token(request.data.get('refresh'), request.auth)
+        revoke_token(request.auth)  # denylisted until it expires
     return Response({"message": "Logged out"})
 
 # ------------------------------------------------------
@@ -90,9 +166,10 @@ class LoginMaintainerView(ObtainAuthToken):
     serializer_class = EmailAuthTokenSerializer
 
     def post(self, request, *args, **kwargs):
-        response = super().post(request, *args, **kwargs)
-        token = Token.objects.get(key=response.data['token'])
-        maintainer = token.user
+        serializer = self.get_serializer(data=request.data)
+        serializer.is_valid(raise_exception=True)
+        maintainer = serializer.validated_data['user']
+        token, _ = Token.objects.get_or_create(user=maintainer)
 
         return Response({
             "message": "Logged in",
@@ -105,14 +182,55 @@ class LoginMaintainerView(ObtainAuthToken):
 # ------------------------------------------------------
 #                     VIEWSETS
 # ------------------------------------------------------
-class WaterUnitViewSet(viewsets.ModelViewSet):
+class ExpandMixin:
+    """
+    `?expand=wu,maintainer` on reads: joins the relations in the same query
+    and nests them in the output instead of returning bare ids. Expanded
+    responses also depend on the related rows, so their version scopes
+    are added through `expanded_scopes()`.
+    """
+    expandable = ()
+    expand_scopes = {'wu': 'water-unit', 'maintainer': 'maintainer'}
+
+    def get_expand(self):
+        if self.request is None or self.request.method not in ('GET', 'HEAD'):
+            return []
+        requested = self.request.query_params.get('expand', '').split(',')
+        return [name for name in self.expandable if name in requested]
+
+    def expanded_scopes(self):
+        return [self.expand_scopes[name] for name in self.get_expand()]
+
+    def get_queryset(self):
+        queryset = super().get_queryset()
+        expand = self.get_expand()
+        return queryset.select_related(*expand) if expand else queryset
+
+    def get_serializer(self, *args, **kwargs):
+        expand = self.get_expand()
+        if expand:
+            kwargs.setdefault('expand', expand)
+        return super().get_serializer(*args, **kwargs)
+
+
+class WaterUnitViewSet(ConditionalReadMixin, FastListMixin, viewsets.ModelViewSet):
     queryset = WaterUnit.objects.all()
     serializer_class = WaterUnitSerializer
+    version_scopes = ['water-unit']
+
+    @action(detail=False, methods=['get'], url_path='status')
+    def unit_status(self, request):
+        """Every unit with its latest TDS reading, in one cached query."""
+        return Response(unit_status())
 
 
-class WaterQualityViewSet(viewsets.ModelViewSet):
+class WaterQualityViewSet(
+    ReplicaReadMixin, ResponseCacheMixin, ExpandMixin, FastListMixin, viewsets.ModelViewSet
+):
     queryset = WaterQuality.objects.all()
     serializer_class = WaterQualitySerializer
+    expandable = ('wu',)
+    pagination_class = WaterQualityPagination
 
     filter_backends = [DjangoFilterBackend, OrderingFilter]
     filterset_class = WaterQualityFilter
@@ -120,20 +238,282 @@ class WaterQualityViewSet(viewsets.ModelViewSet):
     ordering_fields = ['date_time', 'tds', 'wu']
     ordering = ['-date_time']  # latest first
 
+    def downsampled_rows(self, queryset):
+        """
+        (id, wu, date_time, tds) rows reduced per `?downsample=<n>&method=`,
+        oldest first per unit, or None when no downsampling was asked for.
+        The reduction needs that order, so `?ordering=` is refused.
+        """
+        if 'downsample' not in self.request.query_params:
+            return None
+        if self.request.query_params.get('ordering'):
+            raise serializers.ValidationError(
+                {"ordering": "Not available with downsample; points come oldest first per unit."}
+            )
+        params = DownsampleQuerySerializer(data=self.request.query_params)
+        params.is_valid(raise_exception=True)
+        rows = downsample(queryset, params.validated_data['downsample'], params.validated_data['method'])
+        return format_datetimes(rows, [2])
+
+    def archive_reach(self, queryset):
+        """
+        Arguments for `with_archive` when the filtered range reaches into
+        archived days, else None. Archived rows only come back in time order.
+        """
+        horizon = archive_horizon()
+        if horizon is None:
+            return None
+        filterset = DjangoFilterBackend().get_filterset(self.request, queryset, self)
+        if not filterset.is_valid():
+            return None
+        data = filterset.form.cleaned_data
+
+        start, end = data.get('start'), data.get('end')
+        if data.get('date'):
+            day_start = timezone.make_aware(datetime.combine(data['date'], time.min))
+            day_end = timezone.make_aware(datetime.combine(data['date'] + timedelta(days=1), time.min))
+            start = max(start, day_start) if start else day_start
+            end = min(end, day_end) if end else day_end
+        if start is not None and start >= horizon:
+            return None
+
+        ordering = OrderingFilter().get_ordering(self.request, queryset, self)
+        if ordering not in (['date_time'], ['-date_time']):
+            raise serializers.ValidationError(
+                {"ordering": "Archived days can only be exported ordered by date_time."}
+            )
+        wu = data.get('wu')
+        return {
+            'horizon': horizon, 'start': start, 'end': end,
+            'descending': ordering == ['-date_time'],
+            'match': reading_matcher(
+                wu_id=wu.pk if wu else None, tds=data.get('tds'),
+                min_tds=data.get('min_tds'), max_tds=data.get('max_tds'),
+            ),
+        }
+
+    def get_version_scopes(self, request):
+        # a single-unit listing only changes when that unit's readings do
+        wu = request.query_params.get('wu', '')
+        if self.action == 'list' and wu.isdigit():
+            scopes = ['water-quality:all-units', f'water-quality:wu:{int(wu)}']
+        else:
+            scopes = ['water-quality']
+        return scopes + self.expanded_scopes()
+
+    def list(self, request, *args, **kwargs):
+        return self.cached_response(self.list_readings, request, *args, **kwargs)
+
+    def list_readings(self, request, *args, **kwargs):
+        queryset = self.filter_queryset(self.get_queryset())
+        rows = self.downsampled_rows(queryset)
+        if rows is None:
+            return self.fast_list(request) or mixins.ListModelMixin.list(self, request, *args, **kwargs)
+
+        # same envelope as a page; the reduced series is bounded, so never a next page
+        header = ['id', 'wu', 'date_time', 'tds']
+        return Response({
+            'next': None, 'previous': None,
+            'results': [dict(zip(header, row)) for row in rows],
+        })
+
+    @transaction.atomic
     def perform_create(self, serializer):
-        serializer.save(date_time=timezone.now())
+        reading = serializer.save(date_time=timezone.now())
+        record_readings([reading])
+
+    @transaction.atomic
+    def perform_update(self, serializer):
+        before = WaterQuality(wu_id=serializer.instance.wu_id, date_time=serializer.instance.date_time)
+        reading = serializer.save()
+        rebuild_around([before, reading])
+        refresh_latest([before.wu_id, reading.wu_id])
+        bump_readings([before.wu_id, reading.wu_id])
+
+    @transaction.atomic
+    def perform_destroy(self, instance):
+        instance.delete()
+        rebuild_around([instance])
+        refresh_latest([instance.wu_id])
+        bump_readings([instance.wu_id])
+
+    @action(detail=False, methods=['post'], parser_classes=[JSONParser, *READING_PARSERS])
+    def bulk(self, request):
+        """
+        Ingest a batch of readings (JSON array, NDJSON, packed binary or
+        msgpack columns, see parsers.py). Good rows are written (or appended
+        to the ingest log, see ingest_log.py), bad rows are reported back by
+        index.
+        """
+        rows = request.data
+        packed = isinstance(rows, PackedReadings)
+        if not packed and not isinstance(rows, list):
+            return Response({"detail": "Expected a list of readings."}, status=400)
+        if len(rows[0] if packed else rows) > ingest_max_rows():
+            return Response(
+                {"detail": f"Batch too large, max {ingest_max_rows()} readings."},
+                status=status.HTTP_413_REQUEST_ENTITY_TOO_LARGE
+            )
+
+        readings, errors = validate_packed(rows) if packed else validate_readings(rows)
+        if ingest_log_dir():
+            # durable in the local log; drain_ingest_log writes them later
+            append_readings(readings)
+            key, ok = "queued", status.HTTP_202_ACCEPTED
+        else:
+            write_readings(readings)
+            key, ok = "created", status.HTTP_201_CREATED
+
+        if not errors:
+            code = ok
+        elif readings:
+            code = status.HTTP_207_MULTI_STATUS
+        else:
+            code = status.HTTP_400_BAD_REQUEST
+
+        return Response({key: len(readings), "errors": errors}, status=code)
+
+    @action(detail=False, methods=['get'])
+    def rollup(self, request):
+        """
+        Pre-aggregated count/avg/min/max of TDS per unit. Unless
+        `resolution` is given, the finest of minute/hour/day that keeps
+        each unit under `max_points` buckets for the range is used.
+        Buckets come in keyset pages ordered by unit, then time, since
+        `max_points` bounds each unit and not the number of units.
+        """
+        params = RollupQuerySerializer(data=request.query_params)
+        params.is_valid(raise_exception=True)
+        query = params.validated_data
 
+        start, end = query['start'], query.get('end') or timezone.now()
+        resolution = query.get('resolution') or pick_resolution(start, end, query['max_points'])
 
-class MaintenanceViewSet(viewsets.ModelViewSet):
+        rollups = WaterQualityRollup.objects.filter(
+            resolution=resolution,
+            bucket_start__gte=bucket_start(start, resolution),
+            bucket_start__lt=end,
+        ).order_by('wu_id', 'bucket_start')
+        if 'wu' in query:
+            rollups = rollups.filter(wu_id=query['wu'])
+
+        # keyed on the queryset's own ordering, not the readings' ?ordering=
+        paginator = RollupPagination()
+        page = paginator.paginate_queryset(rollups, request)
+        data = WaterQualityRollupSerializer(page, many=True).data
+        return Response({"resolution": resolution, **paginator.get_paginated_response(data).data})
+
+    @action(detail=False, methods=['get'])
+    def analytics(self, request):
+        """
+        Summary statistics, trailing-window z-score anomalies and limit
+        breaches for one unit. Accepts the same filters as the list plus
+        `window`, `z`, `low`, `high` and `series`.
+        """
+        params = AnalyticsQuerySerializer(data=request.query_params)
+        params.is_valid(raise_exception=True)
+        query = params.validated_data
+
+        times, values = load_series(self.filter_queryset(self.get_queryset()))
+        result, series = analyze(
+            times, values, window=query['window'], z_threshold=query['z'],
+            low=query.get('low'), high=query.get('high'),
+        )
+
+        def stamp(epoch):
+            return format_datetime(datetime.fromtimestamp(epoch, dt_timezone.utc))
+
+        data = {
+            "wu": query['wu'],
+            "count": result["count"],
+            "window": query['window'],
+            "summary": result["summary"],
+            "anomalies": [
+                {"date_time": stamp(t), "tds": tds, "z": z} for t, tds, z in result["anomalies"]
+            ],
+        }
+        if "breaches" in result:
+            breaches = result["breaches"]
+            data["breaches"] = {
+                "below": breaches["below"],
+                "above": breaches["above"],
+                "points": [{"date_time": stamp(t), "tds": tds} for t, tds in breaches["points"]],
+            }
+        if query['series']:
+            times, values, mean, std, z = series
+            data["series"] = {
+                "date_time": [stamp(t) for t in times],
+                "tds": values.tolist(),
+                "mean": nan_to_none(mean),
+                "std": nan_to_none(std),
+                "z": nan_to_none(z),
+            }
+        return Response(data)
+
+    @action(detail=False, methods=['get'], renderer_classes=[NDJSONRenderer, CSVRenderer])
+    def export(self, request):
+        """
+        Stream the filtered readings as NDJSON or CSV (`?format=csv`),
+        straight from a database cursor without building serializers.
+        Honours `?downsample=` like the list. Ranges reaching before the
+        retention horizon are completed from the archive. Under ASGI the
+        chunks are fetched in a worker thread and sent as they come.
+        """
+        queryset = self.filter_queryset(self.get_queryset())
+        archived = self.archive_reach(queryset)
+        rows = self.downsampled_rows(queryset)
+        if rows is not None and archived:
+            raise serializers.ValidationError(
+                {"downsample": "Not available for archived days; use /rollup/ instead."}
+            )
+        if rows is None and archived:
+            rows = format_datetimes(with_archive(queryset, **archived), [2])
+        elif rows is None:
+            rows = stream_rows(queryset, ['id', 'wu_id', 'date_time', 'tds'], ['date_time'])
+        header = ['id', 'wu', 'date_time', 'tds']
+
+        renderer = request.accepted_renderer
+        stream = stream_csv if renderer.format == 'csv' else stream_ndjson
+        chunks = stream(rows, header)
+        if isinstance(request._request, ASGIRequest):
+            chunks = stream_async(chunks)
+        response = StreamingHttpResponse(chunks, content_type=renderer.media_type)
+        response['Content-Disposition'] = f'attachment; filename="water-quality.{renderer.format}"'
+        return response
+
+
+class AlertRuleViewSet(viewsets.ModelViewSet):
+    queryset = AlertRule.objects.all()
+    serializer_class = AlertRuleSerializer
+    filter_backends = [DjangoFilterBackend]
+    filterset_fields = ['wu', 'kind', 'is_active', 'firing']
+
+
+class MaintenanceViewSet(
+    ReplicaReadMixin, ConditionalReadMixin, ResponseCacheMixin, ExpandMixin, FastListMixin,
+    viewsets.ModelViewSet
+):
     queryset = Maintenance.objects.all()
     serializer_class = MaintenanceSerializer
+    expandable = ('wu', 'maintainer')
+    pagination_class = MaintenancePagination
+    version_scopes = ['maintenance']
 
-    filter_backends = [DjangoFilterBackend, OrderingFilter]
+    filter_backends = [DjangoFilterBackend, SearchOrderingFilter]
     filterset_class = MaintenanceFilter
 
-    ordering_fields = ['datetime', 'wu', 'maintainer']
+    ordering_fields = ['datetime', 'wu', 'maintainer', RANK]
     ordering = ['-datetime']
 
+    def get_version_scopes(self, request):
+        # a single-unit listing only changes when that unit's records do
+        wu = request.query_params.get('wu', '')
+        if self.action == 'list' and wu.isdigit():
+            scopes = ['maintenance:all-units', f'maintenance:wu:{int(wu)}']
+        else:
+            scopes = list(self.version_scopes)
+        return scopes + self.expanded_scopes()
+
     def get_permissions(self):
         if self.request.method in ['GET', 'HEAD', 'OPTIONS']:
             return []  # no auth needed for read
@@ -144,3 +524,94 @@ class MaintenanceViewSet(viewsets.ModelViewSet):
             datetime=timezone.now(),
             maintainer=self.request.user
         )
+
+
+# ------------------------------------------------------
+#                    ASYNC INGEST
+# ------------------------------------------------------
+async def authenticate_token(request):
+    """MaintainerAuthentication for a plain async view; returns the user or None."""
+    result = await sync_to_async(MaintainerAuthentication().authenticate)(request)
+    return result[0] if result else None
+
+
+@csrf_exempt
+@require_POST
+async def ingest_readings(request):
+    """
+    Validate a batch (JSON array or NDJSON) and queue the good rows for the
+    background writer. Answers 202 once queued; readings become visible
+    after the next flush. 429 when the queue is full. Without a queue (no
+    ASGI lifespan, see api.ingest_queue) the rows are written before
+    answering 201.
+    """
+    try:
+        if await authenticate_token(request) is None:
+            return JsonResponse(
+                {"detail": "Authentication credentials were not provided."}, status=401
+            )
+    except AuthenticationFailed as exc:
+        return JsonResponse({"detail": str(exc.detail)}, status=401)
+    except PermissionDenied as exc:
+        # cookie credentials without a CSRF token
+        return JsonResponse({"detail": str(exc.detail)}, status=403)
+
+    parser = NDJSONParser() if request.content_type == NDJSONParser.media_type else JSONParser()
+    try:
+        rows = parser.parse(BytesIO(request.body))
+    except ParseError as exc:
+        return JsonResponse({"detail": str(exc.detail)}, status=400)
+
+    if not isinstance(rows, list):
+        return JsonResponse({"detail": "Expected a list of readings."}, status=400)
+    if len(rows) > ingest_max_rows():
+        return JsonResponse(
+            {"detail": f"Batch too large, max {ingest_max_rows()} readings."},
+            status=status.HTTP_413_REQUEST_ENTITY_TOO_LARGE
+        )
+
+    readings, errors = await sync_to_async(validate_readings)(rows)
+    if not readings:
+        return JsonResponse({"queued": 0, "errors": errors}, status=400)
+
+    pipeline = get_pipeline()
+    if pipeline is None:
+        await sync_to_async(write_readings)(readings)
+        return JsonResponse(
+            {"written": len(readings), "errors": errors}, status=status.HTTP_201_CREATED
+        )
+
+    try:
+        pipeline.submit(readings)
+    except QueueFull:
+        response = JsonResponse(
+            {"detail": "Ingest queue is full, retry later."},
+            status=status.HTTP_429_TOO_MANY_REQUESTS
+        )
+        response['Retry-After'] = '1'
+        return response
+
+    return JsonResponse(
+        {"queued": len(readings), "errors": errors}, status=status.HTTP_202_ACCEPTED
+    )
+
+
+# ------------------------------------------------------
+#                      LIVE FEED
+# ------------------------------------------------------
+@require_GET
+async def live_feed(request):
+    """
+    Server-sent events for `?wu=1,2`: new readings and maintenance records
+    of those units as they are written. Public, like the read endpoints.
+    """
+    try:
+        wu_ids = parse_unit_ids(request.GET.get('wu', ''))
+    except ValueError as exc:
+        return JsonResponse({"wu": [str(exc)]}, status=400)
+
+    response = StreamingHttpResponse(event_stream(wu_ids), content_type='text/event-stream')
+    response['Cache-Control'] = 'no-cache'
+    # nginx would otherwise buffer the stream
+    response['X-Accel-Buffering'] = 'no'
+    return response
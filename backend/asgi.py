@@ -13,4 +13,9 @@ from django.core.asgi import get_asgi_application
 
 os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'backend.settings')
 
-application = get_asgi_application()
+django_application = get_asgi_application()
+
+# lifespan support lets the server flush queued readings on shutdown
+from api.ingest_queue import Lifespan  # noqa: E402
+
+application = Lifespan(django_application)
@@ -2,6 +2,7 @@
 Django settings for backend project.
 """
 
+import os
 from pathlib import Path
 from corsheaders.defaults import default_headers
 
@@ -24,6 +25,7 @@ INSTALLED_APPS = [
 
     'rest_framework',
     'rest_framework.authtoken',
+    'rest_framework_simplejwt.token_blacklist',
     'corsheaders',
     'api',
 ]
@@ -33,6 +35,7 @@ INSTALLED_APPS = [
 # ---------------------------------------------------------
 MIDDLEWARE = [
     'corsheaders.middleware.CorsMiddleware',  # must be at top
+    'api.metrics.MetricsMiddleware',
     'django.middleware.security.SecurityMiddleware',
     'django.contrib.sessions.middleware.SessionMiddleware',
 
@@ -106,13 +109,144 @@ WSGI_APPLICATION = 'backend.wsgi.application'
 # ---------------------------------------------------------
 # DATABASE
 # ---------------------------------------------------------
-DATABASES = {
-    'default': {
-        'ENGINE': 'django.db.backends.sqlite3',
-        'NAME': BASE_DIR / 'db.sqlite3',
+# DB_PROFILE selects the database:
+#   sqlite   (default) local file, persistent connections, tuned with the
+#            SQLITE_PRAGMAS below on every new connection (api/db.py)
+#   postgres PostgreSQL from POSTGRES_* variables, with psycopg's native
+#            pool (needs "psycopg[pool]"), or persistent connections plus
+#            health checks when DB_POOL=0
+DB_PROFILE = os.environ.get('DB_PROFILE', 'sqlite')
+DB_CONN_MAX_AGE = int(os.environ.get('DB_CONN_MAX_AGE', 60))
+
+if DB_PROFILE == 'postgres':
+    DATABASES = {
+        'default': {
+            'ENGINE': 'django.db.backends.postgresql',
+            'NAME': os.environ.get('POSTGRES_DB', 'water_quality'),
+            'USER': os.environ.get('POSTGRES_USER', 'postgres'),
+            'PASSWORD': os.environ.get('POSTGRES_PASSWORD', ''),
+            'HOST': os.environ.get('POSTGRES_HOST', 'localhost'),
+            'PORT': os.environ.get('POSTGRES_PORT', '5432'),
+        }
+    }
+    if os.environ.get('DB_POOL', '1') == '1':
+        # the pool replaces persistent connections (CONN_MAX_AGE must stay 0)
+        DATABASES['default']['OPTIONS'] = {
+            'pool': {
+                'min_size': int(os.environ.get('DB_POOL_MIN', 2)),
+                'max_size': int(os.environ.get('DB_POOL_MAX', 10)),
+                'timeout': 10,
+            },
+        }
+    else:
+        DATABASES['default'].update(CONN_MAX_AGE=DB_CONN_MAX_AGE, CONN_HEALTH_CHECKS=True)
+elif DB_PROFILE == 'sqlite':
+    DATABASES = {
+        'default': {
+            'ENGINE': 'django.db.backends.sqlite3',
+            'NAME': os.environ.get('SQLITE_PATH', BASE_DIR / 'db.sqlite3'),
+            'CONN_MAX_AGE': DB_CONN_MAX_AGE,
+            'CONN_HEALTH_CHECKS': True,
+        }
     }
+else:
+    raise ValueError(f"Unknown DB_PROFILE {DB_PROFILE!r}, expected 'sqlite' or 'postgres'")
+
+# Optional read replica for safe requests on the water-quality and
+# maintenance endpoints (api/routers.py): SQLITE_REPLICA_PATH for a second
+# SQLite file, POSTGRES_REPLICA_HOST for a PostgreSQL standby. Tests use
+# the primary (MIRROR). Migrate a local replica file with
+# `manage.py migrate --database replica`.
+REPLICA_SETTINGS = {
+    'sqlite': {'NAME': os.environ.get('SQLITE_REPLICA_PATH')},
+    'postgres': {'HOST': os.environ.get('POSTGRES_REPLICA_HOST')},
+}[DB_PROFILE]
+if all(REPLICA_SETTINGS.values()):
+    DATABASES['replica'] = {
+        **DATABASES['default'], **REPLICA_SETTINGS, 'TEST': {'MIRROR': 'default'},
+    }
+
+DATABASE_ROUTERS = ['api.routers.ReadReplicaRouter']
+READ_DATABASE_ALIAS = 'replica' if 'replica' in DATABASES else None
+# after a write, that user's reads stay on the primary this long (seconds)
+READ_YOUR_WRITES_SECONDS = 5
+# replica-rendered responses may lag, so they are cached only briefly
+READ_REPLICA_CACHE_TIMEOUT = 5
+
+# WAL lets readers run alongside the single writer; NORMAL only syncs at
+# checkpoints, which is safe in WAL mode; writers wait up to 5 s for the
+# lock instead of failing with "database is locked"
+SQLITE_PRAGMAS = {
+    'journal_mode': 'wal',
+    'synchronous': 'normal',
+    'mmap_size': 256 * 1024 * 1024,
+    'busy_timeout': 5000,
 }
 
+# ---------------------------------------------------------
+# CACHE
+# ---------------------------------------------------------
+# The version counters behind ETags / 304s live in the default cache and
+# are bumped by writes, so every worker has to share it: set CACHE_URL to
+# redis://host:6379/0 or memcached://host:11211. A per-process cache is
+# only correct with a single worker (SINGLE_WORKER, on with DEBUG);
+# otherwise conditional GETs are switched off.
+CACHE_URL = os.environ.get('CACHE_URL', '')
+SINGLE_WORKER = os.environ.get('SINGLE_WORKER', '1' if DEBUG else '0') == '1'
+
+if CACHE_URL.startswith(('redis://', 'rediss://')):
+    SHARED_CACHE = {
+        'BACKEND': 'django.core.cache.backends.redis.RedisCache',
+        'LOCATION': CACHE_URL,
+    }
+elif CACHE_URL.startswith('memcached://'):
+    SHARED_CACHE = {
+        'BACKEND': 'django.core.cache.backends.memcached.PyMemcacheCache',
+        'LOCATION': CACHE_URL[len('memcached://'):],
+    }
+else:
+    SHARED_CACHE = None
+
+CACHES = {
+    'default': SHARED_CACHE or {
+        'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+    },
+    # entries are checked against the shared version counters on every
+    # read, so a per-process copy is safe; a shared one is filled once
+    'responses': {**SHARED_CACHE, 'KEY_PREFIX': 'responses'} if SHARED_CACHE else {
+        'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+        'LOCATION': 'responses',
+        'OPTIONS': {'MAX_ENTRIES': 5000},
+    },
+}
+
+# Unit status overview, invalidated explicitly on every write
+STATUS_CACHE_TIMEOUT = 300
+
+# Rendered list/retrieve responses, invalidated per unit on write (off
+# along with conditional GETs when the version counters are per process)
+RESPONSE_CACHE_ALIAS = 'responses'
+RESPONSE_CACHE_TIMEOUT = 300
+
+# ---------------------------------------------------------
+# PASSWORD HASHING
+# ---------------------------------------------------------
+# Hashing runs in a pool of PASSWORD_HASH_WORKERS processes (0 = inline),
+# see api/hashers.py. The first hasher is used for new passwords; stored
+# hashes of the others are upgraded on the next successful login.
+try:
+    import argon2  # noqa: F401
+    PASSWORD_HASHERS = ['api.hashers.Argon2PasswordHasher']
+except ImportError:
+    PASSWORD_HASHERS = []
+
+PASSWORD_HASHERS += [
+    'api.hashers.ScryptPasswordHasher',
+    'api.hashers.PBKDF2PasswordHasher',
+    'django.contrib.auth.hashers.PBKDF2SHA1PasswordHasher',
+]
+PASSWORD_HASH_WORKERS = 2
+
 # ---------------------------------------------------------
 # PASSWORD VALIDATION
 # ---------------------------------------------------------
@@ -143,12 +277,90 @@ DEFAULT_AUTO_FIELD = 'django.db.models.BigAutoField'
 # ---------------------------------------------------------
 REST_FRAMEWORK = {
     'DEFAULT_AUTHENTICATION_CLASSES': (
-        'rest_framework.authentication.TokenAuthentication',
+        # JWT, Token header and auth_token cookie, without per-request queries
+        'api.auth.MaintainerAuthentication',
     ),
     'DEFAULT_PERMISSION_CLASSES': [
         'rest_framework.permissions.IsAuthenticatedOrReadOnly',
     ],
 }
 
+# Each refresh hands out a new refresh token and blacklists the old one;
+# logout blacklists the current one
+SIMPLE_JWT = {
+    'TOKEN_OBTAIN_SERIALIZER': 'api.auth.MaintainerTokenObtainPairSerializer',
+    'TOKEN_REFRESH_SERIALIZER': 'api.auth.MaintainerTokenRefreshSerializer',
+    'ROTATE_REFRESH_TOKENS': True,
+    'BLACKLIST_AFTER_ROTATION': True,
+}
+
+# Authenticated principals are cached per process: legacy Token keys for
+# AUTH_CACHE_TTL seconds, JWTs until they expire (at most the same TTL).
+# Revoked JWT ids are reloaded every AUTH_DENYLIST_REFRESH seconds.
+AUTH_CACHE_TTL = 60
+AUTH_CACHE_SIZE = 10000
+AUTH_DENYLIST_REFRESH = 30
+
+# Async ingest (/api/water-quality/ingest/): readings held in memory before
+# the endpoint answers 429, and the longest a queued reading waits for its
+# batch to fill up (seconds)
+INGEST_QUEUE_CAPACITY = 50000
+INGEST_FLUSH_INTERVAL = 0.5
+
+# Alert rules are held in memory by each process and reloaded every
+# ALERT_RULES_REFRESH seconds (at once after a local change); `silent`
+# rules are swept by `manage.py check_alerts`
+ALERT_RULES_REFRESH = 30
+
+# Live feed (/api/live/?wu=...): events buffered per client before the
+# oldest are dropped, burst coalescing window and keepalive interval
+# (seconds), and units one stream may watch
+LIVE_BUFFER_SIZE = 1000
+LIVE_COALESCE_SECONDS = 0.25
+LIVE_KEEPALIVE_SECONDS = 15
+LIVE_MAX_UNITS = 100
+
+# Set to a directory to make /bulk/ append readings to a local write-ahead
+# log and answer 202; run `manage.py drain_ingest_log` to apply it
+INGEST_LOG_DIR = os.environ.get('INGEST_LOG_DIR') or None
+INGEST_LOG_SEGMENT_BYTES = 8 * 1024 * 1024
+INGEST_LOG_DRAIN_BATCH = 50000
+
+# Raw readings older than READINGS_RETENTION_DAYS are moved by
+# `manage.py archive_readings` into gzip NDJSON files under ARCHIVE_DIR,
+# deleting ARCHIVE_DELETE_BATCH rows per transaction; rollups keep them
+# queryable and /export/ reads the archive transparently
+READINGS_RETENTION_DAYS = 365
+ARCHIVE_DIR = os.environ.get('ARCHIVE_DIR', BASE_DIR / 'archive')
+ARCHIVE_DELETE_BATCH = 5000
+
+# Analytics z-scores divide by at least this trailing std (ppm, about the
+# sensor resolution), so a spike after a flat-lined window still stands out
+ANALYTICS_STD_FLOOR = 1.0
+
+# Request metrics at /metrics (Prometheus text format): latency histogram
+# buckets (seconds), and a bearer token scrapers must send when set.
+# Queries slower than SLOW_QUERY_SECONDS are logged to `api.slow_queries`
+# with their call site; None turns the log off
+METRICS_ENABLED = True
+METRICS_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+METRICS_TOKEN = os.environ.get('METRICS_TOKEN') or None
+SLOW_QUERY_SECONDS = 0.5
+
+LOGGING = {
+    'version': 1,
+    'disable_existing_loggers': False,
+    'handlers': {
+        'console': {'class': 'logging.StreamHandler'},
+    },
+    'loggers': {
+        'api.slow_queries': {'handlers': ['console'], 'level': 'WARNING', 'propagate': False},
+    },
+}
+
+# List endpoints render straight from values() rows, skipping the
+# serializers (output is identical); set False to always use serializers
+FAST_LIST_SERIALIZATION = True
+
 # Custom user model
 AUTH_USER_MODEL = 'api.Maintainer'
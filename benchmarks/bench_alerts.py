@@ -0,0 +1,72 @@
+"""
+Cost of alert rule evaluation per ingested reading, with rules for every
+unit loaded into memory, against the same batch with no rules at all.
+
+    python benchmarks/bench_alerts.py --units 10000 --readings 1000000
+"""
+import argparse
+import json
+from datetime import timedelta
+
+from common import setup_database, timed
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--units', type=int, default=10_000)
+    parser.add_argument('--readings', type=int, default=1_000_000)
+    parser.add_argument('--repeat', type=int, default=5)
+    args = parser.parse_args()
+
+    setup_database()
+
+    from django.utils import timezone
+    from api.alerts import engine
+    from api.models import WaterUnit, WaterQuality, AlertRule
+
+    WaterUnit.objects.bulk_create(
+        WaterUnit(name=f"Unit {i}", location="bench") for i in range(args.units)
+    )
+    unit_ids = list(WaterUnit.objects.values_list('id', flat=True))
+
+    # readings stay inside the limits: the steady state, no state changes
+    start = timezone.now()
+    readings = [
+        WaterQuality(
+            wu_id=unit_ids[n % args.units], tds=100 + (n * 7919) % 300,
+            date_time=start + timedelta(seconds=n // args.units),
+        )
+        for n in range(args.readings)
+    ]
+
+    def evaluate():
+        engine.last_seen.clear()
+        changes = engine.evaluate(readings)
+        assert not changes, len(changes)
+
+    results = {}
+    for name in ("no_rules", "rules"):
+        if name == "rules":
+            AlertRule.objects.bulk_create(
+                rule for wu_id in unit_ids for rule in (
+                    AlertRule(wu_id=wu_id, kind=AlertRule.ABOVE, threshold=500, hysteresis=25),
+                    AlertRule(wu_id=wu_id, kind=AlertRule.BELOW, threshold=50, hysteresis=10),
+                    AlertRule(wu_id=wu_id, kind=AlertRule.SILENT, threshold=15),
+                )
+            )
+        engine.load()
+        best = min(timed(evaluate, args.repeat))
+        results[name] = best / args.readings * 1e6
+        print(json.dumps({
+            "path": name,
+            "units": args.units,
+            "rules": AlertRule.objects.count(),
+            "readings": args.readings,
+            "us_per_reading": round(results[name], 3),
+        }))
+
+    print(json.dumps({"added_us_per_reading": round(results["rules"] - results["no_rules"], 3)}))
+
+
+if __name__ == '__main__':
+    main()
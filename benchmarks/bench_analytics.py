@@ -0,0 +1,67 @@
+"""
+Vectorized analytics vs. a naive loop over model instances.
+
+    python benchmarks/bench_analytics.py --points 1000000
+"""
+import argparse
+import json
+import math
+import time
+from collections import deque
+
+from common import setup_database, seed_readings
+
+
+def naive(queryset, window, z_threshold):
+    """The obvious per-instance implementation, for comparison."""
+    recent = deque(maxlen=window)
+    anomalies = 0
+    values = []
+    for reading in queryset.order_by('date_time', 'id'):
+        values.append(reading.tds)
+        if len(recent) == window:
+            mean = sum(recent) / window
+            std = math.sqrt(sum((v - mean) ** 2 for v in recent) / window)
+            if std and abs(reading.tds - mean) / std >= z_threshold:
+                anomalies += 1
+        recent.append(reading.tds)
+    values.sort()
+    return anomalies, values[len(values) // 2]
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--points', type=int, default=1_000_000)
+    parser.add_argument('--window', type=int, default=60)
+    args = parser.parse_args()
+
+    setup_database()
+
+    from api.analytics import load_series, analyze
+    from api.models import WaterQuality
+
+    unit_ids = seed_readings(args.points, units=1)
+    queryset = WaterQuality.objects.filter(wu_id=unit_ids[0])
+
+    start = time.perf_counter()
+    times, values = load_series(queryset)
+    loaded = time.perf_counter()
+    result, _ = analyze(times, values, window=args.window)
+    vectorized = time.perf_counter()
+
+    naive(queryset, args.window, 3.0)
+    looped = time.perf_counter()
+
+    print(json.dumps({
+        "points": args.points,
+        "window": args.window,
+        "vectorized_load_s": round(loaded - start, 3),
+        "vectorized_compute_s": round(vectorized - loaded, 3),
+        "vectorized_total_s": round(vectorized - start, 3),
+        "naive_orm_loop_s": round(looped - vectorized, 3),
+        "speedup": round((looped - vectorized) / (vectorized - start), 1),
+    }))
+
+
+if __name__ == '__main__':
+    main()
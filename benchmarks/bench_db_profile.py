@@ -0,0 +1,100 @@
+"""
+Requests per second on the water-quality endpoints with Django's default
+SQLite handling (a new connection per request, rollback journal, full
+sync) and with the sqlite profile from settings (persistent connections,
+WAL, synchronous=NORMAL, mmap).
+
+Requests go through the WSGI handler, so connections are opened and
+closed exactly as in production. Uses a temporary database file unless
+BENCH_DB is set.
+
+    python benchmarks/bench_db_profile.py --rows 200000 --seconds 5
+"""
+import argparse
+import json
+import os
+import tempfile
+
+os.environ.setdefault('BENCH_DB', os.path.join(tempfile.mkdtemp(), 'bench.sqlite3'))
+
+from common import setup_database, seed_readings  # noqa: E402
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--rows', type=int, default=200_000)
+    parser.add_argument('--units', type=int, default=50)
+    parser.add_argument('--seconds', type=float, default=5.0)
+    args = parser.parse_args()
+
+    setup_database()
+
+    import random
+    import time
+    from django.conf import settings
+    from django.core.handlers.wsgi import WSGIHandler
+    from django.db import connection
+    from django.test import RequestFactory
+    from django.test.utils import override_settings
+    from rest_framework.authtoken.models import Token
+    from api.models import Maintainer
+
+    unit_ids = seed_readings(args.rows, units=args.units)
+    user = Maintainer.objects.create_user("db@bench.local", "Bench", "pass1234")
+    token = Token.objects.create(user=user).key
+    connection.close()
+
+    handler = WSGIHandler()
+    factory = RequestFactory(HTTP_AUTHORIZATION=f"Token {token}")
+    rng = random.Random(0)
+
+    def call(request):
+        response = handler(request.environ, lambda status, headers: None)
+        response.close()  # request_finished: connections closed or kept per CONN_MAX_AGE
+        assert response.status_code < 300, response.status_code
+
+    endpoints = {
+        "list": lambda: factory.get(f"/api/water-quality/?wu={rng.choice(unit_ids)}&page_size=100"),
+        "rollup": lambda: factory.get(
+            f"/api/water-quality/rollup/?wu={rng.choice(unit_ids)}&start=2000-01-01T00:00:00Z"
+        ),
+        "bulk_10": lambda: factory.post(
+            "/api/water-quality/bulk/",
+            json.dumps([{"wu": rng.choice(unit_ids), "tds": rng.uniform(50, 500)} for _ in range(10)]),
+            content_type="application/json",
+        ),
+    }
+
+    profiles = {
+        "default": (0, {}),
+        "tuned": (settings.DATABASES['default'].get('CONN_MAX_AGE', 60), settings.SQLITE_PRAGMAS),
+    }
+
+    for name, (max_age, pragmas) in profiles.items():
+        connection.close()
+        connection.settings_dict['CONN_MAX_AGE'] = max_age
+        with override_settings(SQLITE_PRAGMAS=pragmas):
+            if not pragmas:
+                with connection.cursor() as cursor:
+                    cursor.execute("PRAGMA journal_mode = delete")
+                connection.close()
+
+            for endpoint, build in endpoints.items():
+                # response cache off: measure the database, not the cache
+                with override_settings(RESPONSE_CACHE_TIMEOUT=0):
+                    count, deadline = 0, time.perf_counter() + args.seconds
+                    start = time.perf_counter()
+                    while time.perf_counter() < deadline:
+                        call(build())
+                        count += 1
+                    elapsed = time.perf_counter() - start
+                print(json.dumps({
+                    "profile": name,
+                    "endpoint": endpoint,
+                    "requests": count,
+                    "requests_per_sec": round(count / elapsed, 1),
+                }))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,89 @@
+"""
+Bytes on the wire and decode throughput of one bulk ingest request in each
+accepted format: parsing alone, and parsing plus validation into unsaved
+WaterQuality instances (what /bulk/ does before writing).
+
+    python benchmarks/bench_ingest_formats.py --readings 100000
+"""
+import argparse
+import io
+import json
+import random
+import struct
+from datetime import datetime, timezone
+
+from common import setup_database, timed, percentiles
+
+
+def iso(epoch_ms):
+    return datetime.fromtimestamp(epoch_ms / 1000, timezone.utc).isoformat().replace('+00:00', 'Z')
+
+
+def payloads(readings, unit_ids, start_ms):
+    rng = random.Random(0)
+    rows = [
+        (rng.choice(unit_ids), start_ms + i * 1000, round(rng.uniform(50, 500), 1))
+        for i in range(readings)
+    ]
+    from api.parsers import msgpack
+
+    bodies = {
+        "json": json.dumps([
+            {"wu": wu, "tds": tds, "date_time": iso(ms)} for wu, ms, tds in rows
+        ]).encode(),
+        "packed": b"".join(struct.pack("<Iqf", wu, ms, tds) for wu, ms, tds in rows),
+    }
+    if msgpack is not None:
+        bodies["msgpack"] = msgpack.packb({
+            "wu": [r[0] for r in rows], "epoch_ms": [r[1] for r in rows], "tds": [r[2] for r in rows],
+        })
+    return bodies
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--readings', type=int, default=100_000)
+    parser.add_argument('--units', type=int, default=100)
+    parser.add_argument('--repeat', type=int, default=5)
+    args = parser.parse_args()
+
+    setup_database()
+
+    from rest_framework.parsers import JSONParser
+    from api.ingest import validate_readings, validate_packed
+    from api.models import WaterUnit
+    from api.parsers import PackedReadingsParser, MsgpackReadingsParser
+
+    units = WaterUnit.objects.bulk_create(
+        WaterUnit(name=f"Bench {i}", location="Bench") for i in range(args.units)
+    )
+    start_ms = int(datetime(2025, 1, 1, tzinfo=timezone.utc).timestamp() * 1000)
+    bodies = payloads(args.readings, [u.id for u in units], start_ms)
+
+    decoders = {
+        "json": (JSONParser(), validate_readings),
+        "packed": (PackedReadingsParser(), validate_packed),
+        "msgpack": (MsgpackReadingsParser(), validate_packed),
+    }
+
+    for name, body in bodies.items():
+        parser_, validate = decoders[name]
+        parse = lambda: parser_.parse(io.BytesIO(body))  # noqa: E731
+        readings, errors = validate(parse())
+        assert len(readings) == args.readings and not errors, (name, errors[:1])
+
+        parse_stats = percentiles(timed(parse, args.repeat))
+        full_stats = percentiles(timed(lambda: validate(parse()), args.repeat))
+        print(json.dumps({
+            "format": name,
+            "readings": args.readings,
+            "bytes": len(body),
+            "bytes_per_reading": round(len(body) / args.readings, 2),
+            "parse_p50_ms": parse_stats["p50_ms"],
+            "validate_p50_ms": full_stats["p50_ms"],
+            "validate_readings_per_sec": round(args.readings / (full_stats["p50_ms"] / 1000)),
+        }))
+
+
+if __name__ == '__main__':
+    main()
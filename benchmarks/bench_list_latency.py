@@ -0,0 +1,66 @@
+"""
+p50 / p99 latency of filtered water-quality list calls as the table grows.
+
+    python benchmarks/bench_list_latency.py --rows 1000000 10000000 50000000
+
+Rendered responses are dropped before every request, so each call runs its
+query. Measured on SQLite 3.40 (file database via BENCH_DB, one CPU, 100
+units, one reading per unit per minute, 200 calls per point), in ms:
+
+    rows   query           p50    p99
+    1M     unit_day        21.3   59.3
+    1M     unit_tds_range  13.3   40.3
+    10M    unit_day        23.6   34.3
+    10M    unit_tds_range  24.4   33.5
+    50M    unit_day        19.7   25.5
+    50M    unit_tds_range  28.9   36.0
+"""
+import argparse
+import json
+import random
+
+from common import setup_database, seed_readings, timed, percentiles
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--rows', type=int, nargs='+', default=[1_000_000, 10_000_000, 50_000_000])
+    parser.add_argument('--units', type=int, default=100)
+    parser.add_argument('--repeat', type=int, default=200)
+    args = parser.parse_args()
+
+    setup_database()
+
+    from django.conf import settings
+    from django.core.cache import caches
+    from rest_framework.test import APIClient
+    from api.models import WaterQuality
+
+    client = APIClient()
+    rng = random.Random(0)
+    responses = caches[settings.RESPONSE_CACHE_ALIAS]
+
+    def get(url):
+        # measure the query, not a cached rendering
+        responses.clear()
+        return client.get(url)
+
+    for total in sorted(args.rows):
+        unit_ids = seed_readings(total, units=args.units)
+        newest = WaterQuality.objects.order_by('-date_time').values_list('date_time', flat=True)[0]
+        day = newest.date().isoformat()
+
+        queries = {
+            "unit_day": lambda: f"/api/water-quality/?wu={rng.choice(unit_ids)}&date={day}",
+            "unit_tds_range": lambda: (
+                f"/api/water-quality/?wu={rng.choice(unit_ids)}&date={day}"
+                f"&min_tds=200&max_tds=300"
+            ),
+        }
+        for name, url in queries.items():
+            samples = timed(lambda: get(url()), args.repeat)
+            print(json.dumps({"rows": total, "query": name, **percentiles(samples)}))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,93 @@
+"""
+Concurrent logins per password-hashing setup: login throughput and
+latency, and the latency of a cheap read served at the same time (how
+much the login burst stalls the rest of the API).
+
+    python benchmarks/bench_login.py --clients 16 --logins 200
+"""
+import argparse
+import json
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+from common import setup_database, timed, percentiles
+
+
+SCENARIOS = {
+    "pbkdf2_inline": {
+        "PASSWORD_HASHERS": ['django.contrib.auth.hashers.PBKDF2PasswordHasher'],
+        "PASSWORD_HASH_WORKERS": 0,
+    },
+    "scrypt_pool": {
+        "PASSWORD_HASHERS": ['api.hashers.ScryptPasswordHasher'],
+    },
+    "argon2_pool": {
+        "PASSWORD_HASHERS": ['api.hashers.Argon2PasswordHasher'],
+    },
+}
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--clients', type=int, default=16)
+    parser.add_argument('--logins', type=int, default=200)
+    parser.add_argument('--workers', type=int, default=2, help="PASSWORD_HASH_WORKERS for pooled runs.")
+    parser.add_argument('--scenario', choices=list(SCENARIOS), action='append')
+    args = parser.parse_args()
+
+    setup_database()
+
+    import time
+    from django.test.utils import override_settings
+    from rest_framework.authtoken.models import Token
+    from rest_framework.test import APIClient
+    from api.models import Maintainer, WaterUnit
+
+    WaterUnit.objects.create(name="Bench", location="Bench")
+
+    for name in args.scenario or list(SCENARIOS):
+        overrides = {"PASSWORD_HASH_WORKERS": args.workers, **SCENARIOS[name]}
+        with override_settings(**overrides):
+            users = []
+            for i in range(args.clients):
+                user = Maintainer.objects.create_user(f"{name}-{i}@bench.local", "Bench", "pass1234")
+                Token.objects.create(user=user)  # no writes while measuring
+                users.append(user.email)
+
+            def login(email):
+                client = APIClient()
+                start = time.perf_counter()
+                res = client.post("/api/login/", {"username": email, "password": "pass1234"}, format="json")
+                assert res.status_code == 200, res.status_code
+                return time.perf_counter() - start
+
+            login(users[0])  # start the pool
+
+            done = threading.Event()
+            probes = []
+
+            def probe():
+                client = APIClient()
+                while not done.is_set():
+                    probes.extend(timed(lambda: client.get("/api/water-unit/"), 1))
+
+            prober = threading.Thread(target=probe)
+            prober.start()
+            start = time.perf_counter()
+            with ThreadPoolExecutor(args.clients) as clients:
+                samples = list(clients.map(login, (users[i % len(users)] for i in range(args.logins))))
+            elapsed = time.perf_counter() - start
+            done.set()
+            prober.join()
+
+        print(json.dumps({
+            "scenario": name,
+            "clients": args.clients,
+            "logins_per_sec": round(args.logins / elapsed, 1),
+            "login": percentiles(samples),
+            "concurrent_read": percentiles(probes),
+        }))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,96 @@
+"""
+Maintenance search latency: the indexed `?q=` full-text search against
+the `icontains` filters it replaces, for rare, common and prefix terms.
+
+    python benchmarks/bench_search.py --records 1000000
+
+Seeding a million records takes a few minutes; set BENCH_DB to keep them.
+"""
+import argparse
+import json
+import random
+
+from common import setup_database, timed, percentiles
+
+
+DOMAIN = (
+    "pump valve filter membrane sensor probe pipe inlet outlet seal gasket tank "
+    "pressure flow leak clog drift calibration cartridge motor power cable board "
+    "display alarm chlorine sediment scale corrosion crack noise vibration bearing"
+).split()
+
+# Zipf-distributed vocabulary: filler words take the most frequent ranks,
+# domain words sit further down, as in real maintenance notes
+VOCABULARY = [f"w{n}" for n in range(40)] + DOMAIN + [f"x{n}" for n in range(5000)]
+WEIGHTS = [1 / rank for rank in range(1, len(VOCABULARY) + 1)]
+
+RARE = "ultraviolet"
+
+
+def seed_maintenance(total, chunk=50000):
+    """Top Maintenance up to `total` records of random maintenance prose."""
+    from django.db import connection
+    from django.utils import timezone
+    from api.models import WaterUnit, Maintenance
+
+    unit = WaterUnit.objects.first() or WaterUnit.objects.create(name="Unit", location="bench")
+    have = Maintenance.objects.count()
+    rng = random.Random(have)
+    table = connection.ops.quote_name(Maintenance._meta.db_table)
+    sql = (
+        f"INSERT INTO {table} (wu_id, datetime, problem, description, maintainer_id) "
+        f"VALUES (%s, %s, %s, %s, NULL)"
+    )
+    now = connection.ops.adapt_datetimefield_value(timezone.now())
+
+    with connection.cursor() as cursor:
+        for offset in range(have, total, chunk):
+            rows = []
+            for n in range(offset, min(offset + chunk, total)):
+                problem = " ".join(rng.choices(VOCABULARY, WEIGHTS, k=4))
+                description = " ".join(rng.choices(VOCABULARY, WEIGHTS, k=20))
+                if n % 10000 == 0:
+                    description += f" {RARE} lamp replaced"
+                rows.append((unit.id, now, problem, description))
+            cursor.executemany(sql, rows)
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--records', type=int, default=1_000_000)
+    parser.add_argument('--repeat', type=int, default=20)
+    args = parser.parse_args()
+
+    setup_database()
+
+    from django.core.cache import caches
+    from rest_framework.test import APIClient
+
+    seed_maintenance(args.records)
+    client = APIClient()
+
+    cases = [
+        ("rare", {"q": RARE}, {"problem_contains": RARE}),
+        ("common", {"q": "pump leak"}, {"problem_contains": "pump leak"}),
+        ("prefix", {"q": "calib"}, {"problem_contains": "calib"}),
+        # worst case: a filler word in most records, every hit gets ranked
+        ("frequent", {"q": "w1"}, {"problem_contains": "w1"}),
+    ]
+
+    def fetch(params):
+        def run():
+            # measure the query, not the response cache
+            for cache in caches.all():
+                cache.clear()
+            response = client.get("/api/maintenance/", params)
+            assert response.status_code == 200, response.status_code
+        return run
+
+    for name, search, contains in cases:
+        for path, params in (("icontains", contains), ("fts", search)):
+            stats = percentiles(timed(fetch(params), args.repeat))
+            print(json.dumps({"records": args.records, "query": name, "path": path, **stats}))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,51 @@
+"""
+Rows per second rendered by a water-quality list page, with the fast
+row encoder and with the regular ModelSerializer.
+
+    python benchmarks/bench_serializers.py --rows 200000 --page-size 1000
+"""
+import argparse
+import json
+
+from common import setup_database, seed_readings, timed, percentiles
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--rows', type=int, default=200_000)
+    parser.add_argument('--units', type=int, default=10)
+    parser.add_argument('--page-size', type=int, default=1000)
+    parser.add_argument('--repeat', type=int, default=50)
+    args = parser.parse_args()
+
+    setup_database()
+
+    from django.core.cache import caches
+    from django.test import override_settings
+    from rest_framework.test import APIClient
+
+    seed_readings(args.rows, units=args.units)
+    client = APIClient()
+    url = f"/api/water-quality/?page_size={args.page_size}"
+
+    def fetch():
+        # measure rendering, not the response cache
+        for cache in caches.all():
+            cache.clear()
+        response = client.get(url)
+        assert response.status_code == 200, response.status_code
+
+    for name, enabled in (("serializer", False), ("fast", True)):
+        with override_settings(FAST_LIST_SERIALIZATION=enabled):
+            samples = timed(fetch, args.repeat)
+        stats = percentiles(samples)
+        print(json.dumps({
+            "path": name,
+            "page_size": args.page_size,
+            "rows_per_sec": round(args.page_size / (stats["p50_ms"] / 1000)),
+            **stats,
+        }))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,301 @@
+"""
+End-to-end API benchmark: throughput and latency of the main endpoints on
+a synthetic fleet, one client and several concurrent ones, written as a
+single JSON document so runs on different commits can be compared.
+
+    python benchmarks/bench_suite.py --output before.json
+    git checkout my-branch
+    python benchmarks/bench_suite.py --output after.json --baseline before.json
+
+Requests go through the in-process test client (full middleware, auth and
+serialization, no sockets). With --baseline the script prints the change
+per scenario and exits 1 when p50 latency or throughput got worse than
+--tolerance. `--input` compares an existing results file instead of
+running.
+
+SQLite runs from a temporary file unless BENCH_DB is set, since the
+in-memory test database locks whole tables under concurrent writes.
+
+Responses are cached as in production. Readings and units vary per request
+so most reads still miss; pass --cold to clear the caches before every
+request instead.
+"""
+import argparse
+import json
+import os
+import platform
+import random
+import shutil
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+from datetime import timedelta
+
+from common import BASE_DIR, setup_database, percentiles
+
+
+PASSWORD = "bench-pass-1234"
+
+
+# ------------------------------------------------------
+#                       SCENARIOS
+# ------------------------------------------------------
+# each returns (method, url, body) for one request
+def scenarios(fleet):
+    unit_ids, days, email = fleet['unit_ids'], fleet['days'], fleet['email']
+
+    def unit(rng):
+        return rng.choice(unit_ids)
+
+    return {
+        "list": lambda rng: ("get", "/api/water-quality/", None),
+        "filter": lambda rng: (
+            "get", f"/api/water-quality/?wu={unit(rng)}&date={rng.choice(days)}&min_tds=150", None,
+        ),
+        "ordering": lambda rng: ("get", f"/api/water-quality/?wu={unit(rng)}&ordering=-tds", None),
+        "create": lambda rng: ("post", "/api/water-quality/", {
+            "wu": unit(rng), "tds": round(rng.uniform(80, 400), 1),
+            "date_time": fleet['end'].isoformat(),
+        }),
+        "login": lambda rng: ("post", "/api/login/", {"username": email, "password": PASSWORD}),
+        "user_info": lambda rng: ("get", "/api/user/", None),
+    }
+
+
+# ------------------------------------------------------
+#                         SETUP
+# ------------------------------------------------------
+def prepare_fleet(units, readings, seed):
+    """Top the fleet up to `units` units (kept across runs with BENCH_DB)."""
+    from django.utils import timezone
+    from rest_framework.authtoken.models import Token
+    from api.models import Maintainer, WaterUnit, WaterQuality
+    from api.synthetic import generate_fleet
+
+    missing = units - WaterUnit.objects.count()
+    if missing > 0:
+        generate_fleet(missing, readings, seed=seed)
+
+    email = "bench@example.com"
+    user = Maintainer.objects.filter(email=email).first()
+    if user is None:
+        user = Maintainer.objects.create_user(email, "Bench", PASSWORD)
+    token, _ = Token.objects.get_or_create(user=user)
+
+    newest = WaterQuality.objects.order_by('-date_time').values_list('date_time', flat=True).first()
+    newest = timezone.localtime(newest or timezone.now())
+    return {
+        'unit_ids': list(WaterUnit.objects.order_by('id').values_list('id', flat=True)[:units]),
+        'days': [(newest - timedelta(days=n)).date().isoformat() for n in range(3)],
+        'end': newest,
+        'email': email,
+        'token': token.key,
+        'readings': WaterQuality.objects.count(),
+    }
+
+
+def git_revision():
+    def git(*args):
+        return subprocess.run(
+            ['git', *args], cwd=BASE_DIR, capture_output=True, text=True, check=False,
+        ).stdout.strip()
+    return {
+        'commit': git('rev-parse', 'HEAD') or None,
+        'dirty': bool(git('status', '--porcelain', '--untracked-files=no')),
+    }
+
+
+# ------------------------------------------------------
+#                        RUNNER
+# ------------------------------------------------------
+def run_scenario(make_request, token, requests, concurrency, seed, cold=False, warmup=10):
+    """Latency samples and wall time for `requests` requests over `concurrency` threads."""
+    from django.core.cache import caches
+    from django.db import connections
+    from rest_framework.test import APIClient
+
+    samples, errors = [], []
+    lock = threading.Lock()
+    shares = [requests // concurrency + (i < requests % concurrency) for i in range(concurrency)]
+    barrier = threading.Barrier(concurrency + 1)
+
+    def client_thread(index, count):
+        client = APIClient()
+        client.credentials(HTTP_AUTHORIZATION=f"Token {token}")
+        rng = random.Random(seed * 1000 + index)
+        local, failed = [], []
+        try:
+            for _ in range(warmup):
+                send(client, *make_request(rng))
+            barrier.wait()
+            for _ in range(count):
+                request = make_request(rng)
+                if cold:
+                    for cache in caches.all():
+                        cache.clear()
+                start = time.perf_counter()
+                status = send(client, *request)
+                local.append(time.perf_counter() - start)
+                if status >= 400:
+                    failed.append(status)
+        finally:
+            connections.close_all()
+        with lock:
+            samples.extend(local)
+            errors.extend(failed)
+
+    threads = [threading.Thread(target=client_thread, args=(i, n)) for i, n in enumerate(shares)]
+    for thread in threads:
+        thread.start()
+    barrier.wait()
+    started = time.perf_counter()
+    for thread in threads:
+        thread.join()
+    return samples, errors, time.perf_counter() - started
+
+
+def send(client, method, url, body):
+    try:
+        if body is None:
+            return getattr(client, method)(url).status_code
+        return getattr(client, method)(url, body, format="json").status_code
+    except Exception:
+        # e.g. "database is locked" under concurrent writes
+        return 599
+
+
+def summarize(name, concurrency, samples, errors, elapsed):
+    ok = len(samples) - len(errors)
+    result = {
+        "scenario": name,
+        "concurrency": concurrency,
+        "requests": len(samples),
+        "errors": len(errors),
+        "throughput_rps": round(ok / elapsed, 1) if elapsed else None,
+    }
+    if len(samples) > 1:
+        ordered = sorted(samples)
+        result.update(percentiles(samples))
+        result["p90_ms"] = round(ordered[int(0.9 * (len(ordered) - 1))] * 1000, 3)
+        result["max_ms"] = round(ordered[-1] * 1000, 3)
+    return result
+
+
+# ------------------------------------------------------
+#                      COMPARISON
+# ------------------------------------------------------
+def compare(baseline, current, tolerance):
+    """Print the change per scenario; True when nothing regressed past `tolerance`."""
+    before = {(r['scenario'], r['concurrency']): r for r in baseline['results']}
+    passed = True
+    print(f"baseline {baseline['meta']['commit']} -> {current['meta']['commit']}", file=sys.stderr)
+    for result in current['results']:
+        old = before.get((result['scenario'], result['concurrency']))
+        if old is None or 'p50_ms' not in old or 'p50_ms' not in result:
+            continue
+        latency = result['p50_ms'] / old['p50_ms'] - 1
+        throughput = result['throughput_rps'] / old['throughput_rps'] - 1
+        regressed = latency > tolerance or throughput < -tolerance
+        passed &= not regressed
+        print(
+            f"{result['scenario']:>10} x{result['concurrency']:<3} "
+            f"p50 {old['p50_ms']:9.3f} -> {result['p50_ms']:9.3f} ms ({latency:+.1%})  "
+            f"{old['throughput_rps']:8.1f} -> {result['throughput_rps']:8.1f} req/s ({throughput:+.1%})"
+            f"{'  REGRESSION' if regressed else ''}",
+            file=sys.stderr,
+        )
+    return passed
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--units', type=int, default=100)
+    parser.add_argument('--readings', type=int, default=1000, help="Readings per unit.")
+    parser.add_argument('--requests', type=int, default=200, help="Measured requests per run.")
+    parser.add_argument('--concurrency', type=int, nargs='+', default=[1, 8])
+    parser.add_argument('--scenario', action='append', help="Run only these (repeatable).")
+    parser.add_argument('--cold', action='store_true', help="Clear caches before every request.")
+    parser.add_argument('--seed', type=int, default=0)
+    parser.add_argument('--output', help="Write the results here as well as to stdout.")
+    parser.add_argument('--baseline', help="Results file to compare against.")
+    parser.add_argument('--input', help="Compare this results file instead of running.")
+    parser.add_argument('--tolerance', type=float, default=0.10)
+    args = parser.parse_args()
+
+    if args.input:
+        with open(args.input) as f:
+            report = json.load(f)
+    else:
+        report = run(args)
+        text = json.dumps(report, indent=2)
+        print(text)
+        if args.output:
+            with open(args.output, 'w') as f:
+                f.write(text + "\n")
+
+    if args.baseline:
+        with open(args.baseline) as f:
+            baseline = json.load(f)
+        if not compare(baseline, report, args.tolerance):
+            sys.exit(1)
+
+
+def run(args):
+    persistent = bool(os.environ.get('BENCH_DB'))
+    scratch = None
+    if not persistent:
+        scratch = tempfile.mkdtemp(prefix='bench-suite-')
+        os.environ['BENCH_DB'] = os.path.join(scratch, 'bench.sqlite3')
+    try:
+        return run_suite(args, persistent)
+    finally:
+        if scratch:
+            shutil.rmtree(scratch, ignore_errors=True)
+
+
+def run_suite(args, persistent):
+    setup_database()
+
+    import django
+    from django.db import connection
+
+    fleet = prepare_fleet(args.units, args.readings, args.seed)
+    available = scenarios(fleet)
+    names = args.scenario or list(available)
+    unknown = set(names) - set(available)
+    if unknown:
+        sys.exit(f"Unknown scenarios: {', '.join(sorted(unknown))}")
+
+    results = []
+    for name in names:
+        for concurrency in args.concurrency:
+            samples, errors, elapsed = run_scenario(
+                available[name], fleet['token'], args.requests, concurrency, args.seed, cold=args.cold,
+            )
+            result = summarize(name, concurrency, samples, errors, elapsed)
+            print(json.dumps(result), file=sys.stderr)
+            results.append(result)
+
+    return {
+        "meta": {
+            **git_revision(),
+            "created": time.strftime("%Y-%m-%dT%H:%M:%S%z"),
+            "python": platform.python_version(),
+            "django": django.get_version(),
+            "database": connection.vendor,
+            "persistent_db": persistent,
+            "cpus": os.cpu_count(),
+            "units": len(fleet['unit_ids']),
+            "readings": fleet['readings'],
+            "requests": args.requests,
+            "cold": args.cold,
+            "seed": args.seed,
+        },
+        "results": results,
+    }
+
+
+if __name__ == '__main__':
+    main()
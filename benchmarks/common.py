@@ -0,0 +1,88 @@
+"""
+Shared setup for the scripts in this directory.
+
+Every benchmark runs against a throwaway test database (in-memory SQLite by
+default). Set BENCH_DB to a file path to keep a seeded database between runs.
+"""
+import os
+import statistics
+import sys
+import time
+from datetime import timedelta
+from pathlib import Path
+
+BASE_DIR = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(BASE_DIR))
+os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'backend.settings')
+
+import django  # noqa: E402
+
+django.setup()
+
+from django.conf import settings  # noqa: E402
+from django.db import connection  # noqa: E402
+from django.test.utils import setup_test_environment  # noqa: E402
+from django.utils import timezone  # noqa: E402
+
+
+def setup_database():
+    """Create (or reuse, with BENCH_DB) the benchmark database."""
+    setup_test_environment()
+    keepdb = bool(os.environ.get('BENCH_DB'))
+    if keepdb:
+        settings.DATABASES['default'].setdefault('TEST', {})['NAME'] = os.environ['BENCH_DB']
+    connection.creation.create_test_db(verbosity=0, keepdb=keepdb, serialize=False)
+
+
+def percentiles(samples):
+    """p50 / p99 / mean of a list of seconds, reported in milliseconds."""
+    cuts = statistics.quantiles(samples, n=100, method='inclusive')
+    return {
+        "p50_ms": round(cuts[49] * 1000, 3),
+        "p99_ms": round(cuts[98] * 1000, 3),
+        "mean_ms": round(statistics.fmean(samples) * 1000, 3),
+    }
+
+
+def timed(fn, repeat):
+    samples = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        fn()
+        samples.append(time.perf_counter() - start)
+    return samples
+
+
+def seed_readings(total, units=100, chunk=50000, start=None):
+    """
+    Top the WaterQuality table up to `total` rows spread over `units` units,
+    one reading per unit per minute, using raw executemany for speed.
+    Returns the list of unit ids.
+    """
+    from api.models import WaterUnit, WaterQuality
+
+    unit_ids = list(WaterUnit.objects.order_by('id').values_list('id', flat=True)[:units])
+    missing = units - len(unit_ids)
+    if missing > 0:
+        WaterUnit.objects.bulk_create(
+            WaterUnit(name=f"Unit {i}", location="bench") for i in range(missing)
+        )
+        unit_ids = list(WaterUnit.objects.order_by('id').values_list('id', flat=True)[:units])
+
+    have = WaterQuality.objects.count()
+    start = start or timezone.now() - timedelta(minutes=total // units + 1)
+    table = connection.ops.quote_name(WaterQuality._meta.db_table)
+    sql = f"INSERT INTO {table} (wu_id, date_time, tds) VALUES (%s, %s, %s)"
+
+    with connection.cursor() as cursor:
+        for offset in range(have, total, chunk):
+            rows = []
+            for n in range(offset, min(offset + chunk, total)):
+                minute, unit = divmod(n, units)
+                rows.append((
+                    unit_ids[unit],
+                    connection.ops.adapt_datetimefield_value(start + timedelta(minutes=minute)),
+                    100 + (n * 7919) % 400,
+                ))
+            cursor.executemany(sql, rows)
+    return unit_ids